@@ -0,0 +1,99 @@
+"""
+Aba do WhatsApp Web persistente - uma única aba reaproveitada para todos os leads
+
+Antes, cada lead abria uma aba nova pelo botão do CRM, o que inicializava o
+WhatsApp Web do zero (IndexedDB, socket, sincronização) e a aba era fechada
+depois do envio. Agora o clique no botão do CRM é interceptado só para descobrir
+a URL do chat; o chat é aberto dentro da aba que já está carregada desde o
+início da execução, sem recarregar o app.
+"""
+
+from urllib.parse import urlparse, parse_qs, urlencode
+import logging
+
+logger = logging.getLogger(__name__)
+
+URL_WHATSAPP_WEB = "https://web.whatsapp.com"
+
+# Instala (uma vez por página) a captura das aberturas do WhatsApp na aba do CRM:
+# window.open e links com target=_blank para o WhatsApp não abrem aba nova, só
+# guardam a URL em window.__botUrlWhatsapp. O objeto falso devolvido pelo
+# window.open cobre o caso "abre vazia e depois define location".
+SCRIPT_INTERCEPTAR_ABERTURA = """
+window.__botUrlWhatsapp = null;
+if (window.__botInterceptando) return true;
+window.__botInterceptando = true;
+var ehWhatsapp = function (url) {
+    return /^(https?:)?\\/\\/([a-z]+\\.)?(whatsapp\\.com|wa\\.me)\\//i.test(String(url || ''));
+};
+var guardar = function (url) { window.__botUrlWhatsapp = String(url); };
+var abrirOriginal = window.open;
+window.open = function (url) {
+    if (ehWhatsapp(url)) { guardar(url); return null; }
+    if (url && url !== 'about:blank') return abrirOriginal.apply(window, arguments);
+    var falsa = {closed: false, opener: window, focus: function () {}, blur: function () {},
+                 close: function () { this.closed = true; }};
+    var destino = {assign: guardar, replace: guardar};
+    Object.defineProperty(destino, 'href', {set: guardar});
+    Object.defineProperty(falsa, 'location', {get: function () { return destino; }, set: guardar});
+    return falsa;
+};
+document.addEventListener('click', function (evento) {
+    var link = evento.target.closest && evento.target.closest('a[href]');
+    if (link && ehWhatsapp(link.href)) {
+        evento.preventDefault();
+        guardar(link.href);
+    }
+}, true);
+return true;
+"""
+
+# Lê a URL capturada pelo script acima (null se o botão ainda não abriu nada)
+SCRIPT_LER_URL_CAPTURADA = "return window.__botUrlWhatsapp || null;"
+
+# Abre a conversa dentro do WhatsApp Web já carregado: marca o chat atual como
+# anterior (para a espera não confundir a caixa antiga com a nova) e clica num
+# link interno para /send?phone=..., que o roteador do app trata sem recarregar
+# a página
+SCRIPT_ABRIR_CHAT = """
+var url = arguments[0];
+var anteriores = document.querySelectorAll('#main, footer div[contenteditable="true"]');
+for (var i = 0; i < anteriores.length; i++) {
+    anteriores[i].setAttribute('data-bot-anterior', '1');
+}
+var link = document.createElement('a');
+link.href = url;
+link.rel = 'noopener noreferrer';
+link.style.display = 'none';
+var raiz = document.querySelector('#app') || document.body;
+raiz.appendChild(link);
+link.click();
+link.remove();
+return true;
+"""
+
+
+def telefone_da_url(url):
+    """Dígitos do telefone de um link do WhatsApp (wa.me/55..., ...send?phone=...), ou ''"""
+    partes = urlparse(url)
+    telefone = parse_qs(partes.query).get("phone", [""])[0]
+    if not telefone and partes.netloc.lower() == "wa.me":
+        telefone = partes.path.strip("/").split("/")[0]
+    return "".join(c for c in telefone if c.isdigit())
+
+
+def url_chat_web(url, telefone=None, base=URL_WHATSAPP_WEB):
+    """
+    Converte um link do WhatsApp (wa.me/55..., api.whatsapp.com/send?phone=...)
+    para a rota do WhatsApp Web (https://web.whatsapp.com/send?phone=...).
+    'telefone' (ex: já normalizado para E.164) substitui o número do link e
+    'base' troca o endereço do WhatsApp Web (ex: servidor de fixtures).
+    Retorna None se não encontrar o telefone.
+    """
+    telefone = "".join(c for c in (telefone or telefone_da_url(url)) if c.isdigit())
+    if not telefone:
+        return None
+    parametros = {"phone": telefone}
+    for chave, valores in parse_qs(urlparse(url).query).items():
+        parametros.setdefault(chave, valores[0])
+    return f"{base.rstrip('/')}/send?{urlencode(parametros)}"
@@ -0,0 +1,296 @@
+"""
+Backends do CRM - de onde vêm os leads e como a etapa é mudada
+
+O bot conversa com o RD Station CRM por um backend com as mesmas operações:
+colher a coluna 'Entrada de Leads', abrir o lead, ler nome e telefone, saber se
+há WhatsApp e mover o lead de etapa.
+
+- BackendSelenium: o comportamento de sempre, pela interface (cliques no quadro
+  e no painel do lead).
+- BackendAPI: a API HTTP do CRM (token da conta), com conexões reaproveitadas
+  num pool do urllib3, listagem paginada e mudança de etapa por PUT. Com ele o
+  navegador só é usado para o WhatsApp Web.
+
+O servidor_fixture.py responde às mesmas rotas da API (/api/v1/...), então os
+dois backends podem ser medidos localmente.
+
+A API só aceita o token na query string: ele é trocado por *** nas mensagens de
+erro e nos logs do urllib3, que trazem a URL completa.
+"""
+
+from abc import ABC, abstractmethod
+from urllib.parse import quote_plus, urlencode
+import json
+import threading
+import time
+import logging
+
+import urllib3
+
+from telefone import escolher_telefone
+
+logger = logging.getLogger(__name__)
+
+URL_API_PADRAO = "https://crm.rdstation.com/api/v1"
+
+ETAPA_ENTRADA = "Entrada de Leads"
+
+# Maior página aceita pela API na listagem de negociações
+POR_PAGINA_MAXIMO = 200
+
+
+class FiltroToken(logging.Filter):
+    """Troca os tokens da API por *** nas mensagens de log (as URLs levam o token)"""
+
+    def __init__(self):
+        super().__init__()
+        self.tokens = set()
+
+    def ocultar(self, texto):
+        """Texto com os tokens conhecidos (puros ou codificados na URL) trocados por ***"""
+        for token in self.tokens:
+            texto = texto.replace(token, "***").replace(quote_plus(token), "***")
+        return texto
+
+    def filter(self, record):
+        if self.tokens:
+            mensagem = record.getMessage()
+            oculta = self.ocultar(mensagem)
+            if oculta != mensagem:
+                record.msg, record.args = oculta, None
+        return True
+
+
+FILTRO_TOKEN = FiltroToken()
+# Loggers do urllib3 que escrevem a URL da requisição (debug, retentativas)
+for _nome in ("urllib3.connectionpool", "urllib3.poolmanager", "urllib3.util.retry"):
+    logging.getLogger(_nome).addFilter(FILTRO_TOKEN)
+
+
+class ErroAPICRM(Exception):
+    """Resposta de erro da API do CRM (status HTTP em 'status')"""
+
+    def __init__(self, mensagem, status=None):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class BackendCRM(ABC):
+    """Operações do CRM usadas pelo bot"""
+
+    nome = "base"
+    usa_navegador = True  # o CRM precisa de uma aba aberta no navegador
+
+    @abstractmethod
+    def preparar(self):
+        """Confirma que o CRM está acessível (login/token)"""
+
+    @abstractmethod
+    def colher(self, fila):
+        """Acrescenta os leads da coluna 'Entrada de Leads' à fila. Retorna o tamanho da fila"""
+
+    @abstractmethod
+    def abrir_lead(self, lead):
+        """Deixa o lead pronto para ser lido. Retorna True se deu certo"""
+
+    @abstractmethod
+    def obter_nome(self, lead):
+        """Nome do contato do lead"""
+
+    @abstractmethod
+    def verificar_whatsapp(self, lead):
+        """Algo verdadeiro se o lead tem WhatsApp (no Selenium, o próprio botão)"""
+
+    @abstractmethod
+    def obter_telefone(self, lead):
+        """(bruto, e164, tipo) do telefone do lead ou None"""
+
+    @abstractmethod
+    def mudar_etapa(self, lead, etapa):
+        """Move o lead para a etapa com o nome informado. Retorna True se deu certo"""
+
+    def registrar_resumo(self):
+        """Escreve no log as estatísticas do backend (se houver)"""
+
+
+class BackendSelenium(BackendCRM):
+    """CRM pela interface: usa os métodos de navegação e clique do próprio bot"""
+
+    nome = "selenium"
+    usa_navegador = True
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    def preparar(self):
+        self.bot.acessar_rdstation()
+
+    def colher(self, fila):
+        return self.bot.colher_quadro(fila)
+
+    def abrir_lead(self, lead):
+        return self.bot.abrir_lead(lead)
+
+    def obter_nome(self, lead):
+        return self.bot.obter_nome_lead()
+
+    def verificar_whatsapp(self, lead):
+        return self.bot.verificar_botao_whatsapp()
+
+    def obter_telefone(self, lead):
+        return self.bot.obter_telefone_lead()
+
+    def mudar_etapa(self, lead, etapa):
+        return self.bot.mudar_etapa(etapa)
+
+
+class BackendAPI(BackendCRM):
+    """CRM pela API HTTP: listagem paginada e mudança de etapa em milissegundos"""
+
+    nome = "api"
+    usa_navegador = False
+
+    def __init__(self, token, url_api=URL_API_PADRAO, pipeline=None, por_pagina=POR_PAGINA_MAXIMO,
+                 timeout=10, conexoes=4, simulacao=False):
+        """
+        token: token da conta no RD Station CRM
+        url_api: endereço base da API (ex: o do servidor_fixture.py + /api/v1)
+        pipeline: id do funil (None = funil padrão da conta)
+        por_pagina: negociações por página na listagem
+        conexoes: conexões mantidas abertas no pool (uma por bot do pool de contas basta)
+        simulacao: não envia a mudança de etapa, só registra no log
+        """
+        self.token = token
+        if token:
+            FILTRO_TOKEN.tokens.add(token)
+        self.url_api = url_api.rstrip("/")
+        self.pipeline = pipeline
+        self.por_pagina = min(por_pagina, POR_PAGINA_MAXIMO)
+        self.simulacao = simulacao
+        self.http = urllib3.PoolManager(
+            maxsize=conexoes,
+            timeout=urllib3.Timeout(connect=5, read=timeout),
+            retries=urllib3.Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 502, 503, 504),
+                                  allowed_methods=None, raise_on_status=False),
+            headers={"Accept": "application/json", "Content-Type": "application/json"},
+        )
+        self.etapas = None  # nome da etapa -> id, lido uma vez por sessão
+        self.trava = threading.Lock()
+        self.requisicoes = 0
+        self.tempo_requisicoes = 0.0
+
+    def _requisitar(self, metodo, caminho, parametros=None, corpo=None):
+        """Chama a API e devolve o JSON da resposta. Levanta ErroAPICRM em erro HTTP"""
+        campos = {"token": self.token}
+        campos.update(parametros or {})
+        url = f"{self.url_api}{caminho}?{urlencode(campos)}"
+        inicio = time.monotonic()
+        try:
+            resposta = self.http.request(metodo, url, body=json.dumps(corpo) if corpo is not None else None)
+        except urllib3.exceptions.HTTPError as e:
+            # A mensagem do urllib3 traz a URL com o token; a exceção original não segue junto
+            raise ErroAPICRM(FILTRO_TOKEN.ocultar(f"{metodo} {caminho}: {e}")) from None
+        finally:
+            self.requisicoes += 1
+            self.tempo_requisicoes += time.monotonic() - inicio
+
+        if resposta.status >= 400:
+            raise ErroAPICRM(f"{metodo} {caminho}: HTTP {resposta.status}", resposta.status)
+        try:
+            return json.loads(resposta.data or b"{}")
+        except ValueError:
+            raise ErroAPICRM(f"{metodo} {caminho}: resposta não é JSON", resposta.status)
+
+    def carregar_etapas(self):
+        """Mapa nome → id das etapas do funil (consultado uma vez e guardado)"""
+        with self.trava:
+            if self.etapas is None:
+                parametros = {"deal_pipeline_id": self.pipeline} if self.pipeline else {}
+                dados = self._requisitar("GET", "/deal_stages", parametros)
+                self.etapas = {etapa["name"]: etapa.get("_id") or etapa.get("id")
+                               for etapa in dados.get("deal_stages", [])}
+                logger.info(f"🗂️ API do CRM: {len(self.etapas)} etapas no funil")
+            return self.etapas
+
+    def preparar(self):
+        """Valida o token lendo as etapas do funil"""
+        etapas = self.carregar_etapas()
+        if ETAPA_ENTRADA not in etapas:
+            raise ErroAPICRM(f"Etapa '{ETAPA_ENTRADA}' não existe no funil")
+        logger.info("✅ API do RD Station CRM acessível")
+
+    def _lead(self, negociacao, posicao):
+        """Converte uma negociação da API no dict de lead usado pela fila"""
+        contatos = negociacao.get("contacts") or []
+        telefones = [telefone.get("phone") for contato in contatos
+                     for telefone in (contato.get("phones") or [])]
+        return {
+            "id": negociacao.get("_id") or negociacao.get("id"),
+            "link": None,
+            "nome": (contatos[0].get("name") if contatos else None) or negociacao.get("name") or "",
+            "titulo": negociacao.get("name") or "",
+            "telefones": [t for t in telefones if t],
+            "posicao": posicao,
+        }
+
+    def colher(self, fila):
+        """Lista todas as negociações da etapa de entrada, página por página"""
+        id_entrada = self.carregar_etapas()[ETAPA_ENTRADA]
+        pagina = 1
+        posicao = 0
+        while True:
+            dados = self._requisitar("GET", "/deals", {
+                "deal_stage_id": id_entrada, "page": pagina, "limit": self.por_pagina,
+            })
+            negociacoes = dados.get("deals", [])
+            leads = []
+            for negociacao in negociacoes:
+                leads.append(self._lead(negociacao, posicao))
+                posicao += 1
+            fila.adicionar(leads)
+            if not dados.get("has_more") or not negociacoes:
+                break
+            pagina += 1
+        return len(fila)
+
+    def abrir_lead(self, lead):
+        """Os dados já vieram na listagem: nada a abrir"""
+        return True
+
+    def obter_nome(self, lead):
+        nome = lead.get("nome") or "Lead sem nome"
+        logger.info(f"Nome do lead: {nome}")
+        return nome
+
+    def obter_telefone(self, lead):
+        telefone = escolher_telefone(lead.get("telefones") or [])
+        if telefone:
+            bruto, e164, tipo = telefone
+            logger.info(f"📞 Telefone do lead: {bruto} → {e164 or '-'} ({tipo})")
+        return telefone
+
+    def verificar_whatsapp(self, lead):
+        """O CRM só mostra o botão do WhatsApp para contatos com telefone"""
+        return escolher_telefone(lead.get("telefones") or []) is not None
+
+    def mudar_etapa(self, lead, etapa):
+        try:
+            id_etapa = self.carregar_etapas().get(etapa)
+            if not id_etapa:
+                logger.error(f"❌ Etapa '{etapa}' não existe no funil")
+                return False
+            if self.simulacao:
+                logger.info(f"🧪 [simulação] Lead seria movido para '{etapa}' pela API")
+                return True
+            self._requisitar("PUT", f"/deals/{lead['id']}", corpo={"deal": {"deal_stage_id": id_etapa}})
+            logger.info(f"✅ Lead movido para '{etapa}' (API)")
+            return True
+        except ErroAPICRM as e:
+            logger.error(f"Erro ao mudar etapa pela API: {e}")
+            return False
+
+    def registrar_resumo(self):
+        """Escreve no log quantas requisições à API foram feitas e o tempo médio"""
+        if self.requisicoes:
+            logger.info(f"🔌 API do CRM: {self.requisicoes} requisições, "
+                        f"média {self.tempo_requisicoes / self.requisicoes * 1000:.0f}ms")
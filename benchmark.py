@@ -0,0 +1,320 @@
+"""
+Benchmark de vazão - leads por hora contra o servidor de fixtures local
+
+Roda o RDStationWhatsAppBot de ponta a ponta (Chrome headless) contra o
+servidor_fixture.py, em cenários com quantidades e misturas de leads diferentes
+(com WhatsApp, sem WhatsApp, número inválido, telefone fixo). Nada sai para o
+CRM ou para o WhatsApp de verdade: as mensagens vão para a API do servidor local.
+
+O ritmo anti-banimento é desligado (intervalo 0), então leads/hora mede só o
+trabalho do bot, sem a pausa proposital entre envios. Para cada cenário são
+medidos: leads/hora, distribuição do tempo por lead (p50/p95/máx), comandos
+WebDriver por lead e o crescimento de memória do Chrome. Os resultados são
+acrescentados em benchmarks/resultados.jsonl e comparados com a execução
+anterior do mesmo cenário.
+
+Uso:
+    python benchmark.py                       # cenários padrão (10 e 100 leads)
+    python benchmark.py --cenarios 1000_misto
+    python benchmark.py --todos --tolerancia 0.15
+    python benchmark.py --backend api         # CRM pela API simulada
+    python benchmark.py --cdp-rapido          # operações quentes pelo DevTools Protocol
+    python benchmark.py --perfil-rede enxuto  # economia de rede vs o perfil completo
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from backend_crm import BackendAPI
+from fila_leads import PoliticaRetentativa
+from limitador_envio import PoliticaEnvio
+from perfil_rede import PERFIS
+from metricas import percentil
+from rdstation_whatsapp_automation import RDStationWhatsAppBot, SAIDA_OK, SAIDA_ERRO
+from servidor_fixture import ConfigFixture, iniciar_em_segundo_plano, urls, url_api
+from vigia_navegador import memoria_processos
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_RESULTADOS = os.path.join("benchmarks", "resultados.jsonl")
+
+# Cenários: quantidade de leads e mistura (frações de cada tipo de lead)
+CENARIOS = {
+    "10_misto": {"leads": 10, "taxa_sem_whatsapp": 0.1, "taxa_invalido": 0.1, "taxa_fixo": 0.05},
+    "100_misto": {"leads": 100, "taxa_sem_whatsapp": 0.1, "taxa_invalido": 0.1, "taxa_fixo": 0.05},
+    "1000_misto": {"leads": 1000, "taxa_sem_whatsapp": 0.1, "taxa_invalido": 0.1, "taxa_fixo": 0.05},
+    "100_validos": {"leads": 100, "taxa_sem_whatsapp": 0.0, "taxa_invalido": 0.0, "taxa_fixo": 0.0},
+    "100_sem_whatsapp": {"leads": 100, "taxa_sem_whatsapp": 0.5, "taxa_invalido": 0.0, "taxa_fixo": 0.0},
+    "100_invalidos": {"leads": 100, "taxa_sem_whatsapp": 0.0, "taxa_invalido": 0.4, "taxa_fixo": 0.1},
+}
+CENARIOS_PADRAO = ["10_misto", "100_misto"]
+
+# Intervalo (s) entre amostras de memória do Chrome
+INTERVALO_AMOSTRA_MEMORIA = 5
+
+
+class AmostradorMemoria:
+    """Amostra a memória do Chrome numa thread enquanto o cenário roda"""
+
+    def __init__(self, pid, intervalo=INTERVALO_AMOSTRA_MEMORIA):
+        self.pid = pid
+        self.intervalo = intervalo
+        self.amostras = []
+        self.parar = threading.Event()
+        self.thread = threading.Thread(target=self._amostrar, name="memoria-chrome", daemon=True)
+
+    def _amostrar(self):
+        while True:
+            memoria = memoria_processos(self.pid)
+            if memoria is not None:
+                self.amostras.append(memoria)
+            if self.parar.wait(self.intervalo):
+                break
+
+    def iniciar(self):
+        self.thread.start()
+
+    def finalizar(self):
+        """Para a thread e devolve {inicial, final, maxima, crescimento} em MB (ou None)"""
+        self.parar.set()
+        self.thread.join(timeout=self.intervalo + 5)
+        memoria = memoria_processos(self.pid)
+        if memoria is not None:
+            self.amostras.append(memoria)
+        if not self.amostras:
+            return None
+        return {
+            "inicial_mb": round(self.amostras[0], 1),
+            "final_mb": round(self.amostras[-1], 1),
+            "maxima_mb": round(max(self.amostras), 1),
+            "crescimento_mb": round(self.amostras[-1] - self.amostras[0], 1),
+        }
+
+
+def _versao():
+    """Commit atual do repositório, para identificar a versão medida"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def rodar_cenario(nome, parametros, latencia=0.05, headless=True, backend="selenium", cdp_rapido=False,
+                  perfil="completo"):
+    """
+    Sobe as fixtures e um bot, processa a coluna inteira e devolve as medidas do cenário.
+    backend: 'selenium' (CRM pela interface) ou 'api' (CRM pela API simulada)
+    cdp_rapido: liga o atalho CDP do bot (snapshot, botão, cliques e texto)
+    perfil: perfil de rede do bot ('completo' ou 'enxuto')
+    """
+    config = ConfigFixture(latencia=latencia, **parametros)
+    servidor = iniciar_em_segundo_plano(config)
+    url_pipeline, url_whatsapp = urls(servidor)
+    pasta = tempfile.mkdtemp(prefix=f"benchmark_{nome}_")
+
+    bot = RDStationWhatsAppBot(
+        intervalo_colheita=None,
+        politica_envio=PoliticaEnvio(intervalo=0),
+        caminho_diario=os.path.join(pasta, "diario.db"),
+        nome=nome,
+        caminho_limitador=os.path.join(pasta, "limitador.json"),
+        caminho_seletores=os.path.join(pasta, "seletores_cache.json"),
+        caminho_metricas=os.path.join(pasta, "metricas"),
+        headless=headless,
+        interativo=False,
+        url_pipeline=url_pipeline,
+        url_whatsapp=url_whatsapp,
+        contar_comandos=True,
+        crm=BackendAPI(config.token_api, url_api=url_api(servidor)) if backend == "api" else None,
+        cdp_rapido=cdp_rapido,
+        perfil_rede=PERFIS[perfil],
+        medir_rede=True,
+        # Sem nova tentativa: a espera entre tentativas entraria na duração medida
+        politica_retentativa=PoliticaRetentativa(max_tentativas=1),
+    )
+    amostrador = None
+    try:
+        inicio_preparo = time.monotonic()
+        bot.preparar()
+        preparo = time.monotonic() - inicio_preparo
+
+        amostrador = AmostradorMemoria(bot.driver.service.process.pid)
+        amostrador.iniciar()
+        inicio = time.monotonic()
+        bot.processar_fila()
+        duracao = time.monotonic() - inicio
+        memoria = amostrador.finalizar()
+    finally:
+        if amostrador and not amostrador.parar.is_set():
+            amostrador.finalizar()
+        bot.encerrar()
+        bot.diario.fechar()
+        servidor.shutdown()
+        servidor.server_close()
+
+    leads = sum(bot.contagem.values())
+    por_lead = bot.metricas.duracoes.get("lead_total", [])
+    comandos = bot.comandos.relatorio()
+    fixture = servidor.estado.resumo()
+    return {
+        "cenario": nome,
+        "versao": _versao(),
+        "instante": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "backend": backend,
+        "cdp_rapido": cdp_rapido,
+        "perfil_rede": perfil,
+        "parametros": dict(parametros, latencia=latencia),
+        "leads": leads,
+        "contagem": dict(bot.contagem),
+        "preparo_s": round(preparo, 2),
+        "duracao_s": round(duracao, 2),
+        "leads_hora": round(leads / duracao * 3600, 1) if duracao and leads else 0.0,
+        "lead_s": {
+            "p50": percentil(por_lead, 50),
+            "p95": percentil(por_lead, 95),
+            "maximo": max(por_lead) if por_lead else None,
+        },
+        "comandos_por_lead": comandos["por_lead"],
+        "comandos_total": comandos["total"],
+        "rede_por_lead": bot.rede.media_por_lead(),
+        "memoria_chrome": memoria,
+        "fixture": {
+            "mensagens": fixture["mensagens"],
+            "duplicadas": fixture["duplicadas"],
+            "por_etapa": fixture["por_etapa"],
+        },
+    }
+
+
+def ultimo_resultado(cenario, caminho=ARQUIVO_RESULTADOS, backend="selenium", cdp_rapido=False,
+                     perfil="completo"):
+    """Resultado mais recente já salvo para o cenário, backend, atalho CDP e perfil de rede (ou None)"""
+    if not os.path.exists(caminho):
+        return None
+    anterior = None
+    with open(caminho, "r", encoding="utf-8") as arquivo:
+        for linha in arquivo:
+            try:
+                resultado = json.loads(linha)
+            except ValueError:
+                continue
+            if resultado.get("cenario") == cenario and resultado.get("backend", "selenium") == backend \
+                    and resultado.get("cdp_rapido", False) == cdp_rapido \
+                    and resultado.get("perfil_rede", "completo") == perfil:
+                anterior = resultado
+    return anterior
+
+
+def salvar_resultado(resultado, caminho=ARQUIVO_RESULTADOS):
+    """Acrescenta o resultado ao histórico em JSON lines"""
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    with open(caminho, "a", encoding="utf-8") as arquivo:
+        arquivo.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+
+
+def comparar(resultado, anterior, tolerancia):
+    """Registra no log a variação em relação à execução anterior. Retorna True se houve regressão"""
+    if not anterior or not anterior.get("leads_hora"):
+        return False
+
+    variacao = resultado["leads_hora"] / anterior["leads_hora"] - 1
+    logger.info(f"   vs {anterior.get('versao') or '?'} ({anterior.get('instante')}): "
+                f"leads/hora {anterior['leads_hora']:.0f} → {resultado['leads_hora']:.0f} ({variacao:+.0%})")
+
+    antes = (anterior.get("comandos_por_lead") or {}).get("media")
+    agora = resultado["comandos_por_lead"]["media"]
+    if antes and agora:
+        logger.info(f"   comandos por lead: {antes:.0f} → {agora:.0f} ({agora / antes - 1:+.0%})")
+
+    if variacao < -tolerancia:
+        logger.warning(f"⚠️ Regressão em '{resultado['cenario']}': leads/hora caiu {-variacao:.0%} "
+                       f"(tolerância {tolerancia:.0%})")
+        return True
+    return False
+
+
+def registrar_economia(resultado, referencia):
+    """Requisições e KB por lead economizados em relação a uma execução com o perfil completo"""
+    agora = resultado.get("rede_por_lead")
+    antes = (referencia or {}).get("rede_por_lead")
+    if not agora or not antes:
+        return
+    logger.info(f"   rede por lead vs perfil completo ({referencia.get('instante')}): "
+                f"{antes['requisicoes'] - agora['requisicoes']:.0f} requisições e "
+                f"{antes['kb'] - agora['kb']:.0f} KB a menos "
+                f"({antes['requisicoes']:.0f} → {agora['requisicoes']:.0f} req, {antes['kb']:.0f} → {agora['kb']:.0f} KB)")
+
+
+def registrar_resultado(resultado):
+    """Escreve no log as medidas de um cenário"""
+    lead_s = resultado["lead_s"]
+    comandos = resultado["comandos_por_lead"]
+    logger.info(f"🏁 {resultado['cenario']}: {resultado['leads']} leads em {resultado['duracao_s']:.0f}s "
+                f"→ {resultado['leads_hora']:.0f} leads/hora")
+    if lead_s["p50"] is not None:
+        logger.info(f"   por lead: p50 {lead_s['p50']:.2f}s, p95 {lead_s['p95']:.2f}s, máx {lead_s['maximo']:.2f}s")
+    if comandos["media"] is not None:
+        logger.info(f"   comandos WebDriver por lead: média {comandos['media']:.0f}, "
+                    f"p95 {comandos['p95']}, máx {comandos['maximo']}")
+    rede = resultado.get("rede_por_lead")
+    if rede:
+        logger.info(f"   rede por lead ({resultado['perfil_rede']}): {rede['requisicoes']:.0f} requisições, "
+                    f"{rede['kb']:.0f} KB")
+    memoria = resultado["memoria_chrome"]
+    if memoria:
+        logger.info(f"   memória do Chrome: {memoria['inicial_mb']:.0f} → {memoria['final_mb']:.0f} MB "
+                    f"(máx {memoria['maxima_mb']:.0f} MB, {memoria['crescimento_mb']:+.0f} MB)")
+    fixture = resultado["fixture"]
+    if fixture["duplicadas"]:
+        logger.warning(f"⚠️ {fixture['duplicadas']} mensagens duplicadas no servidor de fixtures")
+
+
+def main():
+    """Roda os cenários escolhidos, salva e compara os resultados"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Benchmark de leads/hora contra o servidor de fixtures")
+    parser.add_argument("--cenarios", nargs="+", choices=sorted(CENARIOS), default=CENARIOS_PADRAO,
+                        help=f"cenários a rodar (padrão: {' '.join(CENARIOS_PADRAO)})")
+    parser.add_argument("--todos", action="store_true", help="roda todos os cenários")
+    parser.add_argument("--latencia", type=float, default=0.05, help="segundos por resposta das fixtures")
+    parser.add_argument("--com-janela", action="store_true", help="abre o Chrome com janela (padrão: headless)")
+    parser.add_argument("--backend", choices=("selenium", "api"), default="selenium",
+                        help="CRM pela interface ou pela API simulada das fixtures (padrão: selenium)")
+    parser.add_argument("--cdp-rapido", action="store_true",
+                        help="liga o atalho CDP do bot (comparado só com execuções que também o usaram)")
+    parser.add_argument("--perfil-rede", choices=sorted(PERFIS), default="completo",
+                        help="perfil de rede do bot; com 'enxuto' mostra a economia vs o último 'completo'")
+    parser.add_argument("--resultados", default=ARQUIVO_RESULTADOS,
+                        help=f"histórico dos resultados (padrão: {ARQUIVO_RESULTADOS})")
+    parser.add_argument("--tolerancia", type=float, default=0.10,
+                        help="queda de leads/hora aceita antes de acusar regressão (padrão: 0.10)")
+    args = parser.parse_args()
+
+    cenarios = sorted(CENARIOS, key=lambda nome: CENARIOS[nome]["leads"]) if args.todos else args.cenarios
+    regressao = False
+    for nome in cenarios:
+        logger.info(f"\n🧪 Cenário '{nome}': {CENARIOS[nome]}")
+        anterior = ultimo_resultado(nome, args.resultados, args.backend, args.cdp_rapido, args.perfil_rede)
+        resultado = rodar_cenario(nome, CENARIOS[nome], latencia=args.latencia, headless=not args.com_janela,
+                                  backend=args.backend, cdp_rapido=args.cdp_rapido, perfil=args.perfil_rede)
+        registrar_resultado(resultado)
+        if args.perfil_rede != "completo":
+            registrar_economia(resultado, ultimo_resultado(nome, args.resultados, args.backend, args.cdp_rapido))
+        regressao = comparar(resultado, anterior, args.tolerancia) or regressao
+        salvar_resultado(resultado, args.resultados)
+
+    sys.exit(SAIDA_ERRO if regressao else SAIDA_OK)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Atalho pelo Chrome DevTools Protocol para as operações quentes do DOM
+
+Cada comando Selenium faz Python → HTTP → chromedriver → CDP → Chrome. As
+operações repetidas em todo lead (snapshot dos cards, procura do botão do
+WhatsApp, cliques e inserção do texto) podem ir direto pelo websocket de
+depuração do mesmo Chrome que o chromedriver abriu, sem o salto HTTP. O resto
+continua no webdriver.Chrome de sempre.
+
+O endereço de depuração vem das capabilities da sessão (goog:chromeOptions →
+debuggerAddress) e o handle de cada aba do Selenium é o id do alvo no CDP, então
+o canal conversa com exatamente as mesmas abas. Qualquer falha no canal faz o bot
+voltar ao caminho Selenium; depois de algumas falhas seguidas o atalho é desligado.
+"""
+
+import json
+import time
+import urllib.request
+import logging
+
+try:
+    import websocket  # websocket-client, já instalado como dependência do Selenium
+except ImportError:
+    websocket = None
+
+logger = logging.getLogger(__name__)
+
+# Falhas seguidas antes de desligar o atalho pelo resto da execução
+MAX_FALHAS_CDP = 3
+
+# Procura o botão "Abrir com WhatsApp" no painel do lead (as mesmas pistas dos
+# métodos de seletores: <title> dentro do svg, classe IconButton, texto) e guarda
+# o botão em window.__botAlvoWhatsapp para o clique
+SCRIPT_BOTAO_WHATSAPP = """
+var botao = null;
+var titulos = document.querySelectorAll('title');
+for (var i = 0; i < titulos.length && !botao; i++) {
+    if ((titulos[i].textContent || '').indexOf('Abrir com WhatsApp') !== -1) botao = titulos[i].closest('button');
+}
+if (!botao) {
+    var botoes = document.querySelectorAll('button');
+    for (var j = 0; j < botoes.length && !botao; j++) {
+        if (botoes[j].innerHTML.toLowerCase().indexOf('whatsapp') !== -1) botao = botoes[j];
+    }
+}
+window.__botAlvoWhatsapp = botao;
+return !!botao;
+"""
+
+# Centro do elemento (expressão arguments[0]) depois de rolar até ele, ou null
+SCRIPT_CENTRO_ELEMENTO = """
+var elemento = eval(arguments[0]);
+if (!elemento || !elemento.isConnected) return null;
+elemento.scrollIntoView({block: 'center', inline: 'center'});
+var rect = elemento.getBoundingClientRect();
+if (!rect.width || !rect.height) return null;
+return [rect.left + rect.width / 2, rect.top + rect.height / 2];
+"""
+
+# Foca a caixa de mensagem do chat atual (a mesma regra de SCRIPT_CAIXA_MENSAGEM)
+# e apaga o conteúdo, deixando o cursor pronto para o Input.insertText
+SCRIPT_PREPARAR_CAIXA = """
+var caixas = document.querySelectorAll(arguments[0]);
+for (var i = 0; i < caixas.length; i++) {
+    if (caixas[i].closest('[data-bot-anterior]')) continue;
+    caixas[i].focus();
+    document.execCommand('selectAll', false, null);
+    document.execCommand('delete', false, null);
+    window.__botAlvoCaixa = caixas[i];
+    return true;
+}
+return false;
+"""
+
+SCRIPT_TEXTO_CAIXA_ATUAL = "return window.__botAlvoCaixa ? (window.__botAlvoCaixa.innerText || '') : null;"
+
+
+class ErroCDP(Exception):
+    """Falha no canal CDP (conexão, alvo não encontrado ou exceção no script)"""
+
+
+class AlvoCDP:
+    """Elemento guardado na página (expressão JS) para ser clicado pelo canal CDP"""
+
+    def __init__(self, aba, expressao):
+        self.aba = aba
+        self.expressao = expressao
+
+
+class CanalCDP:
+    """Websockets de depuração das abas do bot e as operações quentes sobre eles"""
+
+    def __init__(self, driver, timeout=10):
+        if websocket is None:
+            raise ErroCDP("websocket-client não está instalado")
+        opcoes = driver.capabilities.get("goog:chromeOptions") or {}
+        self.endereco = opcoes.get("debuggerAddress")
+        if not self.endereco:
+            raise ErroCDP("a sessão não informou o debuggerAddress do Chrome")
+        self.timeout = timeout
+        self.conexoes = {}  # handle da aba -> websocket
+        self.proximo_id = 0
+        self.falhas = 0
+        self.estatisticas = {}  # operação -> [quantidade, segundos]
+
+    @property
+    def ativo(self):
+        return self.falhas < MAX_FALHAS_CDP
+
+    def _conectar(self, aba):
+        """Websocket da aba (o handle do Selenium é o id do alvo no CDP)"""
+        conexao = self.conexoes.get(aba)
+        if conexao is not None:
+            return conexao
+        try:
+            with urllib.request.urlopen(f"http://{self.endereco}/json/list", timeout=self.timeout) as resposta:
+                alvos = json.loads(resposta.read())
+        except Exception as e:
+            raise ErroCDP(f"não foi possível listar as abas: {e}")
+        for alvo in alvos:
+            if alvo.get("id") == aba and alvo.get("webSocketDebuggerUrl"):
+                try:
+                    # Sem cabeçalho Origin: o Chrome recusa origens não liberadas
+                    conexao = websocket.create_connection(alvo["webSocketDebuggerUrl"], timeout=self.timeout,
+                                                          suppress_origin=True)
+                except Exception as e:
+                    raise ErroCDP(f"não foi possível conectar na aba: {e}")
+                self.conexoes[aba] = conexao
+                return conexao
+        raise ErroCDP(f"aba {aba} não encontrada no CDP")
+
+    def _fechar(self, aba):
+        conexao = self.conexoes.pop(aba, None)
+        if conexao is not None:
+            try:
+                conexao.close()
+            except Exception:
+                pass
+
+    def enviar(self, aba, metodo, parametros=None, operacao=None):
+        """Envia um comando CDP para a aba e devolve o 'result'"""
+        inicio = time.perf_counter()
+        try:
+            conexao = self._conectar(aba)
+            self.proximo_id += 1
+            identificador = self.proximo_id
+            conexao.send(json.dumps({"id": identificador, "method": metodo, "params": parametros or {}}))
+            while True:
+                mensagem = json.loads(conexao.recv())
+                if mensagem.get("id") == identificador:
+                    break
+        except ErroCDP:
+            self.falhas += 1
+            raise
+        except Exception as e:
+            self._fechar(aba)
+            self.falhas += 1
+            raise ErroCDP(f"{metodo}: {e}")
+
+        if "error" in mensagem:
+            self.falhas += 1
+            raise ErroCDP(f"{metodo}: {mensagem['error'].get('message')}")
+        self.falhas = 0
+        item = self.estatisticas.setdefault(operacao or metodo, [0, 0.0])
+        item[0] += 1
+        item[1] += time.perf_counter() - inicio
+        return mensagem.get("result", {})
+
+    def avaliar(self, aba, script, *argumentos, operacao="avaliar"):
+        """
+        Executa um script no formato do execute_script (corpo de função com
+        'return' e arguments[n]) e devolve o valor. Elementos DOM não voltam:
+        o script deve guardá-los na página e devolver só dados
+        """
+        expressao = f"(function(){{{script}\n}}).apply(null, {json.dumps(list(argumentos))})"
+        resultado = self.enviar(aba, "Runtime.evaluate", {
+            "expression": expressao, "returnByValue": True, "awaitPromise": False,
+        }, operacao)
+        if "exceptionDetails" in resultado:
+            detalhes = resultado["exceptionDetails"]
+            descricao = (detalhes.get("exception") or {}).get("description") or detalhes.get("text")
+            self.falhas += 1
+            raise ErroCDP(f"erro no script: {descricao}")
+        return resultado.get("result", {}).get("value")
+
+    def clicar(self, alvo):
+        """Clique de verdade (evento confiável) no centro do elemento guardado na página"""
+        centro = self.avaliar(alvo.aba, SCRIPT_CENTRO_ELEMENTO, alvo.expressao, operacao="clicar")
+        if not centro:
+            raise ErroCDP(f"elemento {alvo.expressao} não está na página")
+        x, y = centro
+        for tipo in ("mousePressed", "mouseReleased"):
+            self.enviar(alvo.aba, "Input.dispatchMouseEvent", {
+                "type": tipo, "x": x, "y": y, "button": "left", "clickCount": 1,
+            }, "clicar")
+        return True
+
+    def procurar_botao_whatsapp(self, aba):
+        """AlvoCDP do botão do WhatsApp do painel do lead, ou None"""
+        if self.avaliar(aba, SCRIPT_BOTAO_WHATSAPP, operacao="botao_whatsapp"):
+            return AlvoCDP(aba, "window.__botAlvoWhatsapp")
+        return None
+
+    def inserir_texto(self, aba, seletor_caixa, texto):
+        """
+        Foca a caixa de mensagem, apaga o conteúdo e insere o texto com
+        Input.insertText. Retorna o texto que ficou na caixa (para conferir)
+        """
+        if not self.avaliar(aba, SCRIPT_PREPARAR_CAIXA, seletor_caixa, operacao="inserir_texto"):
+            raise ErroCDP("caixa de mensagem não encontrada")
+        self.enviar(aba, "Input.insertText", {"text": texto}, "inserir_texto")
+        return self.avaliar(aba, SCRIPT_TEXTO_CAIXA_ATUAL, operacao="inserir_texto")
+
+    def fechar(self):
+        """Fecha os websockets abertos"""
+        for aba in list(self.conexoes):
+            self._fechar(aba)
+
+    def registrar_resumo(self):
+        """Escreve no log quantas operações foram pelo CDP e a latência média"""
+        if not self.estatisticas:
+            return
+        logger.info("⚡ Atalho CDP:")
+        for operacao, (quantidade, segundos) in sorted(self.estatisticas.items(), key=lambda par: -par[1][0]):
+            logger.info(f"   {operacao}: {quantidade}x, média {segundos / quantidade * 1000:.1f}ms")
@@ -0,0 +1,150 @@
+"""
+Contador de comandos WebDriver - quantas idas ao chromedriver cada método faz
+
+Cada find_element, is_displayed, get_attribute, execute_script... é uma
+requisição HTTP ao chromedriver. Este módulo envolve o command_executor do
+driver (opcional, ligado com --contar-comandos) e conta cada comando por tipo
+e pelo método do bot que o originou, com o tempo total e médio. No fim da
+execução sai um ranking dos métodos mais "falantes" e o número de comandos
+por lead, para acompanhar regressões.
+"""
+
+import json
+import sys
+import threading
+import time
+import logging
+
+from metricas import percentil
+
+logger = logging.getLogger(__name__)
+
+# Quantas linhas o ranking mostra no log
+LINHAS_RANKING = 15
+
+
+class ContadorComandos:
+    """Conta os comandos WebDriver por tipo, por método do bot e por lead"""
+
+    def __init__(self, alvo):
+        """alvo: o bot; o método chamador é o primeiro método dele na pilha"""
+        self.alvo = alvo
+        self.classe = type(alvo)
+        self.por_comando = {}  # comando -> [quantidade, segundos]
+        self.por_metodo = {}  # (método, comando) -> [quantidade, segundos]
+        self.por_lead = {}  # chave do lead -> quantidade de comandos
+        self.lead = None
+        self.trava = threading.Lock()
+
+    def instalar(self, driver):
+        """Envolve o command_executor do driver para contar cada comando enviado"""
+        executor = driver.command_executor
+        original = executor.execute
+
+        def execute(comando, parametros):
+            inicio = time.perf_counter()
+            try:
+                return original(comando, parametros)
+            finally:
+                self.registrar(comando, self._metodo_chamador(), time.perf_counter() - inicio)
+
+        executor.execute = execute
+
+    def _metodo_chamador(self):
+        """
+        Primeiro método do bot na pilha de chamadas. Funções internas (metodo_1,
+        metodo_2...) e decoradores são pulados: conta para o método que as contém
+        """
+        quadro = sys._getframe(2)
+        while quadro is not None:
+            if quadro.f_locals.get("self") is self.alvo and hasattr(self.classe, quadro.f_code.co_name):
+                return quadro.f_code.co_name
+            quadro = quadro.f_back
+        return "(fora do bot)"
+
+    def registrar(self, comando, metodo, duracao):
+        """Soma um comando nas contagens"""
+        with self.trava:
+            item = self.por_comando.setdefault(comando, [0, 0.0])
+            item[0] += 1
+            item[1] += duracao
+            item = self.por_metodo.setdefault((metodo, comando), [0, 0.0])
+            item[0] += 1
+            item[1] += duracao
+            if self.lead is not None:
+                self.por_lead[self.lead] = self.por_lead.get(self.lead, 0) + 1
+
+    def iniciar_lead(self, chave):
+        """Associa os próximos comandos ao lead informado"""
+        self.lead = chave
+
+    def do_lead(self, chave):
+        """Comandos enviados até agora durante o processamento do lead"""
+        return self.por_lead.get(chave, 0)
+
+    def total(self):
+        """Quantidade total de comandos enviados"""
+        return sum(quantidade for quantidade, _ in self.por_comando.values())
+
+    def relatorio(self):
+        """Ranking por método e por comando (do mais caro ao mais barato) e comandos por lead"""
+        with self.trava:
+            metodos = {}
+            for (metodo, comando), (quantidade, segundos) in self.por_metodo.items():
+                item = metodos.setdefault(metodo, {"metodo": metodo, "quantidade": 0, "segundos": 0.0, "comandos": {}})
+                item["quantidade"] += quantidade
+                item["segundos"] += segundos
+                item["comandos"][comando] = quantidade
+            comandos = [
+                {"comando": comando, "quantidade": quantidade, "segundos": segundos,
+                 "media": segundos / quantidade}
+                for comando, (quantidade, segundos) in self.por_comando.items()
+            ]
+            por_lead = list(self.por_lead.values())
+
+        for item in metodos.values():
+            item["media"] = item["segundos"] / item["quantidade"]
+        return {
+            "total": sum(item["quantidade"] for item in comandos),
+            "segundos": sum(item["segundos"] for item in comandos),
+            "metodos": sorted(metodos.values(), key=lambda item: -item["segundos"]),
+            "comandos": sorted(comandos, key=lambda item: -item["segundos"]),
+            "por_lead": {
+                "leads": len(por_lead),
+                "media": sum(por_lead) / len(por_lead) if por_lead else None,
+                "p50": percentil(por_lead, 50),
+                "p95": percentil(por_lead, 95),
+                "maximo": max(por_lead) if por_lead else None,
+            },
+        }
+
+    def registrar_resumo(self):
+        """Escreve no log o ranking dos métodos e comandos mais caros"""
+        relatorio = self.relatorio()
+        if not relatorio["total"]:
+            return
+
+        logger.info(f"📡 Comandos WebDriver: {relatorio['total']} em {relatorio['segundos']:.1f}s")
+        logger.info("   Por método do bot (tempo total):")
+        for item in relatorio["metodos"][:LINHAS_RANKING]:
+            principais = sorted(item["comandos"].items(), key=lambda par: -par[1])[:3]
+            detalhe = ", ".join(f"{comando} {qtd}" for comando, qtd in principais)
+            logger.info(f"   {item['metodo']}: {item['quantidade']}x, {item['segundos']:.1f}s "
+                        f"(média {item['media'] * 1000:.0f}ms) - {detalhe}")
+        logger.info("   Por comando:")
+        for item in relatorio["comandos"][:LINHAS_RANKING]:
+            logger.info(f"   {item['comando']}: {item['quantidade']}x, {item['segundos']:.1f}s "
+                        f"(média {item['media'] * 1000:.0f}ms)")
+
+        por_lead = relatorio["por_lead"]
+        if por_lead["leads"]:
+            logger.info(f"   Por lead: média {por_lead['media']:.0f}, p50 {por_lead['p50']}, "
+                        f"p95 {por_lead['p95']}, máx {por_lead['maximo']} ({por_lead['leads']} leads)")
+
+    def salvar(self, caminho):
+        """Grava o relatório em JSON (para comparar versões do bot)"""
+        try:
+            with open(caminho, "w", encoding="utf-8") as arquivo:
+                json.dump(self.relatorio(), arquivo, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível salvar o relatório de comandos ({caminho}): {e}")
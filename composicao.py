@@ -0,0 +1,90 @@
+"""
+Inserção da mensagem na caixa do WhatsApp Web numa única operação
+
+Digitar com send_keys custa uma ida e volta ao WebDriver por linha (mais o
+SHIFT+ENTER de cada quebra) e o tempo cresce com o tamanho da mensagem. Aqui a
+mensagem inteira entra de uma vez por um evento de colar (paste), que o editor
+do WhatsApp trata como se o usuário tivesse colado o texto. Se o editor não
+aceitar, tenta execCommand('insertText') e, por último, a digitação antiga.
+O texto da caixa é sempre conferido antes do ENTER.
+"""
+
+from selenium.webdriver.common.keys import Keys
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Limpa a caixa e insere o texto inteiro: primeiro como 'paste' (ClipboardEvent
+# com DataTransfer), depois com execCommand('insertText'). Retorna o modo usado
+# ou null se nenhum alterou o conteúdo
+SCRIPT_INSERIR_MENSAGEM = """
+var caixa = arguments[0], texto = arguments[1];
+var limpar = function () {
+    caixa.focus();
+    document.execCommand('selectAll', false, null);
+    document.execCommand('delete', false, null);
+};
+var conteudo = function () { return (caixa.innerText || '').trim(); };
+
+limpar();
+try {
+    var dados = new DataTransfer();
+    dados.setData('text/plain', texto);
+    caixa.dispatchEvent(new ClipboardEvent('paste', {
+        clipboardData: dados, bubbles: true, cancelable: true
+    }));
+    if (conteudo()) return 'colar';
+} catch (e) {}
+
+limpar();
+if (document.execCommand('insertText', false, texto) && conteudo()) return 'inserir';
+return null;
+"""
+
+# Texto atual da caixa de mensagem
+SCRIPT_TEXTO_CAIXA = "return arguments[0].innerText || '';"
+
+
+def normalizar_texto(texto):
+    """
+    Forma comparável do texto: linhas sem espaços nas pontas e sem linhas vazias
+    (o editor representa cada linha como um parágrafo e o innerText varia nas quebras)
+    """
+    texto = (texto or "").replace("\r", "").replace("\u00a0", " ")
+    return [linha.strip() for linha in texto.split("\n") if linha.strip()]
+
+
+def texto_confere(driver, caixa, mensagem):
+    """True se a caixa contém exatamente a mensagem (após normalizar)"""
+    return normalizar_texto(driver.execute_script(SCRIPT_TEXTO_CAIXA, caixa)) == normalizar_texto(mensagem)
+
+
+def digitar_mensagem(caixa, mensagem):
+    """Digitação antiga: linha por linha, SHIFT+ENTER entre as linhas"""
+    caixa.send_keys(Keys.CONTROL, "a")
+    caixa.send_keys(Keys.DELETE)
+    linhas = mensagem.split('\n')
+    for i, linha in enumerate(linhas):
+        caixa.send_keys(linha)
+        if i < len(linhas) - 1:  # Não adiciona SHIFT+ENTER na última linha
+            caixa.send_keys(Keys.SHIFT + Keys.ENTER)
+
+
+def inserir_mensagem(driver, caixa, mensagem):
+    """
+    Coloca a mensagem na caixa e confere o texto.
+    Retorna (modo, conferido): modo 'colar', 'inserir' ou 'digitar'
+    """
+    try:
+        modo = driver.execute_script(SCRIPT_INSERIR_MENSAGEM, caixa, mensagem)
+    except Exception as e:
+        logger.warning(f"⚠️ Inserção direta falhou: {e}")
+        modo = None
+
+    if modo and texto_confere(driver, caixa, mensagem):
+        return modo, True
+    if modo:
+        logger.warning(f"⚠️ Texto inserido ({modo}) não confere com a mensagem - digitando")
+
+    digitar_mensagem(caixa, mensagem)
+    return "digitar", texto_confere(driver, caixa, mensagem)
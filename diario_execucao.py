@@ -0,0 +1,218 @@
+"""
+Diário de execução em SQLite - retomada segura e envio sem duplicidade
+
+Cada transição de estado de um lead (aberto, WhatsApp encontrado, enviando,
+mensagem enviada, etapa movida, retornado) é gravada num banco SQLite local.
+Se o processo morrer no meio (Chrome travou, Ctrl+C), a próxima execução sabe
+quais leads já terminaram e, principalmente, para quais a mensagem já saiu.
+
+O banco usa WAL e commits em lote para não pesar no loop principal. A única
+gravação imediata é a marca 'enviando', feita antes do ENTER: é ela que garante
+que uma mensagem nunca seja enviada duas vezes.
+
+Leads que terminam com erro ganham uma linha em 'falhas' com o número de
+tentativas, o motivo e quando podem ser tentados de novo; esgotadas as
+tentativas, ficam em quarentena (concluídos, fora da fila) até serem liberados.
+"""
+
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_PADRAO = "diario_execucao.db"
+
+# Estados que exigem commit imediato (o resto vai em lote)
+ESTADOS_DURAVEIS = {"enviando", "mensagem_enviada"}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    chave TEXT PRIMARY KEY,
+    id_negociacao TEXT,
+    link TEXT,
+    nome TEXT,
+    estado TEXT NOT NULL,
+    resultado TEXT,
+    enviado INTEGER NOT NULL DEFAULT 0,
+    concluido INTEGER NOT NULL DEFAULT 0,
+    atualizado REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS eventos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chave TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    detalhe TEXT,
+    instante REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_eventos_chave ON eventos (chave);
+CREATE TABLE IF NOT EXISTS falhas (
+    chave TEXT PRIMARY KEY,
+    nome TEXT,
+    link TEXT,
+    tentativas INTEGER NOT NULL,
+    motivo TEXT,
+    proxima_tentativa REAL,
+    quarentena INTEGER NOT NULL DEFAULT 0,
+    atualizado REAL NOT NULL
+);
+"""
+
+
+class DiarioExecucao:
+    """Registro persistente das transições de estado de cada lead"""
+
+    def __init__(self, caminho=ARQUIVO_PADRAO, lote=25, intervalo_commit=5.0):
+        self.caminho = caminho
+        self.lote = lote
+        self.intervalo_commit = intervalo_commit
+        self.pendentes = 0
+        self.ultimo_commit = time.monotonic()
+        self.trava = threading.Lock()
+
+        self.conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        self.conexao.executescript(ESQUEMA)
+        self.conexao.commit()
+
+    def registrar(self, lead, estado, detalhe=None):
+        """Grava uma transição de estado do lead"""
+        agora = time.time()
+        enviado = 1 if estado in ESTADOS_DURAVEIS else 0
+
+        with self.trava:
+            self.conexao.execute(
+                "INSERT INTO eventos (chave, estado, detalhe, instante) VALUES (?, ?, ?, ?)",
+                (lead["chave"], estado, detalhe, agora),
+            )
+            self.conexao.execute(
+                """
+                INSERT INTO leads (chave, id_negociacao, link, nome, estado, enviado, atualizado)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(chave) DO UPDATE SET
+                    estado = excluded.estado,
+                    nome = COALESCE(NULLIF(excluded.nome, ''), leads.nome),
+                    enviado = MAX(leads.enviado, excluded.enviado),
+                    atualizado = excluded.atualizado
+                """,
+                (lead["chave"], lead.get("id"), lead.get("link"), lead.get("nome"),
+                 estado, enviado, agora),
+            )
+            self.pendentes += 1
+
+            if estado in ESTADOS_DURAVEIS:
+                self._commit()
+            elif (self.pendentes >= self.lote or
+                  time.monotonic() - self.ultimo_commit >= self.intervalo_commit):
+                self._commit()
+
+    def concluir(self, lead, resultado):
+        """Marca o lead como terminado (estado 'retornado') com o resultado final"""
+        self.registrar(lead, "retornado", resultado)
+        with self.trava:
+            self.conexao.execute(
+                "UPDATE leads SET resultado = ?, concluido = 1 WHERE chave = ?",
+                (resultado, lead["chave"]),
+            )
+
+    def ja_enviado(self, lead):
+        """True se a mensagem deste lead já saiu (ou pode ter saído) em alguma execução"""
+        with self.trava:
+            linha = self.conexao.execute(
+                "SELECT enviado FROM leads WHERE chave = ?", (lead["chave"],)
+            ).fetchone()
+        return bool(linha and linha[0])
+
+    def concluidos(self):
+        """Chaves dos leads já terminados - não devem ser processados de novo"""
+        with self.trava:
+            linhas = self.conexao.execute("SELECT chave FROM leads WHERE concluido = 1").fetchall()
+        return {linha[0] for linha in linhas}
+
+    def interrompidos(self):
+        """Leads que ficaram no meio do caminho na execução anterior"""
+        with self.trava:
+            linhas = self.conexao.execute(
+                "SELECT chave, estado, enviado FROM leads WHERE concluido = 0"
+            ).fetchall()
+        return linhas
+
+    def tentativas(self, lead):
+        """Quantas tentativas do lead já terminaram em erro"""
+        with self.trava:
+            linha = self.conexao.execute(
+                "SELECT tentativas FROM falhas WHERE chave = ?", (lead["chave"],)
+            ).fetchone()
+        return linha[0] if linha else 0
+
+    def registrar_falha(self, lead, motivo, tentativas, proxima_tentativa=None):
+        """
+        Grava a falha do lead: com proxima_tentativa (timestamp) ele volta à fila
+        depois desse instante; sem ela, vai para a quarentena
+        """
+        quarentena = 1 if proxima_tentativa is None else 0
+        with self.trava:
+            self.conexao.execute(
+                """
+                INSERT INTO falhas (chave, nome, link, tentativas, motivo, proxima_tentativa, quarentena, atualizado)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(chave) DO UPDATE SET
+                    nome = COALESCE(NULLIF(excluded.nome, ''), falhas.nome),
+                    tentativas = excluded.tentativas,
+                    motivo = excluded.motivo,
+                    proxima_tentativa = excluded.proxima_tentativa,
+                    quarentena = excluded.quarentena,
+                    atualizado = excluded.atualizado
+                """,
+                (lead["chave"], lead.get("nome"), lead.get("link"), tentativas, motivo,
+                 proxima_tentativa, quarentena, time.time()),
+            )
+            self._commit()
+
+    def limpar_falhas(self, lead):
+        """O lead terminou bem: esquece as falhas anteriores"""
+        with self.trava:
+            self.conexao.execute("DELETE FROM falhas WHERE chave = ?", (lead["chave"],))
+
+    def adiados(self):
+        """chave -> instante da próxima tentativa dos leads que aguardam nova tentativa"""
+        with self.trava:
+            linhas = self.conexao.execute(
+                "SELECT chave, proxima_tentativa FROM falhas WHERE quarentena = 0 AND proxima_tentativa IS NOT NULL"
+            ).fetchall()
+        return dict(linhas)
+
+    def quarentena(self):
+        """Leads em quarentena (dicts com chave, nome, link, motivo, tentativas, instante)"""
+        with self.trava:
+            linhas = self.conexao.execute(
+                "SELECT chave, nome, link, motivo, tentativas, atualizado FROM falhas "
+                "WHERE quarentena = 1 ORDER BY atualizado"
+            ).fetchall()
+        return [{"chave": chave, "nome": nome, "link": link, "motivo": motivo,
+                 "tentativas": tentativas, "instante": instante}
+                for chave, nome, link, motivo, tentativas, instante in linhas]
+
+    def liberar_quarentena(self):
+        """Devolve os leads da quarentena para a próxima colheita. Retorna as chaves liberadas"""
+        with self.trava:
+            chaves = [linha[0] for linha in
+                      self.conexao.execute("SELECT chave FROM falhas WHERE quarentena = 1").fetchall()]
+            for chave in chaves:
+                self.conexao.execute("UPDATE leads SET concluido = 0, resultado = NULL WHERE chave = ?", (chave,))
+                self.conexao.execute("DELETE FROM falhas WHERE chave = ?", (chave,))
+            self._commit()
+        return chaves
+
+    def _commit(self):
+        self.conexao.commit()
+        self.pendentes = 0
+        self.ultimo_commit = time.monotonic()
+
+    def fechar(self):
+        """Grava o que estiver pendente e fecha o banco"""
+        with self.trava:
+            self._commit()
+            self.conexao.close()
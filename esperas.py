@@ -0,0 +1,389 @@
+"""
+Motor de esperas por condição - RD Station / WhatsApp Web
+
+Substitui os time.sleep fixos do bot por condições de prontidão nomeadas.
+Cada condição tem seu próprio timeout e intervalo de verificação, e o motor
+registra quanto tempo cada espera realmente levou.
+"""
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import (
+    TimeoutException,
+    NoSuchElementException,
+    StaleElementReferenceException,
+    JavascriptException,
+)
+import copy
+import time
+import logging
+
+from aba_whatsapp import SCRIPT_LER_URL_CAPTURADA
+from snapshot_pipeline import capturar_leads
+
+logger = logging.getLogger(__name__)
+
+# Seletores usados pelas condições
+SELETOR_CAIXA_MENSAGEM = "div[contenteditable='true'][data-tab='10']"
+
+# Caixa de mensagem do chat atual, ignorando a do chat anterior marcada por
+# SCRIPT_ABRIR_CHAT (data-bot-anterior) quando a aba do WhatsApp é reaproveitada
+SCRIPT_CAIXA_MENSAGEM = """
+var caixas = document.querySelectorAll(arguments[0]);
+for (var i = 0; i < caixas.length; i++) {
+    if (!caixas[i].closest('[data-bot-anterior]')) return caixas[i];
+}
+return null;
+"""
+
+# Mensagens do diálogo de número inválido do WhatsApp (português e inglês), em
+# minúsculas. O texto do diálogo é comparado em minúsculas e com os espaços
+# normalizados; só frases completas, para nenhum outro diálogo ser confundido
+# com número inválido (o lead iria para 'Declinado')
+TEXTOS_NUMERO_INVALIDO = [
+    "número de telefone compartilhado por url é inválido",
+    "número de telefone compartilhado via url é inválido",
+    "phone number shared via url is invalid",
+    "não está no whatsapp",
+    "not on whatsapp",
+]
+
+# Detector do chat numa única consulta: caixa de mensagem do chat atual
+# ('valido') ou diálogo com um dos textos de número inválido ('invalido',
+# devolvendo o botão OK). Só olha os diálogos, nunca serializa a página inteira
+SCRIPT_CHAT_WHATSAPP = """
+var seletorCaixa = arguments[0], textos = arguments[1];
+var caixas = document.querySelectorAll(seletorCaixa);
+for (var i = 0; i < caixas.length; i++) {
+    if (!caixas[i].closest('[data-bot-anterior]')) return ['valido', caixas[i]];
+}
+var dialogos = document.querySelectorAll(
+    '[role="dialog"], [data-animate-modal-popup="true"], div[class*="modal"]');
+for (var d = 0; d < dialogos.length; d++) {
+    var conteudo = (dialogos[d].textContent || '').toLowerCase().replace(/\\s+/g, ' ');
+    for (var t = 0; t < textos.length; t++) {
+        if (conteudo.indexOf(textos[t]) === -1) continue;
+        var botoes = dialogos[d].querySelectorAll('button, [role="button"]');
+        for (var b = 0; b < botoes.length; b++) {
+            var rotulo = (botoes[b].textContent || '').trim().toUpperCase();
+            if (rotulo === 'OK') return ['invalido', botoes[b]];
+        }
+        return ['invalido', botoes.length ? botoes[botoes.length - 1] : dialogos[d]];
+    }
+}
+return null;
+"""
+
+# Verifica se a primeira coluna do pipeline já tem cards renderizados
+SCRIPT_PIPELINE_RENDERIZADO = """
+var raiz = document.querySelector('#mfe-crm-deals-sales-pipeline') || document;
+var secao = raiz.querySelector('section');
+if (!secao) return false;
+return secao.querySelectorAll('div').length > 0;
+"""
+
+# Painel de detalhes do lead aberto, com a lista de etapas, e que não seja o
+# painel anterior marcado por uma navegação SPA (data-bot-anterior)
+SCRIPT_DRAWER_ABERTO = """
+var detalhes = document.querySelector('#mfe-crm-deal-details');
+if (!detalhes || detalhes.querySelector('[data-bot-anterior]')) return null;
+return detalhes.querySelector('ul > li button') ? detalhes : null;
+"""
+
+# Pipeline renderizado e sem painel de detalhes por cima
+SCRIPT_QUADRO_PRONTO = """
+var raiz = document.querySelector('#mfe-crm-deals-sales-pipeline') || document;
+var secao = raiz.querySelector('section');
+if (!secao || !secao.querySelectorAll('div').length) return false;
+var detalhes = document.querySelector('#mfe-crm-deal-details');
+if (!detalhes || !detalhes.children.length) return true;
+var rect = detalhes.getBoundingClientRect();
+return rect.width === 0 || rect.height === 0;
+"""
+
+# Estado da sessão do RD Station: 'logado', 'deslogado' ou null (ainda carregando)
+SCRIPT_LOGIN_RDSTATION = """
+if (document.querySelector('#mfe-crm-deals-sales-pipeline section')) return 'logado';
+if (document.querySelector('input[type="password"]') ||
+    /accounts\\.|\\/login|sign_in/.test(location.href)) return 'deslogado';
+return null;
+"""
+
+# Estado da sessão do WhatsApp Web: lista de conversas = logado, QR code = deslogado
+SCRIPT_LOGIN_WHATSAPP = """
+if (document.querySelector('#pane-side, [data-testid="chat-list"], ' +
+        'div[aria-label="Chat list"], div[aria-label="Lista de conversas"]')) return 'logado';
+if (document.querySelector('canvas[aria-label*="Scan"], canvas[aria-label*="scan"], ' +
+        'canvas[aria-label*="QR"], div[data-ref] canvas, [data-testid="qrcode"]')) return 'deslogado';
+return null;
+"""
+
+# Verifica se a aba de etapa com o rótulo informado está marcada como ativa,
+# se a lista de etapas mudou desde a assinatura capturada antes do clique,
+# ou se apareceu um diálogo pedindo confirmação da mudança
+SCRIPT_ETAPA_ALTERADA = """
+var rotulo = arguments[0];
+var assinaturaAnterior = arguments[1];
+var raiz = document.querySelector('#mfe-crm-deal-details');
+if (!raiz) return false;
+var itens = raiz.querySelectorAll('ul > li');
+var assinatura = [];
+for (var i = 0; i < itens.length; i++) {
+    var botao = itens[i].querySelector('button');
+    assinatura.push(itens[i].className + '|' + (botao ? botao.className + '|' +
+        botao.getAttribute('aria-pressed') + '|' + botao.disabled : ''));
+}
+if (assinaturaAnterior && assinatura.join(';') !== assinaturaAnterior) return true;
+var botoesDialogo = document.querySelectorAll(
+    '[role="dialog"] button, [class*="modal"] button, [class*="Modal"] button');
+for (var k = 0; k < botoesDialogo.length; k++) {
+    var texto = botoesDialogo[k].textContent.trim();
+    if (texto === 'Confirmar' || texto === 'Salvar') return true;
+}
+var fortes = raiz.querySelectorAll('ul > li strong');
+for (var j = 0; j < fortes.length; j++) {
+    if (fortes[j].textContent.indexOf(rotulo) === -1) continue;
+    var el = fortes[j];
+    while (el && el !== raiz) {
+        var atual = el.getAttribute('aria-current');
+        if ((atual && atual !== 'false') ||
+            el.getAttribute('aria-selected') === 'true' ||
+            el.getAttribute('aria-pressed') === 'true') return true;
+        if (el.tagName === 'LI') break;
+        el = el.parentElement;
+    }
+}
+return false;
+"""
+
+# Assinatura da lista de etapas (mesmo formato usado em SCRIPT_ETAPA_ALTERADA)
+SCRIPT_ASSINATURA_ETAPAS = """
+var raiz = document.querySelector('#mfe-crm-deal-details');
+if (!raiz) return '';
+var itens = raiz.querySelectorAll('ul > li');
+var assinatura = [];
+for (var i = 0; i < itens.length; i++) {
+    var botao = itens[i].querySelector('button');
+    assinatura.push(itens[i].className + '|' + (botao ? botao.className + '|' +
+        botao.getAttribute('aria-pressed') + '|' + botao.disabled : ''));
+}
+return assinatura.join(';');
+"""
+
+# Procura o diálogo de erro do WhatsApp (número inválido)
+XPATH_DIALOGO_ERRO = (
+    "//div[contains(@role, 'dialog') or contains(@class, 'modal')]"
+    "//button[text()='OK' or text()='Ok']"
+)
+
+
+class CondicaoProntidao:
+    """Condição nomeada que indica quando a página está pronta para o próximo passo"""
+
+    def __init__(self, nome, verificar, timeout=10, intervalo=0.25, descricao=""):
+        self.nome = nome
+        self.verificar = verificar
+        self.timeout = timeout
+        self.intervalo = intervalo
+        self.descricao = descricao or nome
+
+
+# ---------------------------------------------------------------------------
+# Condições padrão do bot
+# ---------------------------------------------------------------------------
+
+def _drawer_aberto(driver):
+    """Painel de detalhes do lead aberto e com a lista de etapas renderizada"""
+    return driver.execute_script(SCRIPT_DRAWER_ABERTO) or False
+
+
+def _caixa_mensagem(driver):
+    return driver.execute_script(SCRIPT_CAIXA_MENSAGEM, SELETOR_CAIXA_MENSAGEM)
+
+
+def _chat_whatsapp_pronto(driver):
+    """
+    Chat carregado: ('valido', caixa de mensagem) ou ('invalido', botão OK do
+    diálogo de número inválido), o que aparecer primeiro
+    """
+    resultado = driver.execute_script(SCRIPT_CHAT_WHATSAPP, SELETOR_CAIXA_MENSAGEM, TEXTOS_NUMERO_INVALIDO)
+    return tuple(resultado) if resultado else False
+
+
+def _mensagem_enviada(driver):
+    """Caixa de mensagem vazia após o ENTER (mensagem saiu da caixa)"""
+    caixa = _caixa_mensagem(driver)
+    return bool(caixa) and not caixa.text.strip()
+
+
+def _dialogo_fechado(driver):
+    """Nenhum diálogo de erro do WhatsApp visível"""
+    return not driver.find_elements(By.XPATH, XPATH_DIALOGO_ERRO)
+
+
+def _etapa_alterada(driver, rotulo="", assinatura_anterior=""):
+    """Aba de etapa trocada no painel de detalhes do lead"""
+    return bool(driver.execute_script(SCRIPT_ETAPA_ALTERADA, rotulo, assinatura_anterior))
+
+
+def _pipeline_renderizado(driver):
+    """Coluna 'Entrada de Leads' renderizada no pipeline"""
+    return bool(driver.execute_script(SCRIPT_PIPELINE_RENDERIZADO))
+
+
+def _quadro_pronto(driver):
+    """Pipeline visível, sem o painel de detalhes do lead por cima"""
+    return bool(driver.execute_script(SCRIPT_QUADRO_PRONTO))
+
+
+def _coluna_cresceu(driver, quantidade_antes=0):
+    """Mais cards carregados na coluna após a rolagem"""
+    leads = capturar_leads(driver)
+    return leads if len(leads) > quantidade_antes else False
+
+
+def _login_rdstation(driver):
+    """Sessão do RD Station identificada (logado ou tela de login)"""
+    return driver.execute_script(SCRIPT_LOGIN_RDSTATION) or False
+
+
+def _login_whatsapp(driver):
+    """Sessão do WhatsApp Web identificada (lista de conversas ou QR code)"""
+    return driver.execute_script(SCRIPT_LOGIN_WHATSAPP) or False
+
+
+def _nova_aba(driver, abas_antes=1):
+    """Uma nova aba foi aberta pelo navegador"""
+    handles = driver.window_handles
+    return handles if len(handles) > abas_antes else False
+
+
+def _abertura_whatsapp(driver, abas_antes=1):
+    """
+    Botão do WhatsApp no CRM acionado: ('url', url) se a abertura foi capturada
+    na própria aba, ('aba', handles) se mesmo assim uma aba nova abriu
+    """
+    url = driver.execute_script(SCRIPT_LER_URL_CAPTURADA)
+    if url:
+        return ("url", url)
+    handles = driver.window_handles
+    return ("aba", handles) if len(handles) > abas_antes else False
+
+
+CONDICOES_PADRAO = [
+    CondicaoProntidao("drawer_aberto", _drawer_aberto, timeout=10, intervalo=0.2,
+                      descricao="painel de detalhes do lead aberto"),
+    CondicaoProntidao("chat_whatsapp", _chat_whatsapp_pronto, timeout=30, intervalo=0.25,
+                      descricao="chat do WhatsApp carregado ou número inválido"),
+    CondicaoProntidao("mensagem_enviada", _mensagem_enviada, timeout=10, intervalo=0.2,
+                      descricao="mensagem saiu da caixa de texto"),
+    CondicaoProntidao("dialogo_fechado", _dialogo_fechado, timeout=5, intervalo=0.2,
+                      descricao="diálogo de erro fechado"),
+    CondicaoProntidao("etapa_alterada", _etapa_alterada, timeout=8, intervalo=0.2,
+                      descricao="aba de etapa trocada"),
+    CondicaoProntidao("pipeline_renderizado", _pipeline_renderizado, timeout=20, intervalo=0.25,
+                      descricao="coluna do pipeline renderizada"),
+    CondicaoProntidao("quadro_pronto", _quadro_pronto, timeout=5, intervalo=0.2,
+                      descricao="pipeline visível sem painel de detalhes"),
+    CondicaoProntidao("coluna_cresceu", _coluna_cresceu, timeout=2, intervalo=0.3,
+                      descricao="mais cards carregados na coluna"),
+    CondicaoProntidao("login_rdstation", _login_rdstation, timeout=30, intervalo=0.5,
+                      descricao="sessão do RD Station identificada"),
+    CondicaoProntidao("login_whatsapp", _login_whatsapp, timeout=60, intervalo=1,
+                      descricao="sessão do WhatsApp Web identificada"),
+    CondicaoProntidao("nova_aba", _nova_aba, timeout=10, intervalo=0.1,
+                      descricao="nova aba aberta"),
+    CondicaoProntidao("abertura_whatsapp", _abertura_whatsapp, timeout=10, intervalo=0.1,
+                      descricao="botão do WhatsApp acionado no CRM"),
+]
+
+
+class MotorEsperas:
+    """Central de esperas: aguarda condições nomeadas e mede quanto cada uma levou"""
+
+    def __init__(self, driver, condicoes=None):
+        self.driver = driver
+        self.condicoes = {}
+        self.historico = []  # lista de (nome, duracao, sucesso)
+
+        # Copia as condições para que ajustes de timeout não alterem as padrão
+        for condicao in (condicoes if condicoes is not None else CONDICOES_PADRAO):
+            self.registrar(copy.copy(condicao))
+
+    def registrar(self, condicao):
+        """Registra (ou substitui) uma condição de prontidão"""
+        self.condicoes[condicao.nome] = condicao
+
+    def configurar(self, nome, timeout=None, intervalo=None):
+        """Ajusta timeout e/ou intervalo de uma condição já registrada"""
+        condicao = self.condicoes[nome]
+        if timeout is not None:
+            condicao.timeout = timeout
+        if intervalo is not None:
+            condicao.intervalo = intervalo
+
+    def aguardar(self, nome, timeout=None, obrigatoria=False, **parametros):
+        """
+        Aguarda a condição 'nome' ficar verdadeira.
+
+        Retorna o valor produzido pela condição (ex: o elemento encontrado),
+        ou None em caso de timeout. Se 'obrigatoria' for True, o timeout
+        levanta TimeoutException.
+        """
+        condicao = self.condicoes[nome]
+        limite = condicao.timeout if timeout is None else timeout
+
+        espera = WebDriverWait(
+            self.driver,
+            limite,
+            poll_frequency=condicao.intervalo,
+            ignored_exceptions=(NoSuchElementException,
+                                StaleElementReferenceException,
+                                JavascriptException),
+        )
+
+        inicio = time.monotonic()
+        try:
+            resultado = espera.until(lambda driver: condicao.verificar(driver, **parametros))
+            duracao = time.monotonic() - inicio
+            self.historico.append((nome, duracao, True))
+            logger.info(f"⏱️ Espera '{nome}' ok em {duracao:.2f}s (limite {limite}s)")
+            return resultado
+        except TimeoutException:
+            duracao = time.monotonic() - inicio
+            self.historico.append((nome, duracao, False))
+            logger.warning(f"⏱️ Espera '{nome}' esgotou após {duracao:.2f}s ({condicao.descricao})")
+            if obrigatoria:
+                raise
+            return None
+
+    def resumo(self):
+        """Retorna estatísticas por condição: quantidade, timeouts, média e máximo"""
+        estatisticas = {}
+        for nome, duracao, sucesso in self.historico:
+            item = estatisticas.setdefault(nome, {
+                "quantidade": 0, "timeouts": 0, "total": 0.0, "maximo": 0.0
+            })
+            item["quantidade"] += 1
+            item["total"] += duracao
+            item["maximo"] = max(item["maximo"], duracao)
+            if not sucesso:
+                item["timeouts"] += 1
+
+        for item in estatisticas.values():
+            item["media"] = item["total"] / item["quantidade"]
+        return estatisticas
+
+    def registrar_resumo(self):
+        """Escreve no log o resumo das esperas"""
+        estatisticas = self.resumo()
+        if not estatisticas:
+            return
+
+        logger.info("⏱️ Tempo real gasto em esperas:")
+        for nome, item in sorted(estatisticas.items(), key=lambda par: -par[1]["total"]):
+            logger.info(
+                f"   {nome}: {item['quantidade']}x, média {item['media']:.2f}s, "
+                f"máx {item['maximo']:.2f}s, total {item['total']:.1f}s, "
+                f"timeouts {item['timeouts']}"
+            )
@@ -0,0 +1,99 @@
+"""
+Etapas do funil no painel do lead - mapa nome → posição lido uma vez por sessão
+
+A lista de etapas do painel de detalhes (#mfe-crm-deal-details ul > li) é a
+mesma para todos os leads do funil. Em vez de procurar a aba de cada etapa com
+seletores fixos (li:nth-child(2), li:nth-child(7)) a cada mudança, o bot lê a
+lista uma vez, guarda a posição de cada etapa e clica na aba certa numa única
+chamada JavaScript, que também confere o rótulo antes do clique (se o funil
+mudou, o mapa é relido).
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Posições conhecidas no funil da conta, usadas só se o mapa não puder ser lido
+POSICOES_PADRAO = {"Contato Realizado": 2, "Declinado": 7}
+
+# Rótulos das etapas, na ordem da lista do painel do lead
+SCRIPT_MAPA_ETAPAS = """
+var raiz = document.querySelector('#mfe-crm-deal-details');
+if (!raiz) return [];
+var itens = raiz.querySelectorAll('ul > li');
+var rotulos = [];
+for (var i = 0; i < itens.length; i++) {
+    var forte = itens[i].querySelector('strong');
+    var botao = itens[i].querySelector('button');
+    rotulos.push(((forte || botao || itens[i]).textContent || '').trim());
+}
+return rotulos;
+"""
+
+# Localiza a aba da etapa (posição arguments[0], rótulo arguments[1]) e clica
+# nela, a não ser que arguments[2] peça só para localizar. Devolve [estado,
+# assinatura da lista antes do clique]: 'ativa' (lead já está nela), 'clicou',
+# 'localizou', 'divergente' (a posição tem outro rótulo) ou 'ausente'
+SCRIPT_CLICAR_ETAPA = """
+var posicao = arguments[0], rotulo = arguments[1], apenasLocalizar = arguments[2];
+var raiz = document.querySelector('#mfe-crm-deal-details');
+if (!raiz) return ['ausente', ''];
+var itens = raiz.querySelectorAll('ul > li');
+var item = itens[posicao - 1];
+if (!item) return ['ausente', ''];
+var botao = item.querySelector('button');
+if (!botao) return ['ausente', ''];
+if ((item.textContent || '').indexOf(rotulo) === -1) return ['divergente', ''];
+var assinatura = [];
+for (var i = 0; i < itens.length; i++) {
+    var b = itens[i].querySelector('button');
+    assinatura.push(itens[i].className + '|' + (b ? b.className + '|' +
+        b.getAttribute('aria-pressed') + '|' + b.disabled : ''));
+}
+var el = botao;
+while (el && el !== raiz) {
+    var atual = el.getAttribute('aria-current');
+    if ((atual && atual !== 'false') || el.getAttribute('aria-selected') === 'true' ||
+            el.getAttribute('aria-pressed') === 'true') return ['ativa', assinatura.join(';')];
+    if (el === item) break;
+    el = el.parentElement;
+}
+if (apenasLocalizar) return ['localizou', assinatura.join(';')];
+botao.scrollIntoView({block: 'center'});
+botao.click();
+return ['clicou', assinatura.join(';')];
+"""
+
+
+class MapaEtapas:
+    """Posição (1, 2, ...) de cada etapa na lista do painel do lead, lida uma vez"""
+
+    def __init__(self):
+        self.posicoes = None  # rótulo -> posição
+        self.leituras = 0
+
+    def resolver(self, driver):
+        """Lê a lista de etapas do painel aberto (se ainda não leu). Retorna o mapa"""
+        if self.posicoes is None:
+            rotulos = driver.execute_script(SCRIPT_MAPA_ETAPAS) or []
+            self.leituras += 1
+            if any(rotulos):
+                self.posicoes = {rotulo: indice + 1 for indice, rotulo in enumerate(rotulos) if rotulo}
+                logger.info(f"🗂️ Etapas do funil: {', '.join(r for r in rotulos if r)}")
+        return self.posicoes or {}
+
+    def posicao(self, driver, rotulo):
+        """Posição da etapa no painel (mapa lido, rótulo parcial ou padrão conhecido)"""
+        posicoes = self.resolver(driver)
+        if rotulo in posicoes:
+            return posicoes[rotulo]
+        for nome, posicao in posicoes.items():
+            if rotulo.lower() in nome.lower():
+                return posicao
+        return POSICOES_PADRAO.get(rotulo) if not posicoes else None
+
+    def invalidar(self):
+        """Esquece o mapa (o funil mudou): a próxima mudança relê a lista"""
+        if self.posicoes is not None:
+            logger.warning("⚠️ A lista de etapas mudou - relendo o mapa de etapas")
+        self.posicoes = None
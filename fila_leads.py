@@ -0,0 +1,170 @@
+"""
+Fila de leads colhidos da coluna 'Entrada de Leads'
+
+A coluna é lida uma vez (colheita) e os leads vão para uma fila em memória,
+indexada pelo id da negociação (ou pelo link). O bot abre cada lead direto pela
+URL e só volta a ler a coluna quando a fila esvazia ou quando passa o
+intervalo de colheita configurado.
+
+Leads já pré-qualificados durante a pausa entre envios (têm WhatsApp) ficam numa
+fila à parte, que é atendida primeiro.
+
+Um lead que termina com erro sai da fila por um tempo (espera exponencial da
+PoliticaRetentativa) e volta para o fim dela quando a espera acaba; a colheita
+não o traz de volta antes disso.
+
+A fila pode ser compartilhada por vários bots (pool de contas): todas as
+operações são protegidas por trava, então um lead nunca é entregue a dois bots.
+"""
+
+from collections import OrderedDict
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def chave_lead(lead):
+    """Chave única do lead: id da negociação, link ou, em último caso, o nome"""
+    return lead.get("id") or lead.get("link") or f"nome:{lead.get('nome', '')}"
+
+
+class PoliticaRetentativa:
+    """Quantas vezes um lead com erro é tentado e quanto esperar entre as tentativas"""
+
+    def __init__(self, max_tentativas=3, espera_inicial=120, fator=2, espera_maxima=3600):
+        """
+        max_tentativas: tentativas com erro antes da quarentena
+        espera_inicial: segundos até a segunda tentativa
+        fator: multiplicador da espera a cada nova falha
+        espera_maxima: teto da espera (segundos)
+        """
+        self.max_tentativas = max_tentativas
+        self.espera_inicial = espera_inicial
+        self.fator = fator
+        self.espera_maxima = espera_maxima
+
+    def espera(self, tentativas):
+        """Segundos até a próxima tentativa depois de 'tentativas' falhas, ou None se acabaram"""
+        if tentativas >= self.max_tentativas:
+            return None
+        return min(self.espera_inicial * self.fator ** (tentativas - 1), self.espera_maxima)
+
+
+class FilaLeads:
+    """Fila de trabalho dos leads, sem repetir negociações já processadas"""
+
+    def __init__(self, intervalo_colheita=300):
+        self.intervalo_colheita = intervalo_colheita
+        self.pendentes = OrderedDict()  # chave -> lead
+        self.prequalificados = OrderedDict()  # chave -> lead com WhatsApp confirmado
+        self.processados = set()
+        self.em_andamento = set()  # retirados da fila e ainda não concluídos
+        self.adiados = {}  # chave -> [instante da próxima tentativa, lead (None até a colheita trazê-lo)]
+        self.ultima_colheita = None
+        self.geracao = 0  # muda a cada colheita
+        self.trava = threading.RLock()
+        self.trava_colheita = threading.Lock()  # só um bot colhe por vez
+
+    def __len__(self):
+        with self.trava:
+            return len(self.pendentes) + len(self.prequalificados)
+
+    def precisa_colher(self):
+        """A coluna deve ser lida de novo se a fila esvaziou ou se o intervalo passou"""
+        if not len(self) or self.ultima_colheita is None:
+            return True
+        if self.intervalo_colheita is None:
+            return False
+        return time.monotonic() - self.ultima_colheita >= self.intervalo_colheita
+
+    def adicionar(self, leads):
+        """Acrescenta à fila os leads ainda desconhecidos. Retorna quantos entraram"""
+        novos = 0
+        with self.trava:
+            for lead in leads:
+                chave = chave_lead(lead)
+                if (chave in self.pendentes or chave in self.prequalificados or
+                        chave in self.processados or chave in self.em_andamento):
+                    continue
+                # O WebElement fica obsoleto assim que a página muda - não guardamos
+                registro = {k: v for k, v in lead.items() if k != "elemento"}
+                registro["chave"] = chave
+                if chave in self.adiados:
+                    # Aguardando nova tentativa (agendada numa execução anterior)
+                    if self.adiados[chave][1] is None:
+                        self.adiados[chave][1] = registro
+                    continue
+                self.pendentes[chave] = registro
+                novos += 1
+
+            self.ultima_colheita = time.monotonic()
+            self.geracao += 1
+        logger.info(f"📥 Colheita: {novos} leads novos, {len(self)} na fila")
+        return novos
+
+    def proximo(self):
+        """Retira o próximo lead da fila, dando preferência aos pré-qualificados"""
+        with self.trava:
+            if self.prequalificados:
+                _, lead = self.prequalificados.popitem(last=False)
+                self.em_andamento.add(lead["chave"])
+                return lead
+            return self.proximo_para_prequalificar()
+
+    def proximo_para_prequalificar(self):
+        """Retira o próximo lead ainda não qualificado (ou None se não houver)"""
+        with self.trava:
+            self._liberar_adiados()
+            if not self.pendentes:
+                return None
+            _, lead = self.pendentes.popitem(last=False)
+            self.em_andamento.add(lead["chave"])
+            return lead
+
+    def adiantar(self, lead):
+        """Coloca um lead com WhatsApp confirmado na frente da fila"""
+        with self.trava:
+            self.em_andamento.discard(lead["chave"])
+            self.prequalificados[lead["chave"]] = lead
+
+    def adiar(self, lead, instante):
+        """Tira o lead da fila até o instante (timestamp) da próxima tentativa"""
+        with self.trava:
+            self.em_andamento.discard(lead["chave"])
+            self.adiados[lead["chave"]] = [instante, lead]
+
+    def agendar(self, espera_ate):
+        """Leads adiados numa execução anterior (chave -> instante): a colheita não os traz antes da hora"""
+        with self.trava:
+            for chave, instante in espera_ate.items():
+                self.adiados.setdefault(chave, [instante, None])
+
+    def _liberar_adiados(self):
+        """Devolve ao fim da fila os leads cuja espera acabou"""
+        agora = time.time()
+        for chave, (instante, lead) in list(self.adiados.items()):
+            if instante <= agora:
+                del self.adiados[chave]
+                if lead is not None:
+                    self.pendentes[chave] = lead
+
+    def proxima_liberacao(self):
+        """Instante em que o próximo lead adiado (já colhido) volta à fila, ou None"""
+        with self.trava:
+            instantes = [instante for instante, lead in self.adiados.values() if lead is not None]
+        return min(instantes) if instantes else None
+
+    def devolver(self, lead):
+        """Devolve um lead interrompido para a frente da fila: ele é o próximo a sair"""
+        with self.trava:
+            self.em_andamento.discard(lead["chave"])
+            self.pendentes[lead["chave"]] = lead
+            self.pendentes.move_to_end(lead["chave"], last=False)
+
+    def concluir(self, lead):
+        """Marca o lead como processado para que nenhuma colheita o traga de volta"""
+        with self.trava:
+            self.em_andamento.discard(lead["chave"])
+            self.processados.add(lead["chave"])
@@ -0,0 +1,208 @@
+"""
+Limitador de envio de mensagens (anti-banimento)
+
+Substitui o time.sleep(600) fixo por uma política configurável:
+- balde de fichas (token bucket) com rajada
+- atraso aleatório (jitter) após cada envio
+- limites por hora e por dia
+- janelas de horário comercial
+
+O estado (fichas, envios recentes) é salvo em disco, então reiniciar o bot não
+zera a contagem. O bot pergunta "quando posso enviar?" em vez de dormir às cegas.
+"""
+
+from datetime import datetime, timedelta
+import json
+import os
+import random
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_ESTADO_PADRAO = "limitador_estado.json"
+
+
+class PoliticaEnvio:
+    """Configuração do ritmo de envio"""
+
+    def __init__(self, intervalo=600, rajada=1, jitter=0, limite_hora=None,
+                 limite_dia=None, janelas=None, dias_semana=None):
+        """
+        intervalo: segundos para repor uma ficha no balde
+        rajada: capacidade do balde (envios seguidos permitidos)
+        jitter: atraso aleatório máximo (segundos) sorteado após cada envio
+        limite_hora / limite_dia: máximo de envios na última hora / no dia (None = sem limite)
+        janelas: lista de ("HH:MM", "HH:MM") com os horários permitidos (None = qualquer hora)
+        dias_semana: dias permitidos, 0 = segunda ... 6 = domingo (None = todos)
+        """
+        self.intervalo = intervalo
+        self.rajada = rajada
+        self.jitter = jitter
+        self.limite_hora = limite_hora
+        self.limite_dia = limite_dia
+        self.janelas = janelas
+        self.dias_semana = set(dias_semana) if dias_semana is not None else None
+
+
+def _minutos(horario):
+    horas, minutos = horario.split(":")
+    return int(horas) * 60 + int(minutos)
+
+
+def ler_janela(texto):
+    """'08:00-12:00' → ("08:00", "12:00") (linha de comando)"""
+    inicio, fim = (parte.strip() for parte in texto.split("-"))
+    if not 0 <= _minutos(inicio) < _minutos(fim) <= 24 * 60:
+        raise ValueError(f"janela inválida: {texto}")
+    return inicio, fim
+
+
+def ler_dias_semana(texto):
+    """'0-4' ou '0,2,4' → conjunto de dias, 0 = segunda (linha de comando)"""
+    dias = set()
+    for parte in texto.split(","):
+        inicio, _, fim = parte.partition("-")
+        dias.update(range(int(inicio), int(fim or inicio) + 1))
+    if not dias or not dias <= set(range(7)):
+        raise ValueError(f"dias inválidos: {texto}")
+    return dias
+
+
+class LimitadorEnvio:
+    """Responde quando o próximo envio é permitido e registra os envios feitos"""
+
+    def __init__(self, politica=None, caminho=ARQUIVO_ESTADO_PADRAO):
+        self.politica = politica or PoliticaEnvio()
+        self.caminho = caminho
+        self.estado = {
+            "fichas": float(self.politica.rajada),
+            "atualizado": time.time(),
+            "envios": [],
+            "jitter": 0.0,
+        }
+        self.carregar()
+
+    def carregar(self):
+        """Carrega o estado salvo (fichas e envios recentes)"""
+        if not self.caminho or not os.path.exists(self.caminho):
+            return
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as arquivo:
+                self.estado.update(json.load(arquivo))
+            self.estado["fichas"] = min(self.estado["fichas"], float(self.politica.rajada))
+            logger.info(f"📂 Estado do limitador carregado: {self.enviados_hoje()} envios hoje")
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível ler {self.caminho}: {e}")
+
+    def salvar(self):
+        """Grava o estado em disco"""
+        if not self.caminho:
+            return
+        try:
+            temporario = self.caminho + ".tmp"
+            with open(temporario, "w", encoding="utf-8") as arquivo:
+                json.dump(self.estado, arquivo)
+            os.replace(temporario, self.caminho)
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível salvar {self.caminho}: {e}")
+
+    # ------------------------------------------------------------------
+    # Balde de fichas
+    # ------------------------------------------------------------------
+
+    def _fichas(self, agora):
+        """Fichas disponíveis no instante 'agora'"""
+        decorrido = max(agora - self.estado["atualizado"], 0)
+        repostas = decorrido / self.politica.intervalo if self.politica.intervalo else float("inf")
+        return min(float(self.politica.rajada), self.estado["fichas"] + repostas)
+
+    def _ficha_disponivel_em(self):
+        """Instante em que o balde volta a ter uma ficha inteira (pode estar no passado)"""
+        fichas = self.estado["fichas"]
+        if fichas >= 1 or not self.politica.intervalo:
+            return self.estado["atualizado"]
+        return self.estado["atualizado"] + (1 - fichas) * self.politica.intervalo
+
+    # ------------------------------------------------------------------
+    # Limites e janelas
+    # ------------------------------------------------------------------
+
+    def enviados_hoje(self, agora=None):
+        """Quantidade de envios no dia (calendário local) de 'agora'"""
+        inicio_dia = datetime.fromtimestamp(agora or time.time()).replace(
+            hour=0, minute=0, second=0, microsecond=0).timestamp()
+        return sum(1 for envio in self.estado["envios"] if envio >= inicio_dia)
+
+    def _aplicar_limites(self, instante):
+        """Adia 'instante' até respeitar os limites por hora e por dia"""
+        politica = self.politica
+        envios = sorted(self.estado["envios"])
+
+        if politica.limite_hora:
+            na_hora = [e for e in envios if e > instante - 3600]
+            if len(na_hora) >= politica.limite_hora:
+                instante = max(instante, na_hora[-politica.limite_hora] + 3600)
+
+        if politica.limite_dia and self.enviados_hoje(instante) >= politica.limite_dia:
+            amanha = datetime.fromtimestamp(instante).replace(
+                hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+            instante = max(instante, amanha.timestamp())
+
+        return instante
+
+    def _aplicar_janelas(self, instante):
+        """Adia 'instante' até o início da próxima janela de horário permitida"""
+        politica = self.politica
+        if not politica.janelas and politica.dias_semana is None:
+            return instante
+
+        janelas = sorted((_minutos(i), _minutos(f)) for i, f in (politica.janelas or [("00:00", "23:59")]))
+        momento = datetime.fromtimestamp(instante)
+
+        for dias in range(8):
+            dia = (momento + timedelta(days=dias)).replace(hour=0, minute=0, second=0, microsecond=0)
+            if politica.dias_semana is not None and dia.weekday() not in politica.dias_semana:
+                continue
+            for inicio, fim in janelas:
+                abre = dia + timedelta(minutes=inicio)
+                fecha = dia + timedelta(minutes=fim)
+                if momento < fecha:
+                    return max(momento, abre).timestamp()
+
+        logger.warning("⚠️ Nenhuma janela de envio configurada nos próximos 7 dias")
+        return instante
+
+    # ------------------------------------------------------------------
+    # API usada pelo bot
+    # ------------------------------------------------------------------
+
+    def proximo_envio(self, agora=None):
+        """Instante (timestamp) a partir do qual o próximo envio é permitido"""
+        agora = agora or time.time()
+        instante = max(agora, self._ficha_disponivel_em() + self.estado["jitter"])
+
+        # Limites e janelas podem se empurrar mutuamente: repete até estabilizar
+        for _ in range(10):
+            ajustado = self._aplicar_janelas(self._aplicar_limites(instante))
+            if ajustado == instante:
+                break
+            instante = ajustado
+        return instante
+
+    def espera(self, agora=None):
+        """Segundos até o próximo envio permitido (0 se já pode enviar)"""
+        agora = agora or time.time()
+        return max(self.proximo_envio(agora) - agora, 0.0)
+
+    def registrar_envio(self, agora=None):
+        """Consome uma ficha, guarda o envio e sorteia o jitter do próximo"""
+        agora = agora or time.time()
+        self.estado["fichas"] = max(self._fichas(agora) - 1, 0.0)
+        self.estado["atualizado"] = agora
+        self.estado["jitter"] = random.uniform(0, self.politica.jitter) if self.politica.jitter else 0.0
+
+        # Mantém só os envios das últimas 48h (suficiente para os limites de hora e dia)
+        self.estado["envios"] = [e for e in self.estado["envios"] if e > agora - 48 * 3600]
+        self.estado["envios"].append(agora)
+        self.salvar()
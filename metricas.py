@@ -0,0 +1,188 @@
+"""
+Métricas por fase do processamento de cada lead
+
+Cada fase (abrir o lead, ler o nome, achar o botão do WhatsApp, abrir o chat,
+enviar, mudar a etapa, voltar ao quadro...) vira um intervalo cronometrado.
+Os intervalos são agregados em p50/p95/máximo por fase e exportados em dois
+formatos: JSON lines (um registro por intervalo, para análise posterior) e o
+formato texto do Prometheus (para o node_exporter textfile collector ou
+qualquer coletor que leia o arquivo). A exportação acontece no fim da execução
+e periodicamente durante execuções longas.
+"""
+
+from contextlib import contextmanager
+import functools
+import json
+import math
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_PADRAO = "metricas"
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) pelo método do posto mais próximo; None se vazio"""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posto = max(math.ceil(p / 100 * len(ordenados)), 1)
+    return ordenados[posto - 1]
+
+
+def _rotulos(**rotulos):
+    """Rótulos no formato do Prometheus: {a="1",b="2"}"""
+    itens = []
+    for chave, valor in rotulos.items():
+        valor = str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        itens.append(f'{chave}="{valor}"')
+    return "{" + ",".join(itens) + "}"
+
+
+class MetricasFases:
+    """Cronometra as fases de cada lead e exporta os agregados"""
+
+    def __init__(self, prefixo=PREFIXO_PADRAO, bot="bot", intervalo_exportacao=300):
+        """
+        prefixo: caminho base dos arquivos (<prefixo>.jsonl e <prefixo>.prom); None = não grava
+        bot: nome do bot, usado como rótulo (pool de contas)
+        intervalo_exportacao: segundos entre exportações durante a execução
+        """
+        self.prefixo = prefixo
+        self.bot = bot
+        self.intervalo_exportacao = intervalo_exportacao
+        self.duracoes = {}  # fase -> lista de durações
+        self.erros = {}  # fase -> quantidade de exceções
+        self.pendentes = []  # registros ainda não gravados no JSON lines
+        self.abertos = []  # pilha de intervalos em andamento (para anotar)
+        self.lead = None
+        self.ultima_exportacao = time.monotonic()
+        self.trava = threading.Lock()
+
+    def iniciar_lead(self, chave):
+        """Associa os próximos intervalos ao lead informado"""
+        self.lead = chave
+
+    @contextmanager
+    def fase(self, nome, **atributos):
+        """Cronometra o bloco como a fase 'nome'. Exceções são contadas e repassadas"""
+        registro = {"bot": self.bot, "lead": self.lead, "fase": nome, "inicio": time.time()}
+        registro.update(atributos)
+        self.abertos.append(registro)
+        inicio = time.monotonic()
+        ok = True
+        try:
+            yield registro
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.abertos.remove(registro)
+            registro["duracao"] = round(time.monotonic() - inicio, 4)
+            registro["ok"] = ok
+            with self.trava:
+                self.duracoes.setdefault(nome, []).append(registro["duracao"])
+                if not ok:
+                    self.erros[nome] = self.erros.get(nome, 0) + 1
+                self.pendentes.append(registro)
+
+    def anotar(self, **atributos):
+        """Acrescenta atributos (ex: método vencedor) ao intervalo mais interno em andamento"""
+        if self.abertos:
+            self.abertos[-1].update(atributos)
+
+    def resumo(self):
+        """Estatísticas por fase: quantidade, p50, p95, máximo, total e erros"""
+        with self.trava:
+            return {
+                fase: {
+                    "quantidade": len(duracoes),
+                    "p50": percentil(duracoes, 50),
+                    "p95": percentil(duracoes, 95),
+                    "maximo": max(duracoes),
+                    "total": sum(duracoes),
+                    "erros": self.erros.get(fase, 0),
+                }
+                for fase, duracoes in self.duracoes.items()
+            }
+
+    def registrar_resumo(self):
+        """Escreve no log o p50/p95/máximo de cada fase"""
+        estatisticas = self.resumo()
+        if not estatisticas:
+            return
+        logger.info("📊 Tempo por fase do lead:")
+        for fase, item in sorted(estatisticas.items(), key=lambda par: -par[1]["total"]):
+            logger.info(
+                f"   {fase}: {item['quantidade']}x, p50 {item['p50']:.2f}s, "
+                f"p95 {item['p95']:.2f}s, máx {item['maximo']:.2f}s, erros {item['erros']}"
+            )
+
+    def texto_prometheus(self):
+        """Agregados no formato texto de exposição do Prometheus"""
+        estatisticas = self.resumo()
+        linhas = [
+            "# HELP rdbot_fase_duracao_segundos Duração das fases do processamento de um lead",
+            "# TYPE rdbot_fase_duracao_segundos summary",
+        ]
+        for fase, item in sorted(estatisticas.items()):
+            for quantil, chave in (("0.5", "p50"), ("0.95", "p95")):
+                linhas.append(f"rdbot_fase_duracao_segundos{_rotulos(bot=self.bot, fase=fase, quantile=quantil)} "
+                              f"{item[chave]:.4f}")
+            linhas.append(f"rdbot_fase_duracao_segundos_sum{_rotulos(bot=self.bot, fase=fase)} {item['total']:.4f}")
+            linhas.append(f"rdbot_fase_duracao_segundos_count{_rotulos(bot=self.bot, fase=fase)} {item['quantidade']}")
+
+        linhas += [
+            "# HELP rdbot_fase_duracao_maxima_segundos Maior duração observada da fase",
+            "# TYPE rdbot_fase_duracao_maxima_segundos gauge",
+        ]
+        for fase, item in sorted(estatisticas.items()):
+            linhas.append(f"rdbot_fase_duracao_maxima_segundos{_rotulos(bot=self.bot, fase=fase)} {item['maximo']:.4f}")
+
+        linhas += [
+            "# HELP rdbot_fase_erros_total Fases interrompidas por exceção",
+            "# TYPE rdbot_fase_erros_total counter",
+        ]
+        for fase, item in sorted(estatisticas.items()):
+            linhas.append(f"rdbot_fase_erros_total{_rotulos(bot=self.bot, fase=fase)} {item['erros']}")
+        return "\n".join(linhas) + "\n"
+
+    def exportar(self):
+        """Acrescenta os intervalos novos ao JSON lines e regrava o arquivo do Prometheus"""
+        self.ultima_exportacao = time.monotonic()
+        if not self.prefixo:
+            return
+        with self.trava:
+            pendentes, self.pendentes = self.pendentes, []
+        try:
+            if pendentes:
+                with open(self.prefixo + ".jsonl", "a", encoding="utf-8") as arquivo:
+                    for registro in pendentes:
+                        arquivo.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+
+            # Escrita atômica: o coletor nunca lê um arquivo pela metade
+            temporario = self.prefixo + ".prom.tmp"
+            with open(temporario, "w", encoding="utf-8") as arquivo:
+                arquivo.write(self.texto_prometheus())
+            os.replace(temporario, self.prefixo + ".prom")
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível exportar as métricas ({self.prefixo}): {e}")
+
+    def exportar_se_preciso(self):
+        """Exporta se passou o intervalo desde a última exportação"""
+        if time.monotonic() - self.ultima_exportacao >= self.intervalo_exportacao:
+            self.exportar()
+
+
+def medir_fase(nome, **atributos):
+    """Decorador de método: cronometra cada chamada como a fase 'nome' em self.metricas"""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def medido(self, *args, **kwargs):
+            with self.metricas.fase(nome, **atributos):
+                return funcao(self, *args, **kwargs)
+        return medido
+    return decorador
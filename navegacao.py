@@ -0,0 +1,104 @@
+"""
+Navegação dentro do CRM sem recarregar a página
+
+O RD Station CRM é um conjunto de micro-frontends (mfe-crm-deals-sales-pipeline,
+mfe-crm-deal-details...). Um driver.get recarrega e reinicializa todos eles.
+Aqui ficam os scripts para fechar o painel do lead no lugar e para navegar pelo
+histórico do próprio app (pushState), além das estatísticas de tempo economizado.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Navega pelo roteador do app (history.pushState + popstate), sem recarregar.
+# Marca o conteúdo atual do painel de detalhes para que a espera saiba
+# distinguir o painel antigo do novo. Retorna false se o destino é de outra origem.
+SCRIPT_NAVEGAR_SPA = """
+var destino = new URL(arguments[0], location.href);
+if (destino.origin !== location.origin) return false;
+var detalhes = document.querySelector('#mfe-crm-deal-details');
+if (detalhes) {
+    for (var i = 0; i < detalhes.children.length; i++) {
+        detalhes.children[i].setAttribute('data-bot-anterior', '1');
+    }
+}
+var caminho = destino.pathname + destino.search + destino.hash;
+if (location.pathname + location.search + location.hash === caminho) return true;
+history.pushState(history.state, '', caminho);
+window.dispatchEvent(new PopStateEvent('popstate', {state: history.state}));
+return true;
+"""
+
+# Fecha o painel de detalhes do lead no lugar: botão de fechar ou tecla ESC
+SCRIPT_FECHAR_DETALHES = """
+var detalhes = document.querySelector('#mfe-crm-deal-details');
+if (!detalhes || !detalhes.children.length) return 'ausente';
+var seletores = [
+    'button[aria-label*="Fechar"]', 'button[aria-label*="fechar"]',
+    'button[aria-label*="Close"]', 'button[aria-label*="close"]',
+    '[data-testid*="close"]', '[data-testid*="fechar"]'
+];
+for (var i = 0; i < seletores.length; i++) {
+    var botao = document.querySelector(seletores[i]);
+    if (botao) { botao.click(); return 'botao'; }
+}
+var alvo = document.activeElement || document.body;
+['keydown', 'keyup'].forEach(function (tipo) {
+    alvo.dispatchEvent(new KeyboardEvent(tipo, {
+        key: 'Escape', code: 'Escape', keyCode: 27, which: 27, bubbles: true
+    }));
+});
+return 'esc';
+"""
+
+
+class EstatisticasNavegacao:
+    """Mede o tempo de cada navegação e estima o que a navegação no lugar economizou"""
+
+    def __init__(self, titulo="Navegação no CRM"):
+        self.titulo = titulo
+        self.registros = {}  # (operacao, modo) -> lista de durações
+        self.referencia_recarga = None  # tempo de um carregamento completo medido na entrada
+
+    def registrar(self, operacao, modo, duracao):
+        """Guarda a duração de uma navegação ('abrir' ou 'voltar', no modo usado)"""
+        self.registros.setdefault((operacao, modo), []).append(duracao)
+
+    def _media(self, duracoes):
+        return sum(duracoes) / len(duracoes) if duracoes else None
+
+    def custo_recarga(self, operacao):
+        """Tempo médio de uma recarga completa para a operação (ou a referência inicial)"""
+        media = self._media(self.registros.get((operacao, "recarregar"), []))
+        if media is None:
+            todas = [d for (_, modo), lista in self.registros.items()
+                     if modo == "recarregar" for d in lista]
+            media = self._media(todas)
+        return media if media is not None else self.referencia_recarga
+
+    def economia(self):
+        """Segundos economizados no total em relação a sempre recarregar a página"""
+        total = 0.0
+        for (operacao, modo), duracoes in self.registros.items():
+            if modo == "recarregar":
+                continue
+            custo = self.custo_recarga(operacao)
+            if custo is None:
+                continue
+            total += sum(max(custo - d, 0.0) for d in duracoes)
+        return total
+
+    def registrar_resumo(self, leads=0):
+        """Escreve no log os tempos de navegação e a economia por lead"""
+        if not self.registros:
+            return
+
+        logger.info(f"🧭 {self.titulo}:")
+        for (operacao, modo), duracoes in sorted(self.registros.items()):
+            logger.info(f"   {operacao}/{modo}: {len(duracoes)}x, média {self._media(duracoes):.2f}s")
+
+        economia = self.economia()
+        if economia:
+            por_lead = f", ~{economia / leads:.1f}s por lead" if leads else ""
+            logger.info(f"   ⚡ Economia estimada vs recarregar: {economia:.1f}s{por_lead}")
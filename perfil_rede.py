@@ -0,0 +1,192 @@
+"""
+Perfil de rede das abas do bot - o que não precisa ser baixado
+
+O bot só lê o DOM, mas cada carga do pipeline e do WhatsApp Web baixa imagens,
+avatares, fontes, mídia e beacons de análise de terceiros. Um perfil diz quais
+tipos de recurso e quais hosts bloquear (Network.setBlockedURLs, aplicado em
+cada aba do bot) e a estratégia de carregamento da página ('eager' devolve o
+driver.get no DOMContentLoaded; a prontidão fica com as esperas nomeadas).
+
+CSS e scripts nunca são bloqueados: os seletores dependem do layout (cards
+visíveis, botões renderizados) e os ícones usados como pista são SVG em linha.
+
+O consumo de cada lead (requisições e bytes transferidos, pela Resource Timing
+API da página) pode ser medido para comparar perfis no benchmark.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Extensões por tipo de recurso
+EXTENSOES_POR_TIPO = {
+    "imagem": ["png", "jpg", "jpeg", "gif", "webp", "avif", "ico", "bmp"],
+    "fonte": ["woff", "woff2", "ttf", "otf", "eot"],
+    "midia": ["mp4", "webm", "mp3", "ogg", "opus", "wav", "m4a"],
+}
+
+
+def _padroes_extensao(extensao):
+    """
+    Padrões (curinga '*') presos ao fim do caminho: 'x.png' e 'x.png?v=2', mas
+    não '/bundle.png.js' nem '/api/icone.ico/dados'
+    """
+    return [f"*.{extensao}", f"*.{extensao}?*", f"*.{extensao}#*"]
+
+
+# Padrões de URL por tipo de recurso
+PADROES_POR_TIPO = {
+    tipo: [padrao for extensao in extensoes for padrao in _padroes_extensao(extensao)]
+    for tipo, extensoes in EXTENSOES_POR_TIPO.items()
+}
+
+# Hosts de terceiros que o fluxo não usa: análise, rastreamento, chat de suporte
+# e os avatares/mídia das conversas do WhatsApp
+HOSTS_TERCEIROS = [
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*connect.facebook.com*", "*hotjar.com*", "*clarity.ms*",
+    "*segment.io*", "*segment.com*", "*fullstory.com*", "*mixpanel.com*",
+    "*amplitude.com*", "*intercom.io*", "*intercomcdn.com*", "*nr-data.net*",
+    "*pps.whatsapp.net*", "*mmg.whatsapp.net*",
+]
+
+CARREGAMENTOS = ("normal", "eager")
+
+# Lê as requisições e bytes transferidos desde a última leitura nesta aba e
+# limpa o buffer da Resource Timing API. O documento (navigation) conta uma vez
+SCRIPT_CONSUMO_REDE = """
+var perf = window.performance;
+if (!perf || !perf.getEntriesByType) return null;
+if (!window.__botRede) {
+    window.__botRede = true;
+    try { perf.setResourceTimingBufferSize(5000); } catch (e) {}
+}
+var entradas = perf.getEntriesByType('resource');
+if (!window.__botNavegacaoContada) {
+    entradas = perf.getEntriesByType('navigation').concat(entradas);
+    window.__botNavegacaoContada = true;
+}
+var bytes = 0;
+for (var i = 0; i < entradas.length; i++) bytes += entradas[i].transferSize || 0;
+try { perf.clearResourceTimings(); } catch (e) {}
+return [entradas.length, bytes];
+"""
+
+
+class PerfilRede:
+    """Tipos de recurso e hosts bloqueados nas abas do bot e estratégia de carregamento"""
+
+    def __init__(self, nome, tipos=(), hosts=(), carregamento="normal", extras=()):
+        """
+        tipos: chaves de PADROES_POR_TIPO ('imagem', 'fonte', 'midia')
+        hosts: padrões de URL de terceiros a bloquear
+        carregamento: 'normal' (espera o load) ou 'eager' (DOMContentLoaded)
+        extras: padrões de URL adicionais (ex: "*cdn.exemplo.com*")
+        """
+        if carregamento not in CARREGAMENTOS:
+            raise ValueError(f"Carregamento '{carregamento}' inválido (use {', '.join(CARREGAMENTOS)})")
+        self.nome = nome
+        self.tipos = tuple(tipos)
+        self.hosts = tuple(hosts)
+        self.carregamento = carregamento
+        self.extras = tuple(extras)
+
+    def padroes(self):
+        """Lista de padrões de URL bloqueados"""
+        padroes = [padrao for tipo in self.tipos for padrao in PADROES_POR_TIPO[tipo]]
+        return padroes + list(self.hosts) + list(self.extras)
+
+    def bloqueia(self):
+        return bool(self.padroes())
+
+    def descricao(self):
+        partes = list(self.tipos)
+        if self.hosts:
+            partes.append(f"{len(self.hosts)} hosts de terceiros")
+        if self.extras:
+            partes.append(f"{len(self.extras)} padrões extras")
+        bloqueio = ", ".join(partes) if partes else "nada bloqueado"
+        return f"{self.nome} ({bloqueio}; carregamento {self.carregamento})"
+
+    def aplicar(self, driver):
+        """Bloqueia os padrões na aba atual do driver. Retorna True se aplicou"""
+        if not self.bloqueia():
+            return False
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.padroes()})
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível aplicar o perfil de rede '{self.nome}': {e}")
+            return False
+
+
+PERFIS = {
+    # Tudo como antes: nada bloqueado, driver.get espera o load
+    "completo": PerfilRede("completo"),
+    # Só o que o fluxo usa: sem imagens, fontes, mídia e terceiros, carregamento eager
+    "enxuto": PerfilRede("enxuto", tipos=("imagem", "fonte", "midia"), hosts=HOSTS_TERCEIROS,
+                         carregamento="eager"),
+}
+
+
+def perfil_rede(nome="completo", carregamento=None, extras=()):
+    """Perfil pelo nome, com carregamento e padrões extras opcionais"""
+    if nome not in PERFIS:
+        raise ValueError(f"Perfil de rede '{nome}' não existe (use {', '.join(PERFIS)})")
+    base = PERFIS[nome]
+    if carregamento is None and not extras:
+        return base
+    return PerfilRede(base.nome, base.tipos, base.hosts, carregamento or base.carregamento,
+                      base.extras + tuple(extras))
+
+
+class ConsumoRede:
+    """Requisições e bytes baixados pelas abas do bot, somados por lead"""
+
+    def __init__(self):
+        self.lead = [0, 0]  # requisições, bytes do lead atual
+        self.por_lead = []  # (requisições, bytes) de cada lead terminado
+
+    def ler(self, driver):
+        """Soma no lead atual o que a aba atual baixou desde a última leitura"""
+        try:
+            consumo = driver.execute_script(SCRIPT_CONSUMO_REDE)
+        except Exception as e:
+            logger.debug(f"Consumo de rede não lido: {e}")
+            return None
+        if consumo:
+            self.lead[0] += consumo[0]
+            self.lead[1] += consumo[1]
+        return consumo
+
+    def descartar(self, driver):
+        """Zera a contagem da aba atual (carga inicial, antes do primeiro lead)"""
+        self.ler(driver)
+        self.lead = [0, 0]
+
+    def iniciar_lead(self):
+        self.lead = [0, 0]
+
+    def concluir_lead(self):
+        """Fecha a soma do lead. Retorna (requisições, bytes)"""
+        requisicoes, bytes_lead = self.lead
+        self.por_lead.append((requisicoes, bytes_lead))
+        self.lead = [0, 0]
+        return requisicoes, bytes_lead
+
+    def media_por_lead(self):
+        """{'requisicoes', 'kb'} médios por lead, ou None se nada foi medido"""
+        if not self.por_lead:
+            return None
+        quantidade = len(self.por_lead)
+        return {
+            "requisicoes": round(sum(r for r, _ in self.por_lead) / quantidade, 1),
+            "kb": round(sum(b for _, b in self.por_lead) / quantidade / 1024, 1),
+        }
+
+    def registrar_resumo(self, perfil):
+        media = self.media_por_lead()
+        if media:
+            logger.info(f"🌐 Rede ({perfil.nome}): média {media['requisicoes']:.0f} requisições e "
+                        f"{media['kb']:.0f} KB por lead ({len(self.por_lead)} leads)")
@@ -0,0 +1,234 @@
+"""
+Pool de contas - várias sessões do Chrome enviando em paralelo
+
+Cada conta de WhatsApp tem seu próprio bot: um Chrome com perfil próprio (login
+do WhatsApp Web separado), um limitador de envio e um ranking de seletores
+próprios. Todos consomem a mesma fila de leads, que nunca entrega a mesma
+negociação para dois bots, e gravam no mesmo diário de execução. No fim, os resultados são somados num
+resumo único, no mesmo formato do executar.
+
+Uso:
+    python pool_contas.py contas.json
+
+Formato do contas.json:
+    [
+        {"nome": "vendas1", "perfil": "perfis/vendas1"},
+        {"nome": "vendas2", "perfil": "perfis/vendas2", "intervalo": 480, "limite_dia": 40}
+    ]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import logging
+
+from backend_crm import BackendAPI, URL_API_PADRAO
+from diario_execucao import DiarioExecucao
+from fila_leads import FilaLeads, PoliticaRetentativa
+from limitador_envio import PoliticaEnvio
+from perfil_rede import PERFIS, CARREGAMENTOS, perfil_rede
+from vigia_navegador import LimitesVigia
+from rdstation_whatsapp_automation import (RDStationWhatsAppBot, SessaoExpiradaError, SAIDA_OK,
+                                           SAIDA_ERRO, SAIDA_INTERROMPIDA, URL_PIPELINE, URL_WHATSAPP,
+                                           registrar_resumo_contagem)
+
+logger = logging.getLogger(__name__)
+
+# Chaves do contas.json repassadas para PoliticaEnvio
+CAMPOS_POLITICA = ("intervalo", "rajada", "jitter", "limite_hora", "limite_dia", "janelas", "dias_semana")
+
+
+class CoordenadorContas:
+    """Sobe um bot por conta, distribui a fila compartilhada e soma os resultados"""
+
+    def __init__(self, contas, intervalo_colheita=300, caminho_diario="diario_execucao.db",
+                 headless=False, interativo=True, url_pipeline=URL_PIPELINE, url_whatsapp=URL_WHATSAPP,
+                 contar_comandos=False, simulacao=False, crm_api_token=None, crm_api_url=URL_API_PADRAO,
+                 cdp_rapido=False, perfil_rede=None, medir_rede=False, limites_vigia=None,
+                 politica_retentativa=None):
+        self.interativo = interativo
+        self.simulacao = simulacao
+        self.fila = FilaLeads(intervalo_colheita)
+        # Simulação: diário só em memória, para não marcar leads como concluídos
+        self.diario = DiarioExecucao(":memory:" if simulacao else caminho_diario)
+        self.fila.processados.update(self.diario.concluidos())
+        self.bots = []
+
+        for conta in contas:
+            nome = conta["nome"]
+            politica = PoliticaEnvio(**{k: v for k, v in conta.items() if k in CAMPOS_POLITICA})
+            self.bots.append(RDStationWhatsAppBot(
+                intervalo_colheita=intervalo_colheita,
+                politica_envio=politica,
+                nome=nome,
+                perfil_chrome=conta.get("perfil", f"perfis/{nome}"),
+                caminho_limitador=conta.get("limitador", f"limitador_{nome}.json"),
+                caminho_seletores=conta.get("seletores", f"seletores_cache_{nome}.json"),
+                caminho_metricas=f"metricas_{nome}",
+                fila=self.fila,
+                diario=self.diario,
+                headless=headless,
+                interativo=interativo,
+                url_pipeline=url_pipeline,
+                url_whatsapp=url_whatsapp,
+                contar_comandos=contar_comandos,
+                simulacao=simulacao,
+                crm=BackendAPI(crm_api_token, url_api=crm_api_url, simulacao=simulacao) if crm_api_token else None,
+                cdp_rapido=cdp_rapido,
+                perfil_rede=perfil_rede,
+                medir_rede=medir_rede,
+                limites_vigia=limites_vigia,
+                politica_retentativa=politica_retentativa,
+            ))
+
+    def _trabalhar(self, bot):
+        """Thread de um bot: processa a fila compartilhada até acabar"""
+        try:
+            bot.processar_fila()
+        except Exception as e:
+            logger.error(f"❌ [{bot.nome}] Erro fatal: {e}")
+            import traceback
+            logger.error(traceback.format_exc())
+
+    def contagem_total(self):
+        """Soma a contagem de resultados de todos os bots"""
+        total = {}
+        for bot in self.bots:
+            for resultado, quantidade in bot.contagem.items():
+                total[resultado] = total.get(resultado, 0) + quantidade
+        return total
+
+    def liberar_quarentena(self):
+        """Devolve à fila compartilhada os leads em quarentena (próxima colheita)"""
+        chaves = self.diario.liberar_quarentena()
+        self.fila.processados.difference_update(chaves)
+        logger.info(f"🧯 {len(chaves)} leads liberados da quarentena")
+        return len(chaves)
+
+    def executar(self):
+        """
+        Prepara as contas uma a uma (logins) e depois processa em paralelo.
+        Retorna o código de saída do processo
+        """
+        threads = []
+        codigo_saida = SAIDA_OK
+        try:
+            # A preparação é sequencial: cada conta pode pedir login/QR code no terminal
+            for bot in self.bots:
+                logger.info(f"\n🚀 Preparando conta '{bot.nome}'...")
+                bot.preparar()
+
+            logger.info("\n" + "="*50)
+            logger.info(f"INICIANDO PROCESSAMENTO DE LEADS COM {len(self.bots)} CONTAS")
+            logger.info("="*50 + "\n")
+
+            for bot in self.bots:
+                thread = threading.Thread(target=self._trabalhar, args=(bot,), name=bot.nome, daemon=True)
+                thread.start()
+                threads.append(thread)
+
+            # join com timeout para o Ctrl+C continuar funcionando na thread principal
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=1)
+
+            for bot in self.bots:
+                registrar_resumo_contagem(bot.contagem, titulo=f"📱 CONTA '{bot.nome}'")
+            if self.simulacao:
+                registrar_resumo_contagem(self.contagem_total(),
+                                          titulo="🧪 SIMULAÇÃO CONCLUÍDA (nada enviado, nenhuma etapa movida)",
+                                          quarentena=self.diario.quarentena())
+            else:
+                registrar_resumo_contagem(self.contagem_total(), quarentena=self.diario.quarentena())
+
+        except SessaoExpiradaError as e:
+            logger.error(f"\n❌ {e} - faça login com o mesmo perfil em modo interativo")
+            codigo_saida = e.codigo_saida
+        except KeyboardInterrupt:
+            logger.info("\n⚠️ Automação interrompida pelo usuário (Ctrl+C)")
+            codigo_saida = SAIDA_INTERROMPIDA
+            for bot in self.bots:
+                bot.parar.set()
+            for thread in threads:
+                thread.join(timeout=30)
+        except Exception as e:
+            logger.error(f"\n❌ Erro fatal: {e}")
+            codigo_saida = SAIDA_ERRO
+        finally:
+            if self.interativo:
+                input("\nPressione ENTER para fechar os navegadores...")
+            for bot in self.bots:
+                bot.encerrar()
+            self.diario.fechar()
+        return codigo_saida
+
+
+def main():
+    """Função principal do pool de contas"""
+    parser = argparse.ArgumentParser(description="Envio em paralelo com várias contas de WhatsApp")
+    parser.add_argument("contas", help="arquivo JSON com a lista de contas")
+    parser.add_argument("--intervalo-colheita", type=float, default=300,
+                        help="segundos até reler a coluna 'Entrada de Leads' (padrão: 300)")
+    parser.add_argument("--headless", action="store_true",
+                        help="roda os Chromes sem janela (implica --nao-interativo)")
+    parser.add_argument("--nao-interativo", action="store_true",
+                        help="nunca espera ENTER; sai com código 3 ou 4 se alguma sessão expirou")
+    parser.add_argument("--url-pipeline", default=URL_PIPELINE, help="endereço do pipeline do CRM")
+    parser.add_argument("--url-whatsapp", default=URL_WHATSAPP, help="endereço do WhatsApp Web")
+    parser.add_argument("--contar-comandos", action="store_true",
+                        help="conta os comandos WebDriver de cada conta (ranking no fim da execução)")
+    parser.add_argument("--simulacao", action="store_true",
+                        help="percorre todos os passos sem enviar mensagens nem mudar etapas")
+    parser.add_argument("--crm-api-token", default=os.environ.get("RDSTATION_CRM_TOKEN"),
+                        help="token da API do RD Station CRM (padrão: variável RDSTATION_CRM_TOKEN)")
+    parser.add_argument("--crm-api-url", default=URL_API_PADRAO, help="endereço da API do CRM")
+    parser.add_argument("--cdp-rapido", action="store_true",
+                        help="operações quentes do DOM direto pelo DevTools Protocol de cada Chrome")
+    parser.add_argument("--perfil-rede", choices=sorted(PERFIS), default="completo",
+                        help="'enxuto' bloqueia imagens, fontes, mídia e terceiros e usa carregamento eager")
+    parser.add_argument("--carregamento", choices=CARREGAMENTOS,
+                        help="estratégia de carregamento das páginas (padrão: a do perfil de rede)")
+    parser.add_argument("--bloquear", action="append", default=[], metavar="PADRAO",
+                        help="padrão de URL a bloquear além do perfil; pode repetir")
+    parser.add_argument("--medir-rede", action="store_true", help="soma as requisições e bytes baixados por lead")
+    parser.add_argument("--sem-vigia", action="store_true",
+                        help="desliga o vigia do navegador (timeouts e reciclagem automática de cada Chrome)")
+    parser.add_argument("--memoria-max-mb", type=float, default=2500,
+                        help="memória de cada Chrome (MB) que faz o vigia reciclar a sessão (padrão: 2500)")
+    parser.add_argument("--reciclar-horas", type=float, help="recicla cada Chrome a cada N horas mesmo sem sintoma")
+    parser.add_argument("--max-tentativas", type=int, default=3,
+                        help="tentativas de um lead com erro antes da quarentena (padrão: 3)")
+    parser.add_argument("--liberar-quarentena", action="store_true",
+                        help="devolve à fila os leads em quarentena antes de começar")
+    args = parser.parse_args()
+
+    with open(args.contas, "r", encoding="utf-8") as arquivo:
+        contas = json.load(arquivo)
+
+    coordenador = CoordenadorContas(
+        contas,
+        intervalo_colheita=args.intervalo_colheita,
+        headless=args.headless,
+        interativo=not (args.nao_interativo or args.headless),
+        url_pipeline=args.url_pipeline,
+        url_whatsapp=args.url_whatsapp,
+        contar_comandos=args.contar_comandos,
+        simulacao=args.simulacao,
+        crm_api_token=args.crm_api_token,
+        crm_api_url=args.crm_api_url,
+        cdp_rapido=args.cdp_rapido,
+        perfil_rede=perfil_rede(args.perfil_rede, args.carregamento, args.bloquear),
+        medir_rede=args.medir_rede,
+        limites_vigia=None if args.sem_vigia else LimitesVigia(memoria_max_mb=args.memoria_max_mb,
+                                                              reciclar_horas=args.reciclar_horas),
+        politica_retentativa=PoliticaRetentativa(max_tentativas=args.max_tentativas),
+    )
+    if args.liberar_quarentena:
+        coordenador.liberar_quarentena()
+    sys.exit(coordenador.executar())
+
+
+if __name__ == "__main__":
+    main()
@@ -15,13 +15,33 @@ pip install selenium webdriver-manager --break-system-packages
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import NoSuchElementException
+import argparse
+import os
+import sys
+import threading
 import time
 import logging
 
+from esperas import MotorEsperas, SCRIPT_ASSINATURA_ETAPAS, SELETOR_CAIXA_MENSAGEM
+from seletores import ARQUIVO_PADRAO as ARQUIVO_SELETORES, RegistroSeletores, site_atual
+from snapshot_pipeline import capturar_leads, capturar_leads_cdp, SCRIPT_ROLAR_ULTIMO_CARD
+from fila_leads import FilaLeads, PoliticaRetentativa, chave_lead
+from diario_execucao import DiarioExecucao
+from limitador_envio import LimitadorEnvio, PoliticaEnvio, ler_dias_semana, ler_janela
+from navegacao import EstatisticasNavegacao, SCRIPT_NAVEGAR_SPA, SCRIPT_FECHAR_DETALHES
+from aba_whatsapp import SCRIPT_INTERCEPTAR_ABERTURA, SCRIPT_ABRIR_CHAT, url_chat_web, telefone_da_url
+from telefone import SCRIPT_TELEFONES_LEAD, TIPOS_DECLINADOS, escolher_telefone, normalizar_telefone
+from composicao import digitar_mensagem, inserir_mensagem, normalizar_texto, texto_confere
+from etapas import MapaEtapas, SCRIPT_CLICAR_ETAPA
+from metricas import MetricasFases, medir_fase
+from comandos_webdriver import ContadorComandos
+from backend_crm import BackendSelenium, BackendAPI, ErroAPICRM, URL_API_PADRAO
+from cdp_rapido import CanalCDP, AlvoCDP, ErroCDP
+from perfil_rede import PERFIS, CARREGAMENTOS, ConsumoRede, perfil_rede as montar_perfil_rede
+from vigia_navegador import VigiaNavegador, LimitesVigia, processos_descendentes, encerrar_processos
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -29,11 +49,149 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Códigos de saída (para supervisores como systemd/cron saberem o que houve)
+SAIDA_OK = 0
+SAIDA_ERRO = 1
+SAIDA_RDSTATION_DESLOGADO = 3
+SAIDA_WHATSAPP_DESLOGADO = 4
+SAIDA_INTERROMPIDA = 130  # Ctrl+C (128 + SIGINT, a convenção do shell)
+
+# Perfil persistente do Chrome usado pela linha de comando
+PERFIL_PADRAO = "perfis/padrao"
+
+URL_PIPELINE = "https://crm.rdstation.com/app/deals/pipeline"
+URL_WHATSAPP = "https://web.whatsapp.com"
+
+# Estimativa inicial (segundos) do custo de pré-qualificar um lead durante a pausa
+ESTIMATIVA_PRE_QUALIFICACAO = 20.0
+
+# Falhas seguidas de um modo de navegação no lugar antes de desistir dele
+MAX_FALHAS_NAVEGACAO = 3
+
+# Limite de rolagens da coluna durante a colheita (cards carregados sob demanda)
+MAX_ROLAGENS_COLHEITA = 50
+
+# Segundos para a troca de conversa no lugar antes de carregar a URL do chat
+ESPERA_CHAT_NO_LUGAR = 8
+
+# Vezes que um mesmo lead pode ser devolvido à fila por causa de uma reciclagem do Chrome
+MAX_DEVOLUCOES_LEAD = 2
+
+# Leads em quarentena listados no resumo final
+LINHAS_QUARENTENA = 20
+
+class SessaoExpiradaError(Exception):
+    """Sessão do RD Station ou do WhatsApp Web não está logada (modo não interativo)"""
+    
+    def __init__(self, servico, codigo_saida):
+        super().__init__(f"Sessão do {servico} expirada ou não logada no perfil do Chrome")
+        self.servico = servico
+        self.codigo_saida = codigo_saida
+
 class RDStationWhatsAppBot:
-    def __init__(self):
-        """Inicializa o bot com configurações do Chrome"""
+    def __init__(self, intervalo_colheita=300, modo_navegacao="spa", politica_envio=None,
+                 caminho_diario="diario_execucao.db", nome="bot", perfil_chrome=None,
+                 caminho_limitador="limitador_estado.json", fila=None, diario=None,
+                 headless=False, interativo=True, url_pipeline=URL_PIPELINE, url_whatsapp=URL_WHATSAPP,
+                 caminho_metricas="metricas", contar_comandos=False, simulacao=False,
+                 crm=None, cdp_rapido=False, perfil_rede=None, medir_rede=False, limites_vigia=None,
+                 politica_retentativa=None, caminho_seletores=ARQUIVO_SELETORES):
+        """
+        Inicializa o bot com configurações do Chrome
+        
+        intervalo_colheita: segundos até reler a coluna 'Entrada de Leads' mesmo
+        com a fila ainda cheia (None = só reler quando a fila esvaziar)
+        modo_navegacao: 'spa' navega dentro do app sem recarregar a página;
+        'recarregar' usa driver.get em toda navegação (comportamento antigo)
+        politica_envio: PoliticaEnvio com o ritmo de envio (padrão: 1 mensagem a cada 10 minutos)
+        caminho_diario: banco SQLite com o diário de execução (retomada após falhas)
+        nome: identificação do bot nos logs (uma por conta de WhatsApp)
+        perfil_chrome: pasta do perfil do Chrome (--user-data-dir); None = perfil temporário
+        caminho_limitador: arquivo com o estado do limitador de envio desta conta
+        fila / diario: fila e diário compartilhados entre vários bots (pool de contas)
+        headless: roda o Chrome sem janela
+        interativo: False nunca espera ENTER - se uma sessão não estiver logada,
+        levanta SessaoExpiradaError (usado para rodar sem supervisão)
+        url_pipeline / url_whatsapp: endereços do CRM e do WhatsApp Web
+        (trocados para apontar para o servidor de fixtures local)
+        caminho_metricas: prefixo dos arquivos de métricas (<prefixo>.jsonl e <prefixo>.prom)
+        contar_comandos: conta os comandos WebDriver por tipo, método e lead
+        (relatório no log e em <prefixo>_comandos.json)
+        simulacao: percorre o fluxo inteiro sem pressionar ENTER nem clicar na
+        etapa, sem pausa entre envios e com diário e limitador só em memória
+        crm: backend do CRM (BackendAPI); None = pela interface, com Selenium
+        cdp_rapido: snapshot dos cards, botão do WhatsApp, cliques e inserção do
+        texto direto pelo websocket do Chrome (DevTools Protocol), sem o chromedriver
+        perfil_rede: PerfilRede com os recursos bloqueados e o carregamento das
+        páginas (None = perfil 'completo', nada bloqueado)
+        medir_rede: soma as requisições e bytes baixados por lead
+        limites_vigia: LimitesVigia - timeouts de comando e de carga de página e
+        reciclagem do Chrome por memória, latência ou travamento (None = sem vigia)
+        politica_retentativa: PoliticaRetentativa dos leads com erro (padrão: 3
+        tentativas com espera exponencial a partir de 2 minutos, depois quarentena)
+        caminho_seletores: arquivo com o ranking de seletores desta conta
+        """
+        self.nome = nome
+        self.simulacao = simulacao
+        if simulacao:
+            # Nada do que a simulação "faz" pode contar para uma execução de verdade
+            politica_envio = PoliticaEnvio(intervalo=0)
+            caminho_limitador = None
+            caminho_diario = ":memory:"
+        self.perfil_chrome = perfil_chrome
+        self.headless = headless
+        self.interativo = interativo
+        self.url_pipeline = url_pipeline
+        self.url_whatsapp = url_whatsapp
         self.driver = None
-        self.wait = None
+        self.esperas = None
+        # Abas controladas pelo handle: CRM, WhatsApp Web persistente e a do chat atual
+        self.aba_crm = None
+        self.aba_whatsapp = None
+        self.aba_chat = None
+        self.url_chat = None
+        # Ranking de qual "Método N" funcionou, salvo entre execuções
+        self.seletores = RegistroSeletores(caminho_seletores)
+        # Posição de cada etapa no painel do lead, lida uma vez por sessão
+        self.etapas = MapaEtapas()
+        # Fila de leads colhidos da coluna 'Entrada de Leads'
+        self.fila = fila if fila is not None else FilaLeads(intervalo_colheita)
+        # Navegação no CRM e tempo economizado por não recarregar a página
+        self.modo_navegacao = modo_navegacao
+        self.navegacao = EstatisticasNavegacao()
+        # Troca de conversa no WhatsApp Web: medida à parte para não misturar com o CRM
+        self.navegacao_chat = EstatisticasNavegacao("Troca de conversa no WhatsApp Web")
+        self.falhas_navegacao = {"abrir": 0, "fechar": 0, "spa": 0, "chat": 0}
+        # Ritmo de envio anti-banimento, persistido entre execuções
+        self.limitador = LimitadorEnvio(politica_envio or PoliticaEnvio(intervalo=600), caminho_limitador)
+        # Diário de execução: leads já terminados em execuções anteriores não voltam à fila
+        self.diario = diario if diario is not None else DiarioExecucao(caminho_diario)
+        self.fila.processados.update(self.diario.concluidos())
+        # Leads com erro: nova tentativa com espera exponencial e, no fim, quarentena
+        self.retentativas = politica_retentativa or PoliticaRetentativa()
+        self.fila.agendar(self.diario.adiados())
+        self.motivo_erro = None
+        self.lead_atual = None
+        # Leitura dos leads e mudança de etapa: pela interface ou pela API do CRM
+        self.crm = crm or BackendSelenium(self)
+        # Tempo de cada fase do processamento dos leads (p50/p95, JSON lines e Prometheus)
+        self.metricas = MetricasFases(caminho_metricas, bot=nome)
+        # Idas ao chromedriver por método do bot e por lead (opcional)
+        self.comandos = ContadorComandos(self) if contar_comandos else None
+        # Atalho CDP para as operações quentes do DOM (aberto com o navegador)
+        self.usar_cdp = cdp_rapido
+        self.cdp = None
+        # Recursos bloqueados nas abas e consumo de rede por lead (opcional)
+        self.perfil_rede = perfil_rede or PERFIS["completo"]
+        self.rede = ConsumoRede() if medir_rede else None
+        # Saúde do Chrome em execuções longas: timeouts e reciclagem da sessão (opcional)
+        self.vigia = VigiaNavegador(limites_vigia) if limites_vigia else None
+        # Resultado dos leads processados nesta execução
+        self.contagem = {"sucesso": 0, "sem_whatsapp": 0, "numero_invalido": 0, "erro": 0}
+        # Como a mensagem entrou na caixa: 'cdp', 'colar', 'inserir' ou 'digitar' (reserva)
+        self.modos_insercao = {}
+        # Sinal para interromper o loop (usado pelo pool de contas)
+        self.parar = threading.Event()
         self.mensagem_padrao = """Olá tudo bem? 
 Me chamo Gilvane, faço parte do time de vendas da QUERO TRUCK. 
 Vi que entrou em contato conosco, o que vc procura? Compra, venda de caminhões?"""
@@ -43,164 +201,305 @@ Vi que entrou em contato conosco, o que vc procura? Compra, venda de caminhões?
         logger.info("Iniciando navegador...")
         
         options = webdriver.ChromeOptions()
-        # Usar perfil do usuário para manter login
-        # options.add_argument("--user-data-dir=/tmp/chrome_profile")
-        options.add_argument("--start-maximized")
+        # Usar perfil do usuário para manter login (um perfil por conta de WhatsApp)
+        if self.perfil_chrome:
+            options.add_argument(f"--user-data-dir={os.path.abspath(self.perfil_chrome)}")
+        if self.headless:
+            options.add_argument("--headless=new")
+            options.add_argument("--window-size=1920,1080")
+        else:
+            options.add_argument("--start-maximized")
         options.add_argument("--disable-blink-features=AutomationControlled")
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
         options.add_experimental_option('useAutomationExtension', False)
+        # 'eager': driver.get volta no DOMContentLoaded; a prontidão é conferida pelas esperas
+        options.page_load_strategy = self.perfil_rede.carregamento
         
         self.driver = webdriver.Chrome(options=options)
-        self.wait = WebDriverWait(self.driver, 20)
+        if self.comandos:
+            self.comandos.instalar(self.driver)
+        if self.vigia:
+            self.vigia.instalar(self.driver)
+        self.esperas = MotorEsperas(self.driver)
+        self.aba_crm = self.driver.current_window_handle
+        self._ajustar_user_agent()
+        if self.perfil_rede.aplicar(self.driver):
+            logger.info(f"🌐 Perfil de rede: {self.perfil_rede.descricao()}")
+        if self.usar_cdp:
+            try:
+                self.cdp = CanalCDP(self.driver)
+                logger.info(f"⚡ Atalho CDP ligado ({self.cdp.endereco})")
+            except ErroCDP as e:
+                logger.warning(f"⚠️ Atalho CDP indisponível ({e}) - seguindo só com Selenium")
         
         logger.info("Navegador iniciado com sucesso!")
+    
+    def _fechar_navegador(self):
+        """Fecha o Chrome; processos que sobrarem são mortos para liberar o perfil"""
+        if self.cdp:
+            self.cdp.fechar()
+            self.cdp = None
+        if not self.driver:
+            return
+        try:
+            processos = processos_descendentes(self.driver.service.process.pid)
+        except AttributeError:
+            processos = []
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.warning(f"⚠️ O Chrome não fechou normalmente: {e}")
+        encerrar_processos(processos[1:])  # o primeiro é o chromedriver, parado pelo quit
+        self.driver = None
+    
+    @medir_fase("reciclagem")
+    def reciclar_navegador(self, motivo):
+        """
+        Fecha o Chrome e abre outro com o mesmo perfil persistente (sem novo
+        login), com CRM e WhatsApp Web prontos. Fila e diário continuam os mesmos
+        """
+        logger.warning(f"♻️ [{self.nome}] Reciclando o Chrome: {motivo}")
+        if not self.perfil_chrome:
+            logger.warning("⚠️ Sem perfil persistente (--perfil): o login terá de ser feito de novo")
+        self.vigia.registrar_reciclagem(motivo)
+        self.metricas.anotar(motivo=motivo)
+        self._fechar_navegador()
+        self.falhas_navegacao = {"abrir": 0, "fechar": 0, "spa": 0, "chat": 0}
+        self.preparar()
+        logger.info(f"✅ [{self.nome}] Chrome reciclado - continuando de onde parou")
+    
+    def _verificar_saude(self):
+        """Recicla o Chrome antes do próximo lead se o vigia apontar um problema"""
+        if not self.vigia:
+            return
+        motivo = self.vigia.motivo_reciclagem()
+        if motivo:
+            self.reciclar_navegador(motivo)
+    
+    def _lead_interrompido(self, lead, resultado):
+        """
+        True se o lead falhou porque o Chrome adoeceu: ele volta para a frente da
+        fila e é retomado depois da reciclagem (até MAX_DEVOLUCOES_LEAD vezes)
+        """
+        if not self.vigia or resultado not in ("erro", "invalido"):
+            return False
+        motivo = self.vigia.motivo_reciclagem()
+        if not motivo:
+            return False
+        lead["devolucoes"] = lead.get("devolucoes", 0) + 1
+        if lead["devolucoes"] > MAX_DEVOLUCOES_LEAD:
+            logger.warning(f"⚠️ Lead '{lead.get('nome') or lead['chave']}' já foi devolvido "
+                           f"{MAX_DEVOLUCOES_LEAD} vezes - contando como erro")
+            return False
+        logger.warning(f"↩️ Lead '{lead.get('nome') or lead['chave']}' interrompido ({motivo}) - volta para a frente da fila")
+        self.fila.devolver(lead)
+        self.reciclar_navegador(motivo)
+        return True
+    
+    def _cdp_disponivel(self):
+        """True se o atalho CDP está ligado; desliga depois de falhas seguidas"""
+        if self.cdp and not self.cdp.ativo:
+            logger.warning("⚠️ Atalho CDP desligado depois de falhas seguidas - seguindo só com Selenium")
+            self.cdp.fechar()
+            self.cdp = None
+        return self.cdp is not None
+    
+    def _ajustar_user_agent(self):
+        """
+        No modo headless, tira o 'HeadlessChrome' do user agent da aba atual
+        (o WhatsApp Web recusa). Retorna True se a aba precisa ser recarregada.
+        """
+        if not self.headless:
+            return False
+        try:
+            agente = self.driver.execute_script("return navigator.userAgent")
+            if "HeadlessChrome" in agente:
+                self.driver.execute_cdp_cmd("Network.setUserAgentOverride",
+                                            {"userAgent": agente.replace("HeadlessChrome", "Chrome")})
+                return True
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível ajustar o user agent: {e}")
+        return False
         
     def acessar_rdstation(self):
-        """Acessa a página do RD Station"""
+        """Acessa a página do RD Station e confirma que a sessão está ativa"""
         logger.info("Acessando RD Station...")
-        self.driver.get("https://crm.rdstation.com/app/deals/pipeline")
+        inicio = time.monotonic()
+        self.driver.get(self.url_pipeline)
+        
+        estado = self.esperas.aguardar("login_rdstation")
+        if estado == "logado":
+            # O tempo de carga serve de referência de uma recarga completa
+            self.navegacao.referencia_recarga = time.monotonic() - inicio
+            logger.info("✅ Sessão do RD Station ativa")
+            return
+        
+        if not self.interativo:
+            raise SessaoExpiradaError("RD Station", SAIDA_RDSTATION_DESLOGADO)
         
-        # Aguarda usuário fazer login se necessário
-        input("\n⚠️  Faça login no RD Station se necessário e pressione ENTER para continuar...")
+        # Aguarda usuário fazer login
+        input("\n⚠️  Faça login no RD Station e pressione ENTER para continuar...")
         logger.info("Continuando automação...")
         
     def verificar_whatsapp_web(self):
-        """Verifica se WhatsApp Web está conectado"""
+        """Abre a aba do WhatsApp Web que será reaproveitada para todos os leads"""
         logger.info("Verificando WhatsApp Web...")
         
-        # Abre WhatsApp Web em nova aba
-        self.driver.execute_script("window.open('https://web.whatsapp.com');")
-        time.sleep(3)
+        inicio = time.monotonic()
+        self._abrir_aba_whatsapp()
         
-        # Muda para aba do WhatsApp
-        self.driver.switch_to.window(self.driver.window_handles[-1])
+        estado = self.esperas.aguardar("login_whatsapp")
+        if estado == "logado":
+            # O tempo de carga serve de referência de uma recarga do chat
+            self.navegacao_chat.referencia_recarga = time.monotonic() - inicio
+            logger.info("✅ Sessão do WhatsApp Web ativa")
+        elif not self.interativo:
+            raise SessaoExpiradaError("WhatsApp Web", SAIDA_WHATSAPP_DESLOGADO)
+        else:
+            input("\n⚠️  Escaneie o QR code do WhatsApp Web e pressione ENTER para continuar...")
         
-        input("\n⚠️  Certifique-se de que o WhatsApp Web está conectado e pressione ENTER para continuar...")
+        # A carga inicial não conta para o primeiro lead
+        if self.rede:
+            self.rede.descartar(self.driver)
         
         # Volta para aba do RD Station
-        self.driver.switch_to.window(self.driver.window_handles[0])
+        self.driver.switch_to.window(self.aba_crm)
         logger.info("WhatsApp Web verificado!")
+    
+    def _abrir_aba_whatsapp(self):
+        """Abre o WhatsApp Web numa aba nova, guarda o handle dela e muda para ela"""
+        # Com bloqueio de recursos a aba abre vazia: o perfil vale desde a primeira carga
+        bloquear = self.perfil_rede.bloqueia()
+        handles_antes = set(self.driver.window_handles)
+        self.driver.execute_script("window.open(arguments[0]);", "about:blank" if bloquear else self.url_whatsapp)
+        handles = self.esperas.aguardar("nova_aba", abas_antes=len(handles_antes), obrigatoria=True)
+        
+        self.aba_whatsapp = (set(handles) - handles_antes).pop()
+        self.driver.switch_to.window(self.aba_whatsapp)
+        recarregar = self._ajustar_user_agent()
+        if bloquear:
+            self.perfil_rede.aplicar(self.driver)
+        if recarregar or bloquear:
+            self.driver.get(self.url_whatsapp)
         
-    def obter_leads_entrada(self):
-        """Obtém todos os cards de leads da coluna 'Entrada de Leads'"""
+    def obter_leads_entrada(self, rapido=True):
+        """
+        Obtém os leads da coluna 'Entrada de Leads'.
+        
+        Retorna uma lista de dicts (id, link, nome, visivel, na_tela, posicao, elemento)
+        montada em uma única chamada JavaScript; o elemento só é usado no clique.
+        rapido: permite o snapshot pelo atalho CDP (leads sem elemento); False
+        quando o card vai ser clicado
+        """
         logger.info("Buscando leads na coluna 'Entrada de Leads'...")
         
         try:
-            # Aguarda a página carregar
-            time.sleep(3)
+            # Aguarda a coluna do pipeline renderizar
+            self.esperas.aguardar("pipeline_renderizado")
+            
+            # Snapshot: uma única ida ao navegador para a coluna inteira
+            if rapido and self._cdp_disponivel():
+                try:
+                    leads = self._filtrar_visiveis(capturar_leads_cdp(self.cdp, self.aba_crm))
+                    if leads:
+                        logger.info(f"✅ Snapshot CDP: Encontrados {len(leads)} leads")
+                        return leads
+                except ErroCDP as e:
+                    logger.warning(f"⚠️ Snapshot pelo CDP falhou ({e}) - usando o Selenium")
+            
+            leads = self._filtrar_visiveis(capturar_leads(self.driver))
+            if leads:
+                logger.info(f"✅ Snapshot JS: Encontrados {len(leads)} leads")
+                return leads
+            
+            logger.info("Snapshot JS não encontrou cards, tentando métodos de seletores...")
             
             # Baseado no CSS Selector fornecido:
             # #mfe-crm-deals-sales-pipeline > div > main > div.Grid__Root... > section:nth-child(1) > ... > div:nth-child(1)
             
-            cards = []
-            
             # Método 1: CSS Selector exato - busca todos os cards na primeira seção
-            try:
+            def metodo_1():
                 # Pega todos os cards filhos diretos do container na primeira seção
-                cards = self.driver.find_elements(By.CSS_SELECTOR, 
+                return self.driver.find_elements(By.CSS_SELECTOR, 
                     "#mfe-crm-deals-sales-pipeline section:nth-child(1) div.sc-dkmKpi > div")
-                
-                if cards:
-                    logger.info(f"✅ Método 1 (CSS exato): Encontrados {len(cards)} cards")
-                    return cards
-            except Exception as e:
-                logger.warning(f"Método 1 falhou: {e}")
             
             # Método 2: CSS Selector mais genérico - primeira seção, classe ftSKDG
-            try:
-                cards = self.driver.find_elements(By.CSS_SELECTOR,
+            # (a visibilidade é filtrada depois, no snapshot)
+            def metodo_2():
+                return self.driver.find_elements(By.CSS_SELECTOR,
                     "section:nth-child(1) div.ftSKDG > div > div > div")
-                
-                if cards:
-                    logger.info(f"✅ Método 2 (CSS classes): Encontrados {len(cards)} cards")
-                    # Filtra apenas os visíveis
-                    cards_visiveis = [c for c in cards if c.is_displayed()]
-                    logger.info(f"   Destes, {len(cards_visiveis)} estão visíveis")
-                    return cards_visiveis if cards_visiveis else cards
-            except Exception as e:
-                logger.warning(f"Método 2 falhou: {e}")
             
             # Método 3: Busca pela estrutura section > div > div
-            try:
+            def metodo_3():
                 # Encontra a primeira section
                 primeira_secao = self.driver.find_element(By.CSS_SELECTOR, 
                     "#mfe-crm-deals-sales-pipeline section:first-child")
-                
                 # Dentro dela, busca os cards
-                cards = primeira_secao.find_elements(By.CSS_SELECTOR, 
+                return primeira_secao.find_elements(By.CSS_SELECTOR, 
                     "div.sc-dkmKpi > div, div[class*='Card'] > div")
-                
-                if cards:
-                    logger.info(f"✅ Método 3 (section + cards): Encontrados {len(cards)} cards")
-                    return cards
-            except Exception as e:
-                logger.warning(f"Método 3 falhou: {e}")
             
             # Método 4: Busca por classe Card__Root
-            try:
+            def metodo_4():
                 primeira_secao = self.driver.find_element(By.CSS_SELECTOR, "section:first-of-type")
-                cards = primeira_secao.find_elements(By.CSS_SELECTOR, "[class*='Card__Root']")
-                
-                if cards:
-                    logger.info(f"✅ Método 4 (Card__Root): Encontrados {len(cards)} cards")
-                    return cards
-            except Exception as e:
-                logger.warning(f"Método 4 falhou: {e}")
+                return primeira_secao.find_elements(By.CSS_SELECTOR, "[class*='Card__Root']")
             
             # Método 5: XPath baseado no CSS selector
-            try:
-                cards = self.driver.find_elements(By.XPATH,
+            def metodo_5():
+                return self.driver.find_elements(By.XPATH,
                     "//*[@id='mfe-crm-deals-sales-pipeline']//section[1]//div[contains(@class, 'sc-dkmKpi')]//div[contains(@class, 'Card') or contains(@class, 'card')]")
-                
-                if cards:
-                    logger.info(f"✅ Método 5 (XPath): Encontrados {len(cards)} cards")
-                    return cards
-            except Exception as e:
-                logger.warning(f"Método 5 falhou: {e}")
             
             # Método 6: Última tentativa - busca genérica por cards na primeira coluna
-            try:
+            def metodo_6():
                 todas_sections = self.driver.find_elements(By.TAG_NAME, "section")
-                if todas_sections:
-                    primeira = todas_sections[0]
-                    cards = primeira.find_elements(By.XPATH, ".//div[@role='button' or contains(@onclick, '') or @tabindex]")
-                    
-                    if not cards:
-                        # Tenta pegar qualquer div clicável
-                        cards = primeira.find_elements(By.XPATH, ".//div[contains(@class, 'card') or contains(@class, 'Card')]")
-                    
-                    if cards:
-                        logger.info(f"✅ Método 6 (genérico): Encontrados {len(cards)} cards")
-                        return cards
-            except Exception as e:
-                logger.warning(f"Método 6 falhou: {e}")
-            
-            if not cards:
-                logger.warning("⚠️ Nenhum card encontrado em nenhum método!")
-                logger.info("💡 Tentando debug adicional...")
+                if not todas_sections:
+                    return []
+                primeira = todas_sections[0]
+                cards = primeira.find_elements(By.XPATH, ".//div[@role='button' or contains(@onclick, '') or @tabindex]")
+                if not cards:
+                    # Tenta pegar qualquer div clicável
+                    cards = primeira.find_elements(By.XPATH, ".//div[contains(@class, 'card') or contains(@class, 'Card')]")
+                return cards
+            
+            metodo, cards = self.seletores.executar(site_atual(self.driver), "cards_entrada", [
+                ("Método 1 (CSS exato)", metodo_1),
+                ("Método 2 (CSS classes)", metodo_2),
+                ("Método 3 (section + cards)", metodo_3),
+                ("Método 4 (Card__Root)", metodo_4),
+                ("Método 5 (XPath)", metodo_5),
+                ("Método 6 (genérico)", metodo_6),
+            ])
+            
+            if cards:
+                # Descreve os cards encontrados em uma única chamada
+                leads = self._filtrar_visiveis(capturar_leads(self.driver, cards))
+                logger.info(f"✅ {metodo}: Encontrados {len(leads)} leads")
+                return leads
+            
+            logger.warning("⚠️ Nenhum card encontrado em nenhum método!")
+            logger.info("💡 Tentando debug adicional...")
+            
+            # Debug detalhado
+            try:
+                sections = self.driver.find_elements(By.TAG_NAME, "section")
+                logger.info(f"   Total de seções na página: {len(sections)}")
                 
-                # Debug detalhado
-                try:
-                    sections = self.driver.find_elements(By.TAG_NAME, "section")
-                    logger.info(f"   Total de seções na página: {len(sections)}")
+                if sections:
+                    divs_primeira = sections[0].find_elements(By.TAG_NAME, "div")
+                    logger.info(f"   Divs na primeira seção: {len(divs_primeira)}")
+                    
+                    # Tenta encontrar qualquer elemento com texto de nome
+                    elementos_com_texto = sections[0].find_elements(By.XPATH, ".//*[string-length(text()) > 3]")
+                    logger.info(f"   Elementos com texto: {len(elementos_com_texto)}")
                     
-                    if sections:
-                        divs_primeira = sections[0].find_elements(By.TAG_NAME, "div")
-                        logger.info(f"   Divs na primeira seção: {len(divs_primeira)}")
-                        
-                        # Tenta encontrar qualquer elemento com texto de nome
-                        elementos_com_texto = sections[0].find_elements(By.XPATH, ".//*[string-length(text()) > 3]")
-                        logger.info(f"   Elementos com texto: {len(elementos_com_texto)}")
-                        
-                        if elementos_com_texto:
-                            logger.info("   Alguns textos encontrados:")
-                            for elem in elementos_com_texto[:5]:
-                                logger.info(f"      - {elem.text[:30]}")
-                except Exception as debug_error:
-                    logger.error(f"   Erro no debug: {debug_error}")
+                    if elementos_com_texto:
+                        logger.info("   Alguns textos encontrados:")
+                        for elem in elementos_com_texto[:5]:
+                            logger.info(f"      - {elem.text[:30]}")
+            except Exception as debug_error:
+                logger.error(f"   Erro no debug: {debug_error}")
                 
-            logger.info(f"📊 Total final de leads encontrados: {len(cards)}")
-            return cards
+            logger.info("📊 Total final de leads encontrados: 0")
+            return []
             
         except Exception as e:
             logger.error(f"❌ Erro ao buscar leads: {e}")
@@ -208,29 +507,122 @@ Vi que entrou em contato conosco, o que vc procura? Compra, venda de caminhões?
             logger.error(traceback.format_exc())
             return []
     
-    def clicar_no_lead(self, card):
-        """Clica no card do lead para abrir os detalhes"""
+    @medir_fase("colheita")
+    def colher_leads(self):
+        """Lê a coluna 'Entrada de Leads' inteira (pelo backend do CRM) e acrescenta os leads novos à fila"""
+        logger.info(f"🌾 Colhendo leads da coluna 'Entrada de Leads' ({self.crm.nome})...")
+        try:
+            return self.crm.colher(self.fila)
+        except ErroAPICRM as e:
+            logger.error(f"❌ Erro ao listar os leads pela API: {e}")
+            return len(self.fila)
+    
+    def colher_quadro(self, fila):
+        """Colheita pela interface: lê os cards do quadro, rolando a coluna até o fim"""
+        # Certifica que está na página do pipeline
+        if "pipeline" not in self.driver.current_url:
+            self.voltar_para_pipeline()
+        
+        leads = self.obter_leads_entrada()
+        fila.adicionar(leads)
+        
+        # A coluna carrega os cards sob demanda: rola até o último até parar de crescer
+        for _ in range(MAX_ROLAGENS_COLHEITA):
+            if not leads:
+                break
+            if leads[-1].get("elemento"):
+                self.driver.execute_script("arguments[0].scrollIntoView({block: 'end'});",
+                                           leads[-1]["elemento"])
+            elif not self._rolar_coluna_cdp():
+                break
+            mais_leads = self.esperas.aguardar("coluna_cresceu", quantidade_antes=len(leads))
+            if not mais_leads:
+                break
+            leads = mais_leads
+            fila.adicionar(leads)
+        
+        return len(fila)
+    
+    def _rolar_coluna_cdp(self):
+        """Rola até o último card do snapshot feito pelo CDP. Retorna True se rolou"""
+        if not self._cdp_disponivel():
+            return False
+        try:
+            return bool(self.cdp.avaliar(self.aba_crm, SCRIPT_ROLAR_ULTIMO_CARD, operacao="snapshot"))
+        except ErroCDP as e:
+            logger.warning(f"⚠️ Não foi possível rolar a coluna pelo CDP: {e}")
+            return False
+    
+    def _colher_se_preciso(self):
+        """Colhe a coluna se a fila pedir, sem que dois bots do pool colham ao mesmo tempo"""
+        if not self.fila.precisa_colher():
+            return
+        geracao = self.fila.geracao
+        with self.fila.trava_colheita:
+            # Outro bot pode ter colhido enquanto este esperava a vez
+            if self.fila.geracao == geracao and self.fila.precisa_colher():
+                self.colher_leads()
+    
+    @medir_fase("abrir_lead")
+    def abrir_lead(self, lead):
+        """Abre o lead da fila direto pela URL (ou pelo card, se não houver link)"""
         try:
-            logger.info(f"Tentando clicar no card...")
+            if lead.get("link"):
+                logger.info(f"Abrindo lead '{lead['nome'] or lead['chave']}' pela URL...")
+                
+                # Primeiro pelo roteador do app, sem recarregar os micro-frontends
+                if self.modo_navegacao == "spa":
+                    inicio = time.monotonic()
+                    if self._tentar_navegacao("abrir", lambda: self._navegar_spa(lead["link"])
+                                              and self.esperas.aguardar("drawer_aberto", timeout=5)):
+                        self.navegacao.registrar("abrir", "spa", time.monotonic() - inicio)
+                        return True
+                    logger.info("Navegação SPA não abriu o lead, carregando a URL...")
+                
+                inicio = time.monotonic()
+                self.driver.get(lead["link"])
+                if self.esperas.aguardar("drawer_aberto"):
+                    self.navegacao.registrar("abrir", "recarregar", time.monotonic() - inicio)
+                    return True
+                logger.warning("⚠️ Painel do lead não abriu pela URL")
+                return False
+            
+            # Sem link: volta para o pipeline e procura o card pela chave
+            self.voltar_para_pipeline()
+            for atual in self.obter_leads_entrada(rapido=False):
+                if chave_lead(atual) == lead["chave"]:
+                    return self.clicar_no_lead(atual)
             
-            # Verifica se o elemento está visível e habilitado
-            if not card.is_displayed():
-                logger.warning("Card não está visível, tentando scroll...")
-                self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", card)
-                time.sleep(1)
+            logger.warning("⚠️ Lead não está mais na coluna 'Entrada de Leads'")
+            return False
             
-            # Tenta pegar o nome do lead antes de clicar (para log)
-            try:
-                nome_no_card = card.text.split('\n')[0] if card.text else "Lead"
-                logger.info(f"Clicando no card: {nome_no_card}")
-            except:
-                pass
+        except Exception as e:
+            logger.error(f"Erro ao abrir lead: {e}")
+            return False
+    
+    def _filtrar_visiveis(self, leads):
+        """Mantém apenas os leads renderizados (se houver algum)"""
+        visiveis = [lead for lead in leads if lead["visivel"]]
+        if len(visiveis) != len(leads):
+            logger.info(f"   Destes, {len(visiveis)} estão visíveis")
+        return visiveis if visiveis else leads
+    
+    def clicar_no_lead(self, lead):
+        """Clica no card do lead (registro do snapshot) para abrir os detalhes"""
+        try:
+            logger.info(f"Clicando no card: {lead['nome'] or 'Lead'}")
+            card = lead["elemento"]
+            
+            # Visibilidade já veio no snapshot - só faz scroll se o card está fora da tela
+            if not lead["na_tela"]:
+                logger.info("Card fora da tela, fazendo scroll...")
+                self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", card)
             
             # Método 1: Clique normal
             try:
                 card.click()
                 logger.info("✅ Clicou no card (método normal)")
-                time.sleep(3)
+                self.esperas.aguardar("drawer_aberto")
                 return True
             except Exception as e:
                 logger.warning(f"Clique normal falhou: {e}")
@@ -240,7 +632,7 @@ Vi que entrou em contato conosco, o que vc procura? Compra, venda de caminhões?
                 logger.info("Tentando clique via JavaScript...")
                 self.driver.execute_script("arguments[0].click();", card)
                 logger.info("✅ Clicou no card (método JavaScript)")
-                time.sleep(3)
+                self.esperas.aguardar("drawer_aberto")
                 return True
             except Exception as e:
                 logger.warning(f"Clique JavaScript falhou: {e}")
@@ -252,7 +644,7 @@ Vi que entrou em contato conosco, o que vc procura? Compra, venda de caminhões?
                 actions = ActionChains(self.driver)
                 actions.move_to_element(card).click().perform()
                 logger.info("✅ Clicou no card (método ActionChains)")
-                time.sleep(3)
+                self.esperas.aguardar("drawer_aberto")
                 return True
             except Exception as e:
                 logger.warning(f"Clique ActionChains falhou: {e}")
@@ -264,6 +656,7 @@ Vi que entrou em contato conosco, o que vc procura? Compra, venda de caminhões?
             logger.error(f"Erro ao clicar no lead: {e}")
             return False
     
+    @medir_fase("botao_whatsapp")
     def verificar_botao_whatsapp(self):
         """Verifica se existe o botão 'Abrir com WhatsApp'"""
         try:
@@ -272,84 +665,74 @@ Vi que entrou em contato conosco, o que vc procura? Compra, venda de caminhões?
             
             logger.info("Procurando botão WhatsApp...")
             
+            # Atalho CDP: as pistas dos métodos abaixo numa única consulta, sem o chromedriver
+            if self._cdp_disponivel():
+                try:
+                    botao = self.cdp.procurar_botao_whatsapp(self.aba_crm)
+                    if botao:
+                        self.metricas.anotar(metodo="cdp")
+                        logger.info("✅ Botão WhatsApp encontrado (CDP)!")
+                        return botao
+                except ErroCDP as e:
+                    logger.warning(f"⚠️ Procura pelo CDP falhou ({e}) - usando os seletores")
+            
             # Método 1: Encontra o <title> e sobe 2 níveis até o <button>
-            try:
-                title_element = self.wait.until(
-                    EC.presence_of_element_located((By.XPATH, "//title[contains(text(), 'Abrir com WhatsApp')]"))
-                )
+            def metodo_1():
+                title_element = self.driver.find_element(By.XPATH, "//title[contains(text(), 'Abrir com WhatsApp')]")
                 
-                # Sobe para o SVG (pai)
-                svg_element = title_element.find_element(By.XPATH, "..")
-                
-                # Sobe para o BUTTON (avô)
-                botao = svg_element.find_element(By.XPATH, "..")
+                # Sobe para o SVG (pai) e depois para o BUTTON (avô)
+                botao = title_element.find_element(By.XPATH, "../..")
                 
                 if botao.tag_name == 'button':
-                    logger.info("✅ Botão WhatsApp encontrado (método 1 - hierarquia)!")
                     return botao
-                else:
-                    logger.warning(f"Elemento encontrado não é button, é: {botao.tag_name}")
-                    # Continua tentando outros métodos
-                    
-            except Exception as e:
-                logger.warning(f"Método 1 falhou: {e}")
+                logger.warning(f"Elemento encontrado não é button, é: {botao.tag_name}")
+                return None
             
             # Método 2: Busca direto por button que contém o SVG com o title
-            try:
-                botao = self.driver.find_element(By.XPATH, 
+            def metodo_2():
+                return self.driver.find_element(By.XPATH, 
                     "//button[.//title[contains(text(), 'Abrir com WhatsApp')]]")
-                logger.info("✅ Botão WhatsApp encontrado (método 2 - XPath direto)!")
-                return botao
-            except Exception as e:
-                logger.warning(f"Método 2 falhou: {e}")
             
             # Método 3: Busca por button com classe IconButton que contém SVG
-            try:
+            def metodo_3():
                 botao = self.driver.find_element(By.XPATH, 
                     "//button[contains(@class, 'IconButton')][.//svg]")
                 # Verifica se é realmente o botão do WhatsApp checando se tem o title
                 if "Abrir com WhatsApp" in botao.get_attribute('innerHTML'):
-                    logger.info("✅ Botão WhatsApp encontrado (método 3 - por classe)!")
                     return botao
-            except Exception as e:
-                logger.warning(f"Método 3 falhou: {e}")
+                return None
             
             # Método 4: Busca por qualquer elemento com texto "Abrir com WhatsApp" e sobe até button
-            try:
+            def metodo_4():
                 elemento_whats = self.driver.find_element(By.XPATH, 
                     "//*[contains(text(), 'Abrir com WhatsApp')]")
-                
-                # Sobe na hierarquia até encontrar um button
-                elemento_atual = elemento_whats
-                for nivel in range(10):
-                    try:
-                        elemento_atual = elemento_atual.find_element(By.XPATH, "..")
-                        if elemento_atual.tag_name == 'button':
-                            logger.info(f"✅ Botão WhatsApp encontrado (método 4 - subindo {nivel+1} níveis)!")
-                            return elemento_atual
-                    except:
-                        break
-                        
-            except Exception as e:
-                logger.warning(f"Método 4 falhou: {e}")
+                return elemento_whats.find_element(By.XPATH, "ancestor::button[1]")
             
-            # Se nenhum método funcionou
-            logger.warning("❌ Botão WhatsApp não encontrado em nenhum método")
-            logger.info("💡 Verificando se o elemento está visível na página...")
-            
-            # Última tentativa: lista todos os buttons visíveis (debug)
-            try:
+            # Método 5: Varredura - procura manualmente em cada button da página
+            def metodo_5():
                 buttons = self.driver.find_elements(By.TAG_NAME, "button")
-                logger.info(f"   Total de buttons na página: {len(buttons)}")
-                
-                # Procura manualmente em cada button
                 for btn in buttons:
                     if "whatsapp" in btn.get_attribute('innerHTML').lower():
-                        logger.info("✅ Encontrou button com 'whatsapp' no HTML!")
                         return btn
-            except:
-                pass
+                return None
+            
+            # O painel já está aberto (esperas): uma rodada basta, sem os 20s da
+            # espera antiga - lead sem WhatsApp não tem botão para esperar
+            metodo, botao = self.seletores.executar(site_atual(self.driver), "botao_whatsapp", [
+                ("método 1 - hierarquia", metodo_1),
+                ("método 2 - XPath direto", metodo_2),
+                ("método 3 - por classe", metodo_3),
+                ("método 4 - ancestral button", metodo_4),
+                ("método 5 - varredura de buttons", metodo_5),
+            ])
+            
+            self.metricas.anotar(metodo=metodo)
+            if botao:
+                logger.info(f"✅ Botão WhatsApp encontrado ({metodo})!")
+                return botao
             
+            # Se nenhum método funcionou
+            logger.warning("❌ Botão WhatsApp não encontrado em nenhum método")
             return None
             
         except Exception as e:
@@ -373,6 +756,7 @@ Vi que entrou em contato conosco, o que vc procura? Compra, venda de caminhões?
         except Exception as e:
             logger.error(f"Erro ao listar leads: {e}")
     
+    @medir_fase("nome")
     def obter_nome_lead(self):
         """Obtém o nome do lead atual"""
         try:
@@ -385,151 +769,250 @@ Vi que entrou em contato conosco, o que vc procura? Compra, venda de caminhões?
             logger.warning("Não foi possível obter o nome do lead")
             return "Lead sem nome"
     
+    @medir_fase("telefone")
+    def obter_telefone_lead(self):
+        """
+        Lê o telefone do painel do lead e normaliza para E.164.
+        Retorna (bruto, e164, tipo) ou None se o painel não mostra telefone
+        """
+        try:
+            candidatos = self.driver.execute_script(SCRIPT_TELEFONES_LEAD) or []
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível ler o telefone do lead: {e}")
+            return None
+        
+        telefone = escolher_telefone(candidatos)
+        if telefone:
+            bruto, e164, tipo = telefone
+            logger.info(f"📞 Telefone do lead: {bruto} → {e164 or '-'} ({tipo})")
+        else:
+            logger.info("📞 Telefone não encontrado no painel - a validação fica com o WhatsApp Web")
+        return telefone
+    
+    def _declinar_telefone(self, lead, nome, telefone):
+        """Move para Declinado um lead com telefone inválido ou fixo, sem abrir o WhatsApp Web"""
+        bruto, _, tipo = telefone
+        motivo = "telefone fixo" if tipo == "fixo" else "telefone inválido"
+        self.diario.registrar(lead, "telefone_descartado", f"{tipo}: {bruto}")
+        logger.warning(f"❌ Lead '{nome}' com {motivo} ({bruto}) - não abre o WhatsApp")
+        logger.info("📍 Movendo para coluna 'Declinado'...")
+        if self.mover_lead(lead, "Declinado"):
+            self.diario.registrar(lead, "etapa_movida", "Declinado")
+        return "numero_invalido"
+    
+    @medir_fase("clicar_whatsapp")
     def clicar_whatsapp(self, botao):
-        """Clica no botão do WhatsApp"""
+        """
+        Clica no botão do WhatsApp do CRM. A abertura da aba nova é interceptada
+        para pegar só a URL do chat, que depois é aberto na aba persistente
+        """
         try:
-            botao.click()
+            self.url_chat = None
+            self.aba_chat = None
+            abas_antes = len(self.driver.window_handles)
+            if isinstance(botao, AlvoCDP):
+                self._clicar_cdp(botao, SCRIPT_INTERCEPTAR_ABERTURA)
+            else:
+                self.driver.execute_script(SCRIPT_INTERCEPTAR_ABERTURA)
+                botao.click()
             logger.info("✅ Clicou no botão WhatsApp!")
-            logger.info("⏳ Aguardando WhatsApp Web carregar (8 segundos)...")
-            time.sleep(8)  # Aguarda mais tempo para a nova aba abrir e carregar
+            
+            abertura = self.esperas.aguardar("abertura_whatsapp", abas_antes=abas_antes)
+            if not abertura:
+                logger.error("❌ O botão do WhatsApp não abriu nenhuma conversa")
+                return False
+            
+            tipo, valor = abertura
+            if tipo == "url" and url_chat_web(valor, base=self.url_whatsapp):
+                self.url_chat = url_chat_web(valor, base=self.url_whatsapp)
+                self.aba_chat = self.aba_whatsapp
+                logger.info(f"🔗 Conversa capturada: {self.url_chat}")
+            else:
+                # Não deu para interceptar: usa a aba que o CRM abriu e a fecha depois do envio
+                novas = [h for h in self.driver.window_handles if h not in (self.aba_crm, self.aba_whatsapp)]
+                if not novas:
+                    logger.error("❌ A aba do WhatsApp não abriu")
+                    return False
+                self.aba_chat = novas[-1]
+                logger.warning("⚠️ O CRM abriu uma aba nova para o WhatsApp - usando a aba avulsa")
             return True
         except Exception as e:
             logger.error(f"Erro ao clicar no WhatsApp: {e}")
             return False
     
+    def _clicar_cdp(self, alvo, script_antes=None):
+        """
+        Clica pelo CDP no elemento guardado na página (rodando antes o script
+        informado). Se o atalho falhar, pega o mesmo elemento pelo Selenium e clica
+        """
+        try:
+            if script_antes:
+                self.cdp.avaliar(alvo.aba, script_antes, operacao="clicar")
+            self.cdp.clicar(alvo)
+            return
+        except ErroCDP as e:
+            logger.warning(f"⚠️ Clique pelo CDP falhou ({e}) - clicando pelo Selenium")
+        if script_antes:
+            self.driver.execute_script(script_antes)
+        elemento = self.driver.execute_script(f"return {alvo.expressao};")
+        if not elemento:
+            raise NoSuchElementException(f"{alvo.expressao} não está mais na página")
+        elemento.click()
+    
+    @medir_fase("abrir_chat")
+    def _abrir_chat(self):
+        """
+        Muda para a aba do chat. Na aba persistente, troca de conversa dentro do
+        app já carregado; se o app não reagir, carrega a URL do chat na mesma aba
+        (e, depois de algumas falhas seguidas, passa a carregar a URL direto).
+        Retorna ('valido', caixa), ('invalido', botão OK do erro) ou ('timeout', None)
+        """
+        if self.aba_chat != self.aba_whatsapp:
+            inicio = time.monotonic()
+            self.driver.switch_to.window(self.aba_chat)
+            self._ajustar_user_agent()
+            self.perfil_rede.aplicar(self.driver)
+            resultado = self.esperas.aguardar("chat_whatsapp")
+            self.navegacao_chat.registrar("chat", "nova_aba", time.monotonic() - inicio)
+            self.metricas.anotar(modo="nova_aba", estado=resultado[0] if resultado else "timeout")
+            return resultado or ("timeout", None)
+        
+        if self.aba_whatsapp not in self.driver.window_handles:
+            logger.warning("⚠️ A aba do WhatsApp Web foi fechada - abrindo de novo")
+            self._abrir_aba_whatsapp()
+            self.aba_chat = self.aba_whatsapp
+        
+        inicio = time.monotonic()
+        self.driver.switch_to.window(self.aba_whatsapp)
+        resultado = None
+        
+        def trocar_no_lugar():
+            nonlocal resultado
+            self.driver.execute_script(SCRIPT_ABRIR_CHAT, self.url_chat)
+            resultado = self.esperas.aguardar("chat_whatsapp", timeout=ESPERA_CHAT_NO_LUGAR)
+            return bool(resultado)
+        
+        if self._tentar_navegacao("chat", trocar_no_lugar):
+            self.navegacao_chat.registrar("chat", "no_lugar", time.monotonic() - inicio)
+            self.metricas.anotar(modo="no_lugar", estado=resultado[0])
+            return resultado
+        
+        if self.falhas_navegacao["chat"] < MAX_FALHAS_NAVEGACAO:
+            logger.info("🔄 O WhatsApp Web não trocou de conversa no lugar - carregando a URL do chat")
+        inicio = time.monotonic()
+        self.driver.get(self.url_chat)
+        resultado = self.esperas.aguardar("chat_whatsapp")
+        self.navegacao_chat.registrar("chat", "recarregar", time.monotonic() - inicio)
+        self.metricas.anotar(modo="recarregar", estado=resultado[0] if resultado else "timeout")
+        return resultado or ("timeout", None)
+    
+    def _voltar_para_crm(self):
+        """Fecha a aba do chat se ela for avulsa e volta para a aba do RD Station"""
+        if self.rede:
+            # O driver ainda está na aba do chat: soma o que ela baixou para este lead
+            self.rede.ler(self.driver)
+        try:
+            if self.aba_chat and self.aba_chat != self.aba_whatsapp and \
+                    self.aba_chat in self.driver.window_handles:
+                self.driver.switch_to.window(self.aba_chat)
+                self.driver.close()
+        except Exception:
+            pass
+        self.aba_chat = None
+        self.driver.switch_to.window(self.aba_crm)
+    
     def enviar_mensagem_whatsapp(self):
-        """Envia a mensagem padrão no WhatsApp Web"""
+        """
+        Envia a mensagem padrão no WhatsApp Web.
+        Retorna True (enviada), False (número inválido) ou None (chat não carregou
+        ou o texto da caixa não conferiu com a mensagem - nada é enviado)
+        """
         try:
-            # Muda para a última aba (WhatsApp)
-            self.driver.switch_to.window(self.driver.window_handles[-1])
+            # Abre a conversa e detecta o que aparece primeiro: caixa de mensagem ou erro de número
+            logger.info("⏳ Aguardando WhatsApp Web carregar o chat...")
+            estado, elemento = self._abrir_chat()
             logger.info("✅ Mudou para aba do WhatsApp")
             
-            # Aguarda a página do WhatsApp carregar completamente
-            logger.info("⏳ Aguardando WhatsApp Web carregar completamente...")
-            time.sleep(8)  # Tempo maior para carregar o chat
-            
-            # VERIFICA SE APARECEU ERRO DE NÚMERO INVÁLIDO
-            try:
-                logger.info("🔍 Verificando se o número é válido...")
-                
-                # Procura ESPECIFICAMENTE pelo modal de erro do WhatsApp
-                # O modal tem um texto específico e um botão OK
-                
-                # Primeiro, verifica se existe o texto EXATO de erro
-                page_text = self.driver.page_source
-                
-                erros_encontrados = (
-                    "não está no WhatsApp" in page_text or
-                    "not on WhatsApp" in page_text or
-                    "Número de telefone compartilhado via URL é inválido" in page_text or
-                    "Phone number shared via url is invalid" in page_text
-                )
-                
-                # E também verifica se tem o botão OK (indica que é um modal de erro)
-                tem_botao_ok = False
+            if estado == "invalido":
+                logger.warning("⚠️ NÚMERO INVÁLIDO OU NÃO EXISTE NO WHATSAPP!")
+                logger.info("🔍 Clicando no botão OK...")
                 try:
-                    botao_ok = self.driver.find_element(By.XPATH,
-                        "//div[contains(@role, 'dialog') or contains(@class, 'modal')]//button[text()='OK' or text()='Ok']")
-                    tem_botao_ok = True
-                except:
-                    pass
+                    elemento.click()
+                    logger.info("✅ Clicou no botão OK")
+                    self.esperas.aguardar("dialogo_fechado")
+                except Exception as e:
+                    logger.warning(f"⚠️ Erro ao clicar no OK: {e}")
                 
-                if erros_encontrados and tem_botao_ok:
-                    logger.warning("⚠️ NÚMERO INVÁLIDO OU NÃO EXISTE NO WHATSAPP!")
-                    logger.info("🔍 Clicando no botão OK...")
-                    
-                    # Clica no botão OK
-                    try:
-                        time.sleep(1)
-                        botao_ok.click()
-                        logger.info("✅ Clicou no botão OK")
-                        time.sleep(2)
-                    except Exception as e:
-                        logger.warning(f"⚠️ Erro ao clicar no OK: {e}")
-                    
-                    # Fecha a aba do WhatsApp
-                    logger.info("🔒 Fechando aba do WhatsApp...")
-                    self.driver.close()
-                    
-                    # Volta para a aba do RD Station
-                    self.driver.switch_to.window(self.driver.window_handles[0])
-                    logger.info("✅ Voltou para aba do RD Station")
-                    
-                    logger.warning("❌ LEAD COM NÚMERO INVÁLIDO - NÃO ENVIOU MENSAGEM")
-                    return False
+                # Volta para a aba do RD Station
+                self._voltar_para_crm()
+                logger.info("✅ Voltou para aba do RD Station")
                 
-                # Se chegou aqui, número é válido!
-                logger.info("✅ Número válido! Prosseguindo com envio da mensagem...")
-                    
-            except Exception as e:
-                logger.info(f"Verificação de erro concluída (sem erros detectados)")
-                # Se der erro na verificação, assume que está tudo ok e continua
-            
-            # Procura pela caixa de texto do WhatsApp
-            try:
-                logger.info("🔍 Procurando caixa de mensagem do WhatsApp...")
-                caixa_mensagem = self.wait.until(
-                    EC.presence_of_element_located((By.XPATH, "//div[@contenteditable='true'][@data-tab='10']"))
-                )
-                logger.info("✅ Caixa de mensagem encontrada!")
-            except:
-                # Tenta outro seletor
-                logger.info("🔍 Tentando seletor alternativo...")
-                try:
-                    caixa_mensagem = self.wait.until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "div[contenteditable='true'][data-tab='10']"))
-                    )
-                    logger.info("✅ Caixa de mensagem encontrada (seletor alternativo)!")
-                except:
-                    # Se não encontrou a caixa, pode ser erro no número
-                    logger.error("❌ Não encontrou caixa de mensagem - provavelmente número inválido")
-                    
-                    # Tenta fechar possível modal de erro
-                    try:
-                        botao_ok = self.driver.find_element(By.XPATH, "//button[contains(text(), 'OK')]")
-                        botao_ok.click()
-                        time.sleep(1)
-                    except:
-                        pass
-                    
-                    # Fecha aba e volta
-                    self.driver.close()
-                    self.driver.switch_to.window(self.driver.window_handles[0])
-                    return False
-            
-            # Aguarda mais um pouco antes de escrever
-            time.sleep(2)
+                logger.warning("❌ LEAD COM NÚMERO INVÁLIDO - NÃO ENVIOU MENSAGEM")
+                return False
             
-            # Clica na caixa de mensagem
-            caixa_mensagem.click()
-            time.sleep(1)
+            if estado == "timeout":
+                # Nem caixa nem erro: WhatsApp lento ou fora do ar, não é motivo para declinar o lead
+                logger.error("❌ O chat não carregou (nem caixa de mensagem nem erro de número)")
+                self._voltar_para_crm()
+                return None
             
-            logger.info("✍️ Digitando mensagem...")
+            logger.info("✅ Número válido! Prosseguindo com envio da mensagem...")
+            caixa_mensagem = elemento
             
-            # Envia a mensagem (linha por linha para manter quebras de linha)
-            linhas = self.mensagem_padrao.split('\n')
-            for i, linha in enumerate(linhas):
-                caixa_mensagem.send_keys(linha)
-                if i < len(linhas) - 1:  # Não adiciona SHIFT+ENTER na última linha
-                    caixa_mensagem.send_keys(Keys.SHIFT + Keys.ENTER)
-            
-            time.sleep(1)
-            
-            # Envia a mensagem (ENTER)
-            logger.info("📤 Enviando mensagem...")
-            caixa_mensagem.send_keys(Keys.ENTER)
-            
-            logger.info("✅ Mensagem enviada com sucesso!")
-            
-            # Aguarda a mensagem ser enviada
-            time.sleep(3)
+            with self.metricas.fase("enviar") as intervalo:
+                logger.info("✍️ Inserindo mensagem...")
+                
+                # Pelo atalho CDP (foco + Input.insertText), se ligado; senão clica na
+                # caixa e cola a mensagem inteira, com a digitação linha a linha de reserva
+                modo, conferido = self._inserir_mensagem_cdp()
+                if not modo:
+                    caixa_mensagem.click()
+                    modo, conferido = inserir_mensagem(self.driver, caixa_mensagem, self.mensagem_padrao)
+                self.modos_insercao[modo] = self.modos_insercao.get(modo, 0) + 1
+                intervalo["modo"] = modo
+                if not conferido:
+                    # Nunca envia um texto truncado ou duplicado: limpa e digita de novo
+                    logger.warning(f"⚠️ O texto da caixa não confere com a mensagem ({modo}) - digitando de novo")
+                    digitar_mensagem(caixa_mensagem, self.mensagem_padrao)
+                    modo = "digitar"
+                    conferido = texto_confere(self.driver, caixa_mensagem, self.mensagem_padrao)
+                if not conferido:
+                    logger.error("❌ O texto da caixa continua diferente da mensagem - NÃO ENVIOU")
+                    intervalo["conferido"] = False
+                    caixa_mensagem.send_keys(Keys.CONTROL, "a")
+                    caixa_mensagem.send_keys(Keys.DELETE)
+                    self.motivo_erro = "o texto da caixa não conferiu com a mensagem"
+                    self._voltar_para_crm()
+                    return None
+                logger.info(f"✅ Mensagem conferida na caixa ({modo})")
+                
+                if self.simulacao:
+                    # Sem ENTER; a caixa é limpa para não deixar rascunho na conversa
+                    intervalo["simulado"] = True
+                    logger.info("🧪 [simulação] Mensagem pronta na caixa - ENTER não pressionado")
+                    caixa_mensagem.send_keys(Keys.CONTROL, "a")
+                    caixa_mensagem.send_keys(Keys.DELETE)
+                else:
+                    # Marca no diário ANTES do ENTER: se o processo morrer daqui em diante,
+                    # a próxima execução não envia a mensagem de novo
+                    if self.lead_atual:
+                        self.diario.registrar(self.lead_atual, "enviando")
+                    
+                    # Envia a mensagem (ENTER)
+                    logger.info("📤 Enviando mensagem...")
+                    caixa_mensagem.send_keys(Keys.ENTER)
+                    
+                    # Aguarda a mensagem sair da caixa de texto
+                    if not self.esperas.aguardar("mensagem_enviada"):
+                        logger.warning("⚠️ A caixa de mensagem não esvaziou - envio pode não ter sido concluído")
             
-            # Fecha a aba do WhatsApp
-            logger.info("🔒 Fechando aba do WhatsApp...")
-            self.driver.close()
+            if self.simulacao:
+                logger.info(f"🧪 [simulação] A mensagem seria enviada para {self.url_chat or 'o chat aberto'}")
+            else:
+                logger.info("✅ Mensagem enviada com sucesso!")
             
-            # Volta para a aba do RD Station
-            self.driver.switch_to.window(self.driver.window_handles[0])
+            # Volta para a aba do RD Station (a aba do WhatsApp continua aberta para o próximo lead)
+            self._voltar_para_crm()
             logger.info("✅ Voltou para aba do RD Station")
             
             return True
@@ -543,365 +1026,606 @@ Vi que entrou em contato conosco, o que vc procura? Compra, venda de caminhões?
                 botao_ok = self.driver.find_element(By.XPATH, "//button[contains(text(), 'OK')]")
                 botao_ok.click()
                 logger.info("Clicou em OK do modal de erro")
-                time.sleep(1)
-            except:
-                pass
-            
-            # Tenta fechar a aba do WhatsApp se estiver aberta
-            try:
-                if len(self.driver.window_handles) > 1:
-                    self.driver.close()
+                self.esperas.aguardar("dialogo_fechado")
             except:
                 pass
             
             # Tenta voltar para aba do RD Station
             try:
-                self.driver.switch_to.window(self.driver.window_handles[0])
+                self._voltar_para_crm()
             except:
                 pass
             
             return False
     
-    def mudar_status_para_contato_realizado(self):
-        """Muda o status do lead para 'Contato Realizado' clicando na aba"""
+    def _inserir_mensagem_cdp(self):
+        """Insere a mensagem pelo CDP e confere. Retorna ('cdp', True) ou (None, False)"""
+        if not self._cdp_disponivel():
+            return None, False
+        try:
+            texto = self.cdp.inserir_texto(self.aba_chat, SELETOR_CAIXA_MENSAGEM, self.mensagem_padrao)
+        except ErroCDP as e:
+            logger.warning(f"⚠️ Inserção pelo CDP falhou ({e}) - usando o Selenium")
+            return None, False
+        if normalizar_texto(texto) == normalizar_texto(self.mensagem_padrao):
+            return "cdp", True
+        logger.warning("⚠️ Texto inserido pelo CDP não confere com a mensagem - usando o Selenium")
+        return None, False
+    
+    def mover_lead(self, lead, etapa):
+        """Move o lead para a etapa pelo backend do CRM (interface ou API)"""
+        with self.metricas.fase("mudar_etapa", etapa=etapa, backend=self.crm.nome):
+            return self.crm.mudar_etapa(lead, etapa)
+    
+    def mudar_etapa(self, rotulo):
+        """
+        Move o lead aberto para a etapa 'rotulo' clicando na aba dela. A posição
+        de cada etapa vem do mapa lido uma vez por sessão; a mudança é confirmada
+        observando a aba ativa (ou a lista de etapas mudar)
+        """
         try:
-            logger.info("📍 Mudando status para 'Contato Realizado'...")
+            logger.info(f"📍 Mudando etapa para '{rotulo}'...")
             
-            # Aguarda a página do lead carregar
-            time.sleep(3)
+            # Aguarda o painel do lead carregar
+            if not self.esperas.aguardar("drawer_aberto"):
+                logger.warning("⚠️ Painel do lead não abriu - etapa não alterada")
+                return False
             
-            # Método 1: CSS Selector EXATO fornecido pelo usuário
-            try:
-                logger.info("🔍 Procurando aba 'Contato Realizado' (método 1 - CSS exato)...")
-                botao = self.wait.until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, 
-                        "#mfe-crm-deal-details > div > div > div.sc-iQvgRB.beTuLZ > div > div:nth-child(2) > ul > li:nth-child(2) > div > button > strong"))
-                )
-                
-                # Clica no strong ou no botão pai
-                try:
-                    botao.click()
-                except:
-                    # Se clicar no strong não funcionar, clica no botão pai
-                    botao_pai = botao.find_element(By.XPATH, "../..")
-                    botao_pai.click()
-                
-                logger.info("✅ Clicou na aba 'Contato Realizado'!")
-                time.sleep(3)
-                
-                # Verifica se há confirmação
-                try:
-                    confirmar = self.driver.find_element(By.XPATH, 
-                        "//button[contains(text(), 'Confirmar') or contains(text(), 'Salvar') or contains(text(), 'OK')]")
-                    confirmar.click()
-                    logger.info("✅ Confirmou mudança")
-                    time.sleep(2)
-                except:
-                    pass
-                
-                logger.info("✅ Status alterado para 'Contato Realizado'!")
-                return True
-                
-            except Exception as e:
-                logger.warning(f"Método 1 falhou: {e}")
+            # Uma chamada: confere o rótulo na posição do mapa e clica
+            estado, assinatura, posicao = self._clicar_etapa_mapeada(rotulo)
             
-            # Método 2: Tenta encontrar o botão pela estrutura mais genérica
-            try:
-                logger.info("🔍 Tentando método alternativo (método 2)...")
-                botao = self.driver.find_element(By.CSS_SELECTOR,
-                    "#mfe-crm-deal-details ul > li:nth-child(2) button")
-                botao.click()
-                logger.info("✅ Clicou na aba 'Contato Realizado' (método 2)!")
-                time.sleep(3)
+            if estado == "ativa":
+                logger.info(f"✅ O lead já está em '{rotulo}'")
                 return True
-            except Exception as e:
-                logger.warning(f"Método 2 falhou: {e}")
+            if estado == "localizou":
+                logger.info(f"🧪 [simulação] Aba '{rotulo}' localizada (posição {posicao}) - clique não executado")
+                return True
+            if estado != "clicou":
+                if self.simulacao:
+                    logger.warning(f"⚠️ [simulação] Aba '{rotulo}' não encontrada - a mudança de etapa falharia")
+                    return False
+                # A posição não conferiu com o rótulo: só a busca pelo texto é segura
+                assinatura = self.driver.execute_script(SCRIPT_ASSINATURA_ETAPAS)
+                if not self._clicar_etapa_por_seletor(rotulo):
+                    logger.warning(f"⚠️ Não foi possível mudar a etapa para '{rotulo}'. Continuando...")
+                    return False
+            
+            logger.info(f"✅ Clicou na aba '{rotulo}'!")
+            if not self.esperas.aguardar("etapa_alterada", rotulo=rotulo, assinatura_anterior=assinatura):
+                logger.warning(f"⚠️ A aba '{rotulo}' não ficou ativa - a mudança pode não ter sido salva")
             
-            # Método 3: Busca pelo texto do strong
+            # Verifica se há confirmação
             try:
-                logger.info("🔍 Tentando buscar por texto (método 3)...")
-                strong = self.driver.find_element(By.XPATH, 
-                    "//strong[contains(text(), 'Contato Realizado')]")
-                
-                # Pega o botão pai
-                botao = strong.find_element(By.XPATH, "../..")
-                botao.click()
-                
-                logger.info("✅ Clicou na aba 'Contato Realizado' (método 3)!")
-                time.sleep(3)
-                return True
-            except Exception as e:
-                logger.warning(f"Método 3 falhou: {e}")
+                confirmar = self.driver.find_element(By.XPATH, 
+                    "//button[contains(text(), 'Confirmar') or contains(text(), 'Salvar') or contains(text(), 'OK')]")
+                confirmar.click()
+                logger.info("✅ Confirmou mudança")
+                self.esperas.aguardar("dialogo_fechado")
+            except:
+                pass
             
-            logger.warning("⚠️ Mudança automática falhou")
-            logger.warning("⚠️ Não foi possível mudar status automaticamente. Continuando...")
-            return False
+            logger.info(f"✅ Etapa alterada para '{rotulo}'!")
+            return True
                 
         except Exception as e:
-            logger.error(f"Erro ao mudar status: {e}")
-            logger.warning("⚠️ Continuando sem mudar status...")
+            logger.error(f"Erro ao mudar etapa para '{rotulo}': {e}")
+            logger.warning("⚠️ Continuando sem mudar etapa...")
             return False
     
-    def mudar_status_para_declinado(self):
-        """Muda o status do lead para 'Declinado' quando não tem WhatsApp"""
-        try:
-            logger.info("📍 Movendo lead para 'Declinado' (sem WhatsApp)...")
-            
-            # Aguarda a página do lead carregar
-            time.sleep(3)
-            
-            # Método 1: CSS Selector EXATO fornecido pelo usuário
-            try:
-                logger.info("🔍 Procurando aba 'Declinado' (método 1 - CSS exato)...")
-                botao = self.wait.until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR,
-                        "#mfe-crm-deal-details > div > div > div.sc-iQvgRB.beTuLZ > div > div:nth-child(2) > ul > li:nth-child(7) > div > button > strong"))
-                )
-                
-                # Clica no strong ou no botão pai
-                try:
-                    botao.click()
-                except:
-                    # Se clicar no strong não funcionar, clica no botão pai
-                    botao_pai = botao.find_element(By.XPATH, "../..")
-                    botao_pai.click()
-                
-                logger.info("✅ Clicou na aba 'Declinado'!")
-                time.sleep(3)
-                
-                # Verifica se há confirmação
-                try:
-                    confirmar = self.driver.find_element(By.XPATH,
-                        "//button[contains(text(), 'Confirmar') or contains(text(), 'Salvar') or contains(text(), 'OK')]")
-                    confirmar.click()
-                    logger.info("✅ Confirmou mudança")
-                    time.sleep(2)
-                except:
-                    pass
-                
-                logger.info("✅ Lead movido para 'Declinado'!")
-                return True
-                
-            except Exception as e:
-                logger.warning(f"Método 1 falhou: {e}")
-            
-            # Método 2: Tenta encontrar o botão pela estrutura mais genérica
-            try:
-                logger.info("🔍 Tentando método alternativo (método 2)...")
-                botao = self.driver.find_element(By.CSS_SELECTOR,
-                    "#mfe-crm-deal-details ul > li:nth-child(7) button")
-                botao.click()
-                logger.info("✅ Clicou na aba 'Declinado' (método 2)!")
-                time.sleep(3)
-                return True
-            except Exception as e:
-                logger.warning(f"Método 2 falhou: {e}")
-            
-            # Método 3: Busca pelo texto do strong
-            try:
-                logger.info("🔍 Tentando buscar por texto (método 3)...")
-                strong = self.driver.find_element(By.XPATH,
-                    "//strong[contains(text(), 'Declinado')]")
-                
-                # Pega o botão pai
-                botao = strong.find_element(By.XPATH, "../..")
-                botao.click()
-                
-                logger.info("✅ Clicou na aba 'Declinado' (método 3)!")
-                time.sleep(3)
-                return True
-            except Exception as e:
-                logger.warning(f"Método 3 falhou: {e}")
-            
-            logger.warning("⚠️ Mudança automática para Declinado falhou")
-            logger.warning("⚠️ Não foi possível mudar status automaticamente. Continuando...")
+    def _clicar_etapa_mapeada(self, rotulo):
+        """
+        Clica na aba da etapa pela posição do mapa, com o rótulo conferido na
+        página. Se a posição tem outra etapa, relê o mapa e tenta mais uma vez.
+        Retorna (estado, assinatura, posição) do SCRIPT_CLICAR_ETAPA
+        """
+        for _ in range(2):
+            posicao = self.etapas.posicao(self.driver, rotulo)
+            if not posicao:
+                break
+            estado, assinatura = self.driver.execute_script(SCRIPT_CLICAR_ETAPA, posicao, rotulo, self.simulacao)
+            if estado not in ("divergente", "ausente"):
+                return estado, assinatura, posicao
+            self.etapas.invalidar()
+        return "ausente", "", None
+    
+    def _clicar_etapa_por_seletor(self, rotulo):
+        """Reserva quando o mapa de etapas falha: busca a aba pelo texto do rótulo"""
+        def por_texto():
+            strong = self.driver.find_element(By.XPATH, 
+                f"//strong[contains(text(), '{rotulo}')]")
+            
+            # Pega o botão pai
+            botao = strong.find_element(By.XPATH, "../..")
+            botao.click()
+            return True
+        
+        estrategias = [("texto do rótulo", por_texto)]
+        
+        logger.info(f"🔍 Procurando aba '{rotulo}' pelos seletores...")
+        grupo = "etapa_" + rotulo.lower().replace(" ", "_")
+        metodo, clicou = self.seletores.executar(site_atual(self.driver), grupo, estrategias)
+        if clicou:
+            logger.info(f"✅ Aba '{rotulo}' encontrada ({metodo})")
+        return bool(clicou)
+    
+    def _tentar_navegacao(self, modo, funcao):
+        """Executa um modo de navegação no lugar, desistindo dele após falhas seguidas"""
+        if self.falhas_navegacao[modo] >= MAX_FALHAS_NAVEGACAO:
             return False
-                
+        if funcao():
+            self.falhas_navegacao[modo] = 0
+            return True
+        self.falhas_navegacao[modo] += 1
+        if self.falhas_navegacao[modo] == MAX_FALHAS_NAVEGACAO:
+            logger.warning(f"⚠️ Navegação '{modo}' falhou {MAX_FALHAS_NAVEGACAO}x seguidas - desativada")
+        return False
+    
+    def _navegar_spa(self, url):
+        """Navega pelo roteador do CRM (pushState), sem recarregar a página"""
+        try:
+            return bool(self.driver.execute_script(SCRIPT_NAVEGAR_SPA, url))
         except Exception as e:
-            logger.error(f"Erro ao mudar status para Declinado: {e}")
-            logger.warning("⚠️ Continuando sem mudar status...")
+            logger.warning(f"Navegação SPA falhou: {e}")
             return False
     
+    @medir_fase("voltar_pipeline")
     def voltar_para_pipeline(self):
-        """Volta para a página principal do pipeline"""
+        """
+        Volta para o quadro do pipeline.
+        
+        No modo 'spa' tenta primeiro fechar o painel do lead no lugar, depois navegar
+        pelo histórico do app; só recarrega a página se o quadro não ficar pronto.
+        """
         try:
             logger.info("🔄 Voltando para o pipeline...")
             
-            # Força navegação de volta para o pipeline
-            self.driver.get("https://crm.rdstation.com/app/deals/pipeline")
+            if self.modo_navegacao == "spa":
+                # Modo 1: fecha o painel de detalhes no lugar (botão fechar / ESC)
+                inicio = time.monotonic()
+                if self._tentar_navegacao("fechar", lambda: self.driver.execute_script(
+                        SCRIPT_FECHAR_DETALHES) != "ausente" and self.esperas.aguardar("quadro_pronto", timeout=3)):
+                    self.navegacao.registrar("voltar", "fechar", time.monotonic() - inicio)
+                    logger.info("✅ Painel do lead fechado no lugar")
+                    return True
+                
+                # Modo 2: navegação pelo histórico do app
+                inicio = time.monotonic()
+                if self._tentar_navegacao("spa", lambda: self._navegar_spa(self.url_pipeline)
+                                          and self.esperas.aguardar("quadro_pronto")):
+                    self.navegacao.registrar("voltar", "spa", time.monotonic() - inicio)
+                    logger.info("✅ Pipeline exibido sem recarregar")
+                    return True
+                
+                logger.warning("⚠️ Quadro não ficou pronto sem recarregar - recarregando página")
+            
+            # Modo 3: força navegação de volta para o pipeline
+            inicio = time.monotonic()
+            self.driver.get(self.url_pipeline)
             
             logger.info("⏳ Aguardando pipeline carregar...")
-            time.sleep(5)  # Tempo maior para garantir que carregou
+            self.esperas.aguardar("pipeline_renderizado")
+            self.navegacao.registrar("voltar", "recarregar", time.monotonic() - inicio)
             
             logger.info("✅ Pipeline carregado")
             return True
             
         except Exception as e:
             logger.error(f"Erro ao voltar para pipeline: {e}")
-            time.sleep(3)
             return False
     
-    def processar_lead(self, card, index):
+    def processar_lead(self, lead, index):
         """Processa um único lead"""
         logger.info(f"\n{'='*50}")
         logger.info(f"Processando lead #{index + 1}")
         logger.info(f"{'='*50}")
         
-        # Clica no lead
-        if not self.clicar_no_lead(card):
+        self.lead_atual = lead
+        self._iniciar_lead(lead)
+        
+        # Abre o lead
+        if not self.crm.abrir_lead(lead):
             logger.error("Falha ao abrir lead, pulando...")
+            self.motivo_erro = "não foi possível abrir o lead"
             return "erro"
+        self.diario.registrar(lead, "aberto")
         
         # Obtém nome do lead
-        nome = self.obter_nome_lead()
+        nome = self.crm.obter_nome(lead)
+        lead["nome"] = lead.get("nome") or nome
+        
+        # Mensagem já enviada numa execução interrompida: só termina a mudança de etapa
+        if self.diario.ja_enviado(lead):
+            logger.warning(f"♻️ Mensagem para '{nome}' já foi enviada numa execução anterior - não reenvia")
+            if self.mover_lead(lead, "Contato Realizado"):
+                self.diario.registrar(lead, "etapa_movida", "Contato Realizado")
+            return "sucesso"
         
         # Verifica se tem botão WhatsApp
-        botao_whatsapp = self.verificar_botao_whatsapp()
+        botao_whatsapp = self.crm.verificar_whatsapp(lead)
         
         if not botao_whatsapp:
+            self.diario.registrar(lead, "sem_whatsapp")
             logger.warning(f"❌ Lead '{nome}' não tem WhatsApp disponível")
             logger.info("📍 Movendo para coluna 'Declinado'...")
             
             # Move para Declinado
-            self.mudar_status_para_declinado()
-            
-            # Volta para pipeline
-            self.voltar_para_pipeline()
+            if self.mover_lead(lead, "Declinado"):
+                self.diario.registrar(lead, "etapa_movida", "Declinado")
             
             logger.info(f"⚠️ Lead '{nome}' movido para 'Declinado' (sem WhatsApp)")
             return "sem_whatsapp"
         
-        # Clica no WhatsApp
-        if not self.clicar_whatsapp(botao_whatsapp):
-            logger.error("Falha ao abrir WhatsApp, pulando...")
-            self.voltar_para_pipeline()
-            return "erro"
+        self.diario.registrar(lead, "whatsapp_encontrado")
+        
+        # Telefone fixo ou +55 malformado: vai direto para Declinado, sem abrir o
+        # WhatsApp Web. Estrangeiro ou ilegível: o WhatsApp decide
+        telefone = self.crm.obter_telefone(lead)
+        if telefone and telefone[2] in TIPOS_DECLINADOS:
+            return self._declinar_telefone(lead, nome, telefone)
+        
+        if self.crm.usa_navegador:
+            # Clica no WhatsApp
+            if not self.clicar_whatsapp(botao_whatsapp):
+                logger.error("Falha ao abrir WhatsApp, pulando...")
+                self.motivo_erro = "o botão do WhatsApp não abriu a conversa"
+                return "erro"
+        else:
+            # CRM pela API: o chat é aberto direto pelo telefone, sem página do CRM
+            self.url_chat = url_chat_web("", telefone=telefone[1] or telefone[0], base=self.url_whatsapp)
+            self.aba_chat = self.aba_whatsapp
+        
+        # O link que o botão abriu é o número que o WhatsApp vai receber: confere
+        # antes de abrir o chat e usa a forma E.164 (com o 55 e o nono dígito).
+        # Número de outro país ou link sem número legível segue como veio
+        if self.url_chat:
+            bruto = telefone_da_url(self.url_chat)
+            e164, tipo = normalizar_telefone(bruto, internacional=True)
+            if tipo in TIPOS_DECLINADOS:
+                return self._declinar_telefone(lead, nome, (bruto, e164, tipo))
+            if e164:
+                self.url_chat = url_chat_web(self.url_chat, telefone=e164, base=self.url_whatsapp)
         
         # Envia mensagem
         resultado_envio = self.enviar_mensagem_whatsapp()
         
+        if not resultado_envio and self.diario.ja_enviado(lead):
+            # O ENTER já tinha sido pressionado quando algo falhou: trata como enviada
+            logger.warning("⚠️ Falha depois do ENTER - a mensagem pode ter saído, não move para Declinado")
+            resultado_envio = True
+        
+        if resultado_envio is None:
+            # O chat não carregou: o número pode ser válido, então o lead não vai para Declinado
+            logger.error("❌ A mensagem não foi enviada - lead fica na coluna, pulando...")
+            self.motivo_erro = self.motivo_erro or "o WhatsApp Web não carregou o chat"
+            return "erro"
+        
+        if resultado_envio:
+            self.diario.registrar(lead, "mensagem_enviada")
+            # Registra já, antes da mudança de etapa, para o ritmo valer mesmo se algo falhar depois
+            self.limitador.registrar_envio()
+        
         if not resultado_envio:
+            self.diario.registrar(lead, "numero_invalido")
             logger.error("❌ Falha ao enviar mensagem - provavelmente número inválido")
             logger.info("📍 Movendo para coluna 'Declinado'...")
             
             # Move para Declinado (número inválido)
-            self.mudar_status_para_declinado()
-            
-            # Volta para pipeline
-            self.voltar_para_pipeline()
+            if self.mover_lead(lead, "Declinado"):
+                self.diario.registrar(lead, "etapa_movida", "Declinado")
             
             logger.info(f"⚠️ Lead '{nome}' movido para 'Declinado' (número inválido)")
             return "numero_invalido"
         
         # Muda status para Contato Realizado
-        self.mudar_status_para_contato_realizado()
-        
-        # Volta para pipeline
-        self.voltar_para_pipeline()
+        if self.mover_lead(lead, "Contato Realizado"):
+            self.diario.registrar(lead, "etapa_movida", "Contato Realizado")
         
         logger.info(f"✅ Lead '{nome}' processado com sucesso!")
         return "sucesso"
     
+    def _iniciar_lead(self, lead):
+        """Associa as métricas e a contagem de comandos ao lead que começa agora"""
+        self.metricas.iniciar_lead(lead["chave"])
+        self.motivo_erro = None
+        if self.comandos:
+            self.comandos.iniciar_lead(lead["chave"])
+        if self.rede:
+            self.rede.iniciar_lead()
+    
+    def pre_qualificar_lead(self, lead):
+        """
+        Classifica um lead sem enviar nada: 'com_whatsapp', 'sem_whatsapp' ou
+        'numero_invalido' (já movidos para Declinado) ou 'invalido' (não foi possível abrir)
+        """
+        self._iniciar_lead(lead)
+        if not self.crm.abrir_lead(lead):
+            self.motivo_erro = "não foi possível abrir o lead (pré-qualificação)"
+            return "invalido"
+        self.diario.registrar(lead, "aberto")
+        
+        if self.crm.verificar_whatsapp(lead):
+            self.diario.registrar(lead, "whatsapp_encontrado")
+            telefone = self.crm.obter_telefone(lead)
+            if telefone and telefone[2] in TIPOS_DECLINADOS:
+                return self._declinar_telefone(lead, self.crm.obter_nome(lead), telefone)
+            return "com_whatsapp"
+        
+        self.diario.registrar(lead, "sem_whatsapp")
+        nome = self.crm.obter_nome(lead)
+        logger.warning(f"❌ Lead '{nome}' não tem WhatsApp disponível")
+        if self.mover_lead(lead, "Declinado"):
+            self.diario.registrar(lead, "etapa_movida", "Declinado")
+        return "sem_whatsapp"
+    
+    def aproveitar_espera(self, fim):
+        """
+        Usa a pausa entre envios (até o timestamp 'fim') para trabalho que não
+        envia mensagem: abre os próximos leads, move os sem WhatsApp ou com
+        telefone inválido para Declinado e deixa os válidos na frente da fila. Depois dorme o que sobrar.
+        """
+        logger.info("🔎 Pré-qualificando os próximos leads durante a pausa...")
+        estimativa = ESTIMATIVA_PRE_QUALIFICACAO
+        qualificados = 0
+        
+        # Só começa um lead novo se houver folga para terminá-lo antes do fim da pausa
+        while fim - time.time() > estimativa * 1.5 and not self.parar.is_set():
+            self._colher_se_preciso()
+            
+            lead = self.fila.proximo_para_prequalificar()
+            if not lead:
+                break
+            
+            inicio = time.monotonic()
+            classificacao = self.pre_qualificar_lead(lead)
+            # Média móvel do custo de pré-qualificar um lead
+            estimativa = 0.7 * estimativa + 0.3 * (time.monotonic() - inicio)
+            
+            if self._lead_interrompido(lead, classificacao):
+                continue
+            if classificacao == "com_whatsapp":
+                self.fila.adiantar(lead)
+                qualificados += 1
+            else:
+                resultado = classificacao if classificacao in ("sem_whatsapp", "numero_invalido") else "erro"
+                self._concluir_lead(lead, resultado)
+        
+        restante = fim - time.time()
+        logger.info(f"🔎 Pré-qualificação: {qualificados} leads com WhatsApp prontos para envio")
+        if restante > 0:
+            logger.info(f"⏰ Aguardando mais {restante:.0f}s até o próximo envio...")
+            self.parar.wait(restante)
+    
+    def _concluir_lead(self, lead, resultado):
+        """
+        Fecha o lead na fila e no diário. Com erro, o lead é adiado com espera
+        exponencial até acabarem as tentativas e então vai para a quarentena
+        """
+        self._registrar_resultado(resultado)
+        if resultado != "erro":
+            self.fila.concluir(lead)
+            self.diario.concluir(lead, resultado)
+            self.diario.limpar_falhas(lead)
+            return
+        
+        nome = lead.get("nome") or lead["chave"]
+        motivo = self.motivo_erro or "erro sem motivo identificado"
+        tentativas = self.diario.tentativas(lead) + 1
+        espera = self.retentativas.espera(tentativas)
+        if espera is not None:
+            proxima = time.time() + espera
+            self.diario.registrar_falha(lead, motivo, tentativas, proxima)
+            self.fila.adiar(lead, proxima)
+            logger.warning(f"🔁 Lead '{nome}' falhou ({motivo}) - tentativa {tentativas} de "
+                           f"{self.retentativas.max_tentativas}, nova tentativa em {espera:.0f}s")
+            return
+        
+        self.diario.registrar_falha(lead, motivo, tentativas)
+        self.fila.concluir(lead)
+        self.diario.concluir(lead, "quarentena")
+        logger.error(f"🧯 Lead '{nome}' em quarentena depois de {tentativas} tentativas: {motivo}")
+    
+    def liberar_quarentena(self):
+        """Devolve os leads da quarentena à fila (próxima colheita). Retorna quantos"""
+        chaves = self.diario.liberar_quarentena()
+        self.fila.processados.difference_update(chaves)
+        if chaves:
+            logger.info(f"🧯 {len(chaves)} leads liberados da quarentena")
+        return len(chaves)
+    
+    def _registrar_resultado(self, resultado):
+        """Soma o resultado de um lead na contagem da execução e registra no log"""
+        self.contagem[resultado] += 1
+        numero_lead = sum(self.contagem.values())
+        
+        if resultado == "sucesso":
+            logger.info(f"\n✅ Lead #{numero_lead} processado! Total enviados: {self.contagem['sucesso']}")
+        elif resultado == "sem_whatsapp":
+            logger.info(f"\n📍 Lead #{numero_lead} sem WhatsApp. Total sem WhatsApp: {self.contagem['sem_whatsapp']}")
+        elif resultado == "numero_invalido":
+            logger.info(f"\n⚠️ Lead #{numero_lead} com número inválido. Total inválidos: {self.contagem['numero_invalido']}")
+        else:
+            logger.error(f"\n❌ Erro ao processar lead #{numero_lead}")
+    
+    def preparar(self):
+        """Abre o navegador e deixa RD Station e WhatsApp Web prontos para uso"""
+        # Inicia navegador
+        self.iniciar_navegador()
+        
+        # CRM: abre o pipeline no navegador ou confere o token da API
+        try:
+            self.crm.preparar()
+        except ErroAPICRM as e:
+            if e.status in (401, 403):
+                logger.error(f"❌ Token da API do CRM recusado: {e}")
+                raise SessaoExpiradaError("RD Station", SAIDA_RDSTATION_DESLOGADO)
+            raise
+        
+        # Verifica WhatsApp Web
+        self.verificar_whatsapp_web()
+    
+    def processar_fila(self):
+        """Loop principal: processa leads da fila até ela acabar (ou até pedirem para parar)"""
+        logger.info(f"🤖 [{self.nome}] MODO AUTOMÁTICO: Processando todos os leads sem parar...")
+        
+        interrompidos = self.diario.interrompidos()
+        if interrompidos:
+            enviados = sum(1 for _, _, enviado in interrompidos if enviado)
+            logger.info(f"♻️ Retomando: {len(interrompidos)} leads ficaram no meio da execução anterior "
+                        f"({enviados} com mensagem já enviada - não serão reenviados)")
+        
+        # Loop principal - processa leads automaticamente
+        while not self.parar.is_set():
+            # Relê a coluna só quando a fila esvazia ou o intervalo de colheita passa
+            self._colher_se_preciso()
+            
+            # Pergunta ao limitador quando o próximo envio é permitido;
+            # enquanto isso, pré-qualifica os próximos leads
+            if self.limitador.espera() > 0 and len(self.fila):
+                proximo_envio = self.limitador.proximo_envio()
+                logger.info("\n" + "="*60)
+                logger.info(f"⏰ [{self.nome}] PRÓXIMO ENVIO PERMITIDO ÀS {time.strftime('%d/%m %H:%M:%S', time.localtime(proximo_envio))}")
+                logger.info("   (Para evitar banimento do WhatsApp)")
+                logger.info("   Pressione Ctrl+C para parar")
+                logger.info("="*60)
+                self.aproveitar_espera(proximo_envio)
+                
+                # A pré-qualificação pode ter esvaziado a fila
+                self._colher_se_preciso()
+            
+            if self.parar.is_set():
+                break
+            
+            # Chrome pesado, lento ou travado: recicla antes de começar o lead
+            self._verificar_saude()
+            
+            lead = self.fila.proximo()
+            
+            if not lead and self.fila.proxima_liberacao():
+                # Só sobraram leads esperando nova tentativa: aguarda o primeiro voltar
+                espera = max(0, self.fila.proxima_liberacao() - time.time())
+                logger.info(f"🔁 [{self.nome}] Só restam leads aguardando nova tentativa - "
+                            f"próxima em {espera:.0f}s")
+                self.parar.wait(espera)
+                continue
+            
+            if not lead:
+                logger.info(f"\n✅ [{self.nome}] Nenhum lead restante na coluna 'Entrada de Leads'!")
+                logger.info("💡 Se ainda há leads visíveis mas não foram detectados,")
+                logger.info("   pode ser necessário ajustar os seletores no código.")
+                break
+            
+            # Processa primeiro lead disponível
+            numero_lead = sum(self.contagem.values()) + 1
+            logger.info(f"\n{'='*60}")
+            logger.info(f"📌 [{self.nome}] LEAD #{numero_lead}")
+            logger.info(f"{'='*60}")
+            
+            with self.metricas.fase("lead_total") as intervalo:
+                try:
+                    resultado = self.processar_lead(lead, numero_lead - 1)
+                except Exception as e:
+                    # Sem vigia (ou com o Chrome saudável) o erro continua fatal, como antes
+                    if not (self.vigia and self.vigia.motivo_reciclagem()):
+                        raise
+                    logger.error(f"❌ O Chrome falhou no meio do lead: {e}")
+                    self.motivo_erro = f"falha do Chrome: {e}"
+                    resultado = "erro"
+                intervalo["resultado"] = resultado
+                if self.comandos:
+                    intervalo["comandos"] = self.comandos.do_lead(lead["chave"])
+                if self.rede:
+                    self.rede.ler(self.driver)
+                    requisicoes, bytes_lead = self.rede.concluir_lead()
+                    intervalo["rede_requisicoes"] = requisicoes
+                    intervalo["rede_kb"] = round(bytes_lead / 1024, 1)
+            if self._lead_interrompido(lead, resultado):
+                continue
+            self._concluir_lead(lead, resultado)
+            self.lead_atual = None
+            self.metricas.exportar_se_preciso()
+    
+    def encerrar(self):
+        """Registra os resumos de desempenho, salva o estado e fecha o navegador"""
+        if self.esperas:
+            self.esperas.registrar_resumo()
+        self.navegacao.registrar_resumo(sum(self.contagem.values()))
+        self.navegacao_chat.registrar_resumo(sum(self.contagem.values()))
+        self.metricas.registrar_resumo()
+        self.metricas.exportar()
+        self.crm.registrar_resumo()
+        if self.rede:
+            self.rede.registrar_resumo(self.perfil_rede)
+        if self.cdp:
+            self.cdp.registrar_resumo()
+        if self.vigia:
+            self.vigia.registrar_resumo()
+        if self.comandos:
+            self.comandos.registrar_resumo()
+            if self.metricas.prefixo:
+                self.comandos.salvar(self.metricas.prefixo + "_comandos.json")
+        if self.modos_insercao:
+            modos = ", ".join(f"{modo}: {qtd}" for modo, qtd in sorted(self.modos_insercao.items()))
+            logger.info(f"✍️ Inserção da mensagem: {modos}")
+        self.seletores.salvar(forcar=True)
+        if self.driver:
+            self._fechar_navegador()
+            logger.info(f"🔒 [{self.nome}] Navegador fechado")
+    
     def executar(self):
-        """Executa o fluxo completo de automação"""
+        """Executa o fluxo completo de automação. Retorna o código de saída do processo"""
+        codigo_saida = SAIDA_OK
         try:
-            # Inicia navegador
-            self.iniciar_navegador()
-            
-            # Acessa RD Station
-            self.acessar_rdstation()
-            
-            # Verifica WhatsApp Web
-            self.verificar_whatsapp_web()
+            self.preparar()
             
             logger.info("\n" + "="*50)
             logger.info("INICIANDO PROCESSAMENTO DE LEADS")
             logger.info("="*50 + "\n")
             
-            leads_processados = 0
-            leads_sem_whatsapp = 0
-            leads_numero_invalido = 0
-            
-            logger.info("🤖 MODO AUTOMÁTICO: Processando todos os leads sem parar...")
-            
-            # Loop principal - processa leads automaticamente
-            while True:
-                logger.info(f"\n🔍 Buscando próximo lead na coluna 'Entrada de Leads'...")
-                
-                # Certifica que está na página do pipeline
-                url_atual = self.driver.current_url
-                if "pipeline" not in url_atual:
-                    logger.info("Voltando para o pipeline...")
-                    self.driver.get("https://crm.rdstation.com/app/deals/pipeline")
-                    time.sleep(3)
-                
-                # Obtém leads da coluna
-                cards = self.obter_leads_entrada()
-                
-                if not cards:
-                    logger.info("\n✅ Nenhum lead restante na coluna 'Entrada de Leads'!")
-                    logger.info("💡 Se ainda há leads visíveis mas não foram detectados,")
-                    logger.info("   pode ser necessário ajustar os seletores no código.")
-                    break
-                
-                # Processa primeiro lead disponível
-                numero_lead = leads_processados + leads_sem_whatsapp + leads_numero_invalido + 1
-                logger.info(f"\n{'='*60}")
-                logger.info(f"📌 LEAD #{numero_lead}")
-                logger.info(f"{'='*60}")
-                
-                resultado = self.processar_lead(cards[0], leads_processados + leads_sem_whatsapp + leads_numero_invalido)
-                
-                if resultado == "sucesso":
-                    leads_processados += 1
-                    logger.info(f"\n✅ Lead #{numero_lead} processado! Total enviados: {leads_processados}")
-                    
-                    # AGUARDA 10 MINUTOS ENTRE CADA MENSAGEM PARA NÃO SER BANIDO
-                    logger.info("\n" + "="*60)
-                    logger.info("⏰ AGUARDANDO 10 MINUTOS ANTES DA PRÓXIMA MENSAGEM")
-                    logger.info("   (Para evitar banimento do WhatsApp)")
-                    logger.info("   Pressione Ctrl+C para parar")
-                    logger.info("="*60)
-                    time.sleep(600)  # 10 minutos = 600 segundos
-                    
-                elif resultado == "sem_whatsapp":
-                    leads_sem_whatsapp += 1
-                    logger.info(f"\n📍 Lead #{numero_lead} sem WhatsApp. Total sem WhatsApp: {leads_sem_whatsapp}")
-                    # Não aguarda - processa próximo imediatamente
-                    time.sleep(2)
-                    
-                elif resultado == "numero_invalido":
-                    leads_numero_invalido += 1
-                    logger.info(f"\n⚠️ Lead #{numero_lead} com número inválido. Total inválidos: {leads_numero_invalido}")
-                    # Não aguarda - processa próximo imediatamente
-                    time.sleep(2)
-                    
-                else:
-                    logger.error(f"\n❌ Erro ao processar lead #{numero_lead}")
-                    time.sleep(2)
+            self.processar_fila()
             
             # Resumo
-            logger.info("\n" + "="*60)
-            logger.info("🎉 AUTOMAÇÃO CONCLUÍDA!")
-            logger.info("="*60)
-            logger.info(f"✅ Leads com mensagem enviada: {leads_processados}")
-            logger.info(f"📍 Leads sem WhatsApp: {leads_sem_whatsapp}")
-            logger.info(f"⚠️ Leads com número inválido: {leads_numero_invalido}")
-            logger.info(f"📊 TOTAL de leads processados: {leads_processados + leads_sem_whatsapp + leads_numero_invalido}")
-            logger.info(f"📍 TOTAL movidos para Declinado: {leads_sem_whatsapp + leads_numero_invalido}")
-            logger.info("="*60 + "\n")
+            if self.simulacao:
+                registrar_resumo_contagem(self.contagem, titulo="🧪 SIMULAÇÃO CONCLUÍDA (nada enviado, nenhuma etapa movida)",
+                                          quarentena=self.diario.quarentena())
+            else:
+                registrar_resumo_contagem(self.contagem, quarentena=self.diario.quarentena())
             
+        except SessaoExpiradaError as e:
+            logger.error(f"\n❌ {e} - faça login com o mesmo perfil em modo interativo")
+            codigo_saida = e.codigo_saida
         except KeyboardInterrupt:
             logger.info("\n⚠️ Automação interrompida pelo usuário (Ctrl+C)")
+            codigo_saida = SAIDA_INTERROMPIDA
         except Exception as e:
             logger.error(f"\n❌ Erro fatal: {e}")
             import traceback
             logger.error(traceback.format_exc())
+            codigo_saida = SAIDA_ERRO
         finally:
-            input("\nPressione ENTER para fechar o navegador...")
-            if self.driver:
-                self.driver.quit()
-                logger.info("🔒 Navegador fechado")
+            if self.interativo:
+                input("\nPressione ENTER para fechar o navegador...")
+            self.encerrar()
+            self.diario.fechar()
+        return codigo_saida
+
+def registrar_resumo_contagem(contagem, titulo="🎉 AUTOMAÇÃO CONCLUÍDA!", quarentena=None):
+    """Escreve no log o resumo final com a contagem de resultados e os leads em quarentena"""
+    total = contagem["sucesso"] + contagem["sem_whatsapp"] + contagem["numero_invalido"]
+    logger.info("\n" + "="*60)
+    logger.info(titulo)
+    logger.info("="*60)
+    logger.info(f"✅ Leads com mensagem enviada: {contagem['sucesso']}")
+    logger.info(f"📍 Leads sem WhatsApp: {contagem['sem_whatsapp']}")
+    logger.info(f"⚠️ Leads com número inválido: {contagem['numero_invalido']}")
+    logger.info(f"📊 TOTAL de leads processados: {total}")
+    logger.info(f"📍 TOTAL movidos para Declinado: {contagem['sem_whatsapp'] + contagem['numero_invalido']}")
+    if quarentena:
+        logger.info(f"🧯 Leads em quarentena: {len(quarentena)} (ficam na coluna; --liberar-quarentena devolve à fila)")
+        for item in quarentena[:LINHAS_QUARENTENA]:
+            logger.info(f"   - {item['nome'] or item['chave']}: {item['motivo']} ({item['tentativas']} tentativas)")
+        if len(quarentena) > LINHAS_QUARENTENA:
+            logger.info(f"   ... e mais {len(quarentena) - LINHAS_QUARENTENA}")
+    logger.info("="*60 + "\n")
 
 def main():
     """Função principal"""
@@ -913,8 +1637,99 @@ def main():
     ╚══════════════════════════════════════════════════════╝
     """)
     
-    bot = RDStationWhatsAppBot()
-    bot.executar()
+    parser = argparse.ArgumentParser(description="Envio de saudação via WhatsApp para leads do RD Station")
+    parser.add_argument("--perfil", default=PERFIL_PADRAO,
+                        help=f"pasta do perfil persistente do Chrome (padrão: {PERFIL_PADRAO})")
+    parser.add_argument("--headless", action="store_true",
+                        help="roda o Chrome sem janela (implica --nao-interativo)")
+    parser.add_argument("--nao-interativo", action="store_true",
+                        help="nunca espera ENTER; sai com código 3 (RD Station) ou 4 (WhatsApp) se a sessão expirou")
+    parser.add_argument("--url-pipeline", default=URL_PIPELINE,
+                        help="endereço do pipeline do CRM (ex: o do servidor_fixture.py)")
+    parser.add_argument("--url-whatsapp", default=URL_WHATSAPP,
+                        help="endereço do WhatsApp Web (ex: o do servidor_fixture.py)")
+    parser.add_argument("--contar-comandos", action="store_true",
+                        help="conta os comandos WebDriver por método e por lead (ranking no fim da execução)")
+    parser.add_argument("--simulacao", action="store_true",
+                        help="percorre todos os passos sem enviar a mensagem nem mudar a etapa, sem pausa entre leads")
+    parser.add_argument("--crm-api-token", default=os.environ.get("RDSTATION_CRM_TOKEN"),
+                        help="token da API do RD Station CRM: leads e etapas pela API, navegador só para o WhatsApp "
+                             "(padrão: variável RDSTATION_CRM_TOKEN)")
+    parser.add_argument("--crm-api-url", default=URL_API_PADRAO,
+                        help=f"endereço da API do CRM (padrão: {URL_API_PADRAO})")
+    parser.add_argument("--cdp-rapido", action="store_true",
+                        help="snapshot dos cards, botão do WhatsApp, cliques e texto direto pelo DevTools "
+                             "Protocol do Chrome, sem passar pelo chromedriver")
+    parser.add_argument("--perfil-rede", choices=sorted(PERFIS), default="completo",
+                        help="'enxuto' bloqueia imagens, fontes, mídia e terceiros e carrega as páginas em modo "
+                             "eager (padrão: completo)")
+    parser.add_argument("--carregamento", choices=CARREGAMENTOS,
+                        help="estratégia de carregamento das páginas (padrão: a do perfil de rede)")
+    parser.add_argument("--bloquear", action="append", default=[], metavar="PADRAO",
+                        help="padrão de URL a bloquear além do perfil (ex: '*cdn.exemplo.com*'); pode repetir")
+    parser.add_argument("--medir-rede", action="store_true",
+                        help="soma as requisições e bytes baixados por lead (resumo no fim e em metricas.jsonl)")
+    parser.add_argument("--sem-vigia", action="store_true",
+                        help="desliga o vigia do navegador (timeouts e reciclagem automática do Chrome)")
+    parser.add_argument("--memoria-max-mb", type=float, default=2500,
+                        help="memória do Chrome (MB) que faz o vigia reciclar a sessão (padrão: 2500)")
+    parser.add_argument("--latencia-max", type=float, default=3.0,
+                        help="latência média (s) dos comandos que faz o vigia reciclar a sessão (padrão: 3)")
+    parser.add_argument("--reciclar-horas", type=float,
+                        help="recicla o Chrome a cada N horas mesmo sem sintoma")
+    parser.add_argument("--timeout-comando", type=float, default=90,
+                        help="segundos de espera por cada comando ao chromedriver (padrão: 90)")
+    parser.add_argument("--timeout-carregamento", type=float, default=60,
+                        help="segundos de carga de página antes de desistir (padrão: 60)")
+    parser.add_argument("--intervalo", type=float, default=600,
+                        help="segundos para repor uma ficha de envio (padrão: 600, uma mensagem a cada 10 minutos)")
+    parser.add_argument("--rajada", type=int, default=1,
+                        help="envios seguidos permitidos com o balde cheio (padrão: 1)")
+    parser.add_argument("--jitter", type=float, default=0,
+                        help="atraso aleatório máximo (s) sorteado após cada envio (padrão: 0)")
+    parser.add_argument("--limite-hora", type=int, help="máximo de envios na última hora")
+    parser.add_argument("--limite-dia", type=int, help="máximo de envios por dia")
+    parser.add_argument("--janela", type=ler_janela, action="append", metavar="HH:MM-HH:MM",
+                        help="horário em que o envio é permitido (ex: 08:00-12:00); pode repetir")
+    parser.add_argument("--dias-semana", type=ler_dias_semana, metavar="DIAS",
+                        help="dias em que o envio é permitido, 0 = segunda (ex: 0-4 ou 0,2,4)")
+    parser.add_argument("--max-tentativas", type=int, default=3,
+                        help="tentativas de um lead com erro antes da quarentena (padrão: 3)")
+    parser.add_argument("--espera-retentativa", type=float, default=120,
+                        help="segundos até a segunda tentativa; dobra a cada falha (padrão: 120)")
+    parser.add_argument("--liberar-quarentena", action="store_true",
+                        help="devolve à fila os leads em quarentena antes de começar")
+    args = parser.parse_args()
+    
+    crm = None
+    if args.crm_api_token:
+        crm = BackendAPI(args.crm_api_token, url_api=args.crm_api_url, simulacao=args.simulacao)
+    
+    bot = RDStationWhatsAppBot(
+        politica_envio=PoliticaEnvio(intervalo=args.intervalo, rajada=args.rajada, jitter=args.jitter,
+                                     limite_hora=args.limite_hora, limite_dia=args.limite_dia,
+                                     janelas=args.janela, dias_semana=args.dias_semana),
+        perfil_chrome=args.perfil,
+        headless=args.headless,
+        interativo=not (args.nao_interativo or args.headless),
+        url_pipeline=args.url_pipeline,
+        url_whatsapp=args.url_whatsapp,
+        contar_comandos=args.contar_comandos,
+        simulacao=args.simulacao,
+        crm=crm,
+        cdp_rapido=args.cdp_rapido,
+        perfil_rede=montar_perfil_rede(args.perfil_rede, args.carregamento, args.bloquear),
+        medir_rede=args.medir_rede,
+        limites_vigia=None if args.sem_vigia else LimitesVigia(
+            memoria_max_mb=args.memoria_max_mb, latencia_max=args.latencia_max,
+            reciclar_horas=args.reciclar_horas, timeout_comando=args.timeout_comando,
+            timeout_carregamento=args.timeout_carregamento),
+        politica_retentativa=PoliticaRetentativa(max_tentativas=args.max_tentativas,
+                                                 espera_inicial=args.espera_retentativa),
+    )
+    if args.liberar_quarentena:
+        bot.liberar_quarentena()
+    sys.exit(bot.executar())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
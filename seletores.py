@@ -0,0 +1,134 @@
+"""
+Registro de estratégias de seletores - RD Station / WhatsApp Web
+
+Os métodos do bot tentam vários seletores em sequência ("Método 1", "Método 2"...).
+Este registro lembra, por site, qual estratégia funcionou, tenta a vencedora
+primeiro na próxima vez, rebaixa as que começam a falhar e salva o ranking em
+disco para ser reaproveitado entre execuções.
+"""
+
+from urllib.parse import urlparse
+import json
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_PADRAO = "seletores_cache.json"
+
+
+class RegistroSeletores:
+    """Ranking persistente de estratégias de seletores por site"""
+
+    def __init__(self, caminho=ARQUIVO_PADRAO):
+        self.caminho = caminho
+        self.dados = {}  # site -> grupo -> estrategia -> estatisticas
+        self.alterado = False
+        self.carregar()
+
+    def carregar(self):
+        """Carrega o ranking salvo em disco (se existir)"""
+        if not self.caminho or not os.path.exists(self.caminho):
+            return
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as arquivo:
+                self.dados = json.load(arquivo)
+            logger.info(f"📂 Ranking de seletores carregado de {self.caminho}")
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível ler {self.caminho}: {e}")
+            self.dados = {}
+
+    def salvar(self, forcar=False):
+        """Grava o ranking em disco, apenas se a ordem mudou (ou se forçado)"""
+        if not self.caminho or not (self.alterado or forcar):
+            return
+        try:
+            temporario = self.caminho + ".tmp"
+            with open(temporario, "w", encoding="utf-8") as arquivo:
+                json.dump(self.dados, arquivo, ensure_ascii=False, indent=2)
+            os.replace(temporario, self.caminho)
+            self.alterado = False
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível salvar {self.caminho}: {e}")
+
+    def _estatisticas(self, site, grupo, nome):
+        grupos = self.dados.setdefault(site, {})
+        estrategias = grupos.setdefault(grupo, {})
+        return estrategias.setdefault(nome, {
+            "sucessos": 0, "falhas": 0, "falhas_seguidas": 0, "ultimo_sucesso": 0
+        })
+
+    def ordenar(self, site, grupo, nomes):
+        """
+        Ordena as estratégias do grupo: primeiro as que não estão falhando,
+        e entre elas a que venceu mais recentemente. Empates mantêm a ordem original.
+        """
+        estrategias = self.dados.get(site, {}).get(grupo, {})
+
+        def chave(par):
+            posicao, nome = par
+            est = estrategias.get(nome)
+            if not est:
+                return (0, 0, posicao)
+            return (est["falhas_seguidas"], -est["ultimo_sucesso"], posicao)
+
+        return [nome for _, nome in sorted(enumerate(nomes), key=chave)]
+
+    def registrar_sucesso(self, site, grupo, nome):
+        """Marca a estratégia como vencedora"""
+        est = self._estatisticas(site, grupo, nome)
+        # Só vale regravar o arquivo se o vencedor do grupo mudou
+        outras = self.dados[site][grupo].values()
+        if (est["falhas_seguidas"] or not est["ultimo_sucesso"] or
+                any(o["ultimo_sucesso"] > est["ultimo_sucesso"] for o in outras)):
+            self.alterado = True
+        est["sucessos"] += 1
+        est["falhas_seguidas"] = 0
+        est["ultimo_sucesso"] = time.time()
+
+    def registrar_falha(self, site, grupo, nome):
+        """Rebaixa a estratégia que falhou"""
+        est = self._estatisticas(site, grupo, nome)
+        est["falhas"] += 1
+        est["falhas_seguidas"] += 1
+        if est["falhas_seguidas"] == 1:
+            self.alterado = True
+
+    def executar(self, site, grupo, estrategias):
+        """
+        Tenta as estratégias na ordem do ranking, uma rodada só.
+
+        'estrategias' é uma lista de (nome, funcao); cada função devolve o
+        resultado (elemento, lista de cards...) ou algo falso / exceção se falhou.
+        Quem chama já esperou a página ficar pronta (esperas.py): se nenhuma
+        estratégia funcionar, o elemento não existe e repetir só atrasa o lead.
+        Retorna (nome_vencedor, resultado) ou (None, None).
+        """
+        funcoes = dict(estrategias)
+        falharam = []
+        for nome in self.ordenar(site, grupo, [nome for nome, _ in estrategias]):
+            try:
+                resultado = funcoes[nome]()
+            except Exception as e:
+                logger.debug(f"{grupo}/{nome} falhou: {e}")
+                resultado = None
+
+            if resultado:
+                self.registrar_sucesso(site, grupo, nome)
+                # Só rebaixa quem falhou se alguém funcionou (página estava pronta)
+                for nome_falhou in falharam:
+                    self.registrar_falha(site, grupo, nome_falhou)
+                self.salvar()
+                return nome, resultado
+
+            falharam.append(nome)
+        return None, None
+
+
+def site_atual(driver):
+    """Retorna o host da aba atual (chave do ranking)"""
+    try:
+        return urlparse(driver.current_url).netloc or "desconhecido"
+    except Exception:
+        return "desconhecido"
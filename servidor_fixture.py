@@ -0,0 +1,412 @@
+"""
+Servidor de fixtures - RD Station e WhatsApp Web de mentira, para rodar o bot localmente
+
+Serve um quadro de pipeline com a mesma estrutura que o bot usa
+(#mfe-crm-deals-sales-pipeline, #mfe-crm-deal-details com a lista de etapas, o
+botão "Abrir com WhatsApp") e uma página parecida com o WhatsApp Web (caixa de
+mensagem contenteditable, diálogo de número inválido). Latência, quantidade de
+leads e taxas de falha são configuráveis, então dá para medir e repetir
+execuções sem o CRM real e sem celular.
+
+Uso:
+    python servidor_fixture.py --leads 100 --latencia 0.05 --taxa-invalido 0.1
+    python rdstation_whatsapp_automation.py --url-pipeline http://127.0.0.1:8765/app/deals/pipeline \\
+        --url-whatsapp http://127.0.0.1:8765/whatsapp
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import argparse
+import json
+import os
+import random
+import struct
+import threading
+import time
+import zlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+PASTA_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Mesma ordem do CRM real: o bot clica em li:nth-child(2) e li:nth-child(7)
+ETAPAS = [
+    "Entrada de Leads", "Contato Realizado", "Qualificação", "Proposta",
+    "Negociação", "Ganho", "Declinado",
+]
+
+NOMES = ["Ana", "Bruno", "Carla", "Diego", "Elaine", "Fábio", "Gisele", "Heitor", "Ingrid", "João"]
+SOBRENOMES = ["Silva", "Souza", "Oliveira", "Pereira", "Lima", "Costa", "Ribeiro", "Almeida"]
+EMPRESAS = ["Transportes Rota Sul", "Frota Norte", "Logística Serra", "Cargas Vale", "Truck Center"]
+DDDS = [11, 19, 21, 31, 41, 47, 51, 61, 71, 81]
+
+
+class ConfigFixture:
+    """Parâmetros do cenário simulado"""
+
+    def __init__(self, leads=50, latencia=0.05, jitter=0.0, por_pagina=20,
+                 atraso_inicial_crm=300, atraso_inicial_whatsapp=2000, latencia_whatsapp=0.2,
+                 taxa_sem_whatsapp=0.1, taxa_invalido=0.1, taxa_fixo=0.05, taxa_falha=0.0,
+                 semente=42, token_api="fixture"):
+        """
+        leads: quantidade de negociações na coluna 'Entrada de Leads'
+        latencia / jitter: atraso (s) de cada resposta do servidor, mais um extra aleatório até 'jitter'
+        por_pagina: cards carregados por vez na coluna (o resto vem ao rolar)
+        atraso_inicial_crm / atraso_inicial_whatsapp: ms até cada app ficar pronto após carregar a página
+        latencia_whatsapp: atraso (s) para o WhatsApp dizer se o número existe
+        taxa_sem_whatsapp: fração de leads sem o botão do WhatsApp
+        taxa_invalido: fração de leads cujo número não está no WhatsApp
+        taxa_fixo: fração de leads com telefone fixo
+        taxa_falha: fração de aberturas de negociação que respondem HTTP 500
+        token_api: token aceito pelas rotas da API do CRM (/api/v1)
+        """
+        self.leads = leads
+        self.latencia = latencia
+        self.jitter = jitter
+        self.por_pagina = por_pagina
+        self.atraso_inicial_crm = atraso_inicial_crm
+        self.atraso_inicial_whatsapp = atraso_inicial_whatsapp
+        self.latencia_whatsapp = latencia_whatsapp
+        self.taxa_sem_whatsapp = taxa_sem_whatsapp
+        self.taxa_invalido = taxa_invalido
+        self.taxa_fixo = taxa_fixo
+        self.taxa_falha = taxa_falha
+        self.semente = semente
+        self.token_api = token_api
+
+
+class EstadoFixture:
+    """Negociações, mensagens recebidas e contadores do cenário"""
+
+    def __init__(self, config):
+        self.config = config
+        self.trava = threading.Lock()
+        self.sorteio = random.Random(config.semente)
+        self.negociacoes = {}
+        self.mensagens = []
+        self.requisicoes = 0
+        self.falhas = 0
+
+        for indice in range(config.leads):
+            negociacao = self._gerar(indice)
+            self.negociacoes[negociacao["id"]] = negociacao
+
+    def _gerar(self, indice):
+        sorteio = self.sorteio
+        ddd = sorteio.choice(DDDS)
+        fixo = sorteio.random() < self.config.taxa_fixo
+        numero = (f"{sorteio.randint(2, 5)}{sorteio.randint(0, 999):03d}-{sorteio.randint(0, 9999):04d}" if fixo
+                  else f"9{sorteio.randint(6000, 9999)}-{sorteio.randint(0, 9999):04d}")
+        nome = f"{sorteio.choice(NOMES)} {sorteio.choice(SOBRENOMES)}"
+        return {
+            "id": f"{0x64a000000000 + indice:x}",
+            "nome": nome,
+            "titulo": f"Caminhão - {nome}",
+            "empresa": sorteio.choice(EMPRESAS),
+            "telefone": f"({ddd}) {numero}",
+            "telefone_link": f"55{ddd}{numero.replace('-', '')}",
+            "tem_whatsapp": sorteio.random() >= self.config.taxa_sem_whatsapp,
+            "numero_existe": sorteio.random() >= self.config.taxa_invalido,
+            "etapa": 0,
+        }
+
+    def pipeline(self, inicio, quantidade):
+        """Página de cards da coluna 'Entrada de Leads' e o total de cada etapa"""
+        with self.trava:
+            entrada = [n for n in self.negociacoes.values() if n["etapa"] == 0]
+            totais = [sum(1 for n in self.negociacoes.values() if n["etapa"] == i) for i in range(len(ETAPAS))]
+        cards = [{"id": n["id"], "nome": n["nome"], "empresa": n["empresa"]}
+                 for n in entrada[inicio:inicio + quantidade]]
+        return {"etapas": ETAPAS, "totais": totais, "cards": cards}
+
+    def contar_requisicao(self, falha=False):
+        with self.trava:
+            if falha:
+                self.falhas += 1
+            else:
+                self.requisicoes += 1
+
+    def mudar_etapa(self, id_negociacao, etapa):
+        with self.trava:
+            negociacao = self.negociacoes[id_negociacao]
+            negociacao["etapa"] = etapa
+            return dict(negociacao)
+
+    def numero(self, telefone):
+        """Se o número existe no 'WhatsApp' e o nome do contato"""
+        with self.trava:
+            for negociacao in self.negociacoes.values():
+                if negociacao["telefone_link"] == telefone:
+                    return {"existe": negociacao["numero_existe"], "nome": negociacao["nome"]}
+        return {"existe": False, "nome": ""}
+
+    def negociacao_api(self, negociacao):
+        """Negociação no formato da API do RD Station CRM (contatos com telefones)"""
+        telefones = [{"phone": negociacao["telefone"], "type": "cellphone"}] if negociacao["tem_whatsapp"] else []
+        return {
+            "_id": negociacao["id"],
+            "id": negociacao["id"],
+            "name": negociacao["titulo"],
+            "deal_stage": {"_id": f"etapa-{negociacao['etapa']}", "name": ETAPAS[negociacao["etapa"]]},
+            "contacts": [{"name": negociacao["nome"], "phones": telefones}],
+        }
+
+    def negociacoes_api(self, etapa, pagina, limite):
+        """Página da listagem de negociações de uma etapa, como na API"""
+        with self.trava:
+            da_etapa = [n for n in self.negociacoes.values() if n["etapa"] == etapa]
+        inicio = (pagina - 1) * limite
+        pagina_atual = da_etapa[inicio:inicio + limite]
+        return {
+            "total": len(da_etapa),
+            "has_more": inicio + limite < len(da_etapa),
+            "deals": [self.negociacao_api(n) for n in pagina_atual],
+        }
+
+    def registrar_mensagem(self, telefone, texto):
+        with self.trava:
+            self.mensagens.append({"telefone": telefone, "texto": texto, "instante": time.time()})
+
+    def resumo(self):
+        """Contadores para conferir o resultado de uma execução"""
+        with self.trava:
+            por_etapa = {etapa: 0 for etapa in ETAPAS}
+            for negociacao in self.negociacoes.values():
+                por_etapa[ETAPAS[negociacao["etapa"]]] += 1
+            enviados = {}
+            for mensagem in self.mensagens:
+                enviados[mensagem["telefone"]] = enviados.get(mensagem["telefone"], 0) + 1
+            return {
+                "negociacoes": len(self.negociacoes),
+                "por_etapa": por_etapa,
+                "mensagens": len(self.mensagens),
+                "duplicadas": sum(qtd - 1 for qtd in enviados.values() if qtd > 1),
+                "requisicoes": self.requisicoes,
+                "falhas_injetadas": self.falhas,
+            }
+
+
+def _gerar_avatar(lado=96, semente=7):
+    """PNG de ruído (não comprime bem): faz o papel das fotos de perfil nos perfis de rede"""
+    gerador = random.Random(semente)
+    linhas = b"".join(b"\x00" + bytes(gerador.getrandbits(8) for _ in range(lado * 3)) for _ in range(lado))
+
+    def bloco(tipo, dados):
+        return struct.pack(">I", len(dados)) + tipo + dados + struct.pack(">I", zlib.crc32(tipo + dados))
+
+    return (b"\x89PNG\r\n\x1a\n" + bloco(b"IHDR", struct.pack(">IIBBBBB", lado, lado, 8, 2, 0, 0, 0))
+            + bloco(b"IDAT", zlib.compress(linhas)) + bloco(b"IEND", b""))
+
+
+AVATAR = _gerar_avatar()
+
+
+def _ler_pagina(nome, config):
+    with open(os.path.join(PASTA_FIXTURES, nome), "r", encoding="utf-8") as arquivo:
+        pagina = arquivo.read()
+    return pagina.replace("__CONFIG__", json.dumps({
+        "por_pagina": config.por_pagina,
+        "etapas": ETAPAS,
+        "atraso_inicial_crm": config.atraso_inicial_crm,
+        "atraso_inicial_whatsapp": config.atraso_inicial_whatsapp,
+    }))
+
+
+class ManipuladorFixture(BaseHTTPRequestHandler):
+    """Rotas do CRM (/app, /api) e do WhatsApp (/whatsapp, /api/whatsapp)"""
+
+    estado = None  # EstadoFixture, definido em criar_servidor
+
+    def log_message(self, formato, *args):
+        logger.debug(formato % args)
+
+    def _atrasar(self, extra=0.0):
+        config = self.estado.config
+        time.sleep(config.latencia + random.uniform(0, config.jitter) + extra)
+
+    def _responder(self, status, corpo, tipo="application/json; charset=utf-8"):
+        if not isinstance(corpo, (bytes, str)):
+            corpo = json.dumps(corpo, ensure_ascii=False)
+        if isinstance(corpo, str):
+            corpo = corpo.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _corpo_json(self):
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(tamanho) or b"{}")
+
+    def do_GET(self):
+        self.estado.contar_requisicao()
+        url = urlparse(self.path)
+        partes = [p for p in url.path.split("/") if p]
+        self._atrasar()
+
+        if url.path in ("/", "/app", "/app/deals"):
+            self.send_response(302)
+            self.send_header("Location", "/app/deals/pipeline")
+            self.end_headers()
+        elif partes[:2] == ["app", "deals"]:
+            self._responder(200, _ler_pagina("crm.html", self.estado.config), "text/html; charset=utf-8")
+        elif partes[:1] == ["whatsapp"]:
+            self._responder(200, _ler_pagina("whatsapp.html", self.estado.config), "text/html; charset=utf-8")
+        elif partes == ["api", "pipeline"]:
+            parametros = parse_qs(url.query)
+            inicio = int(parametros.get("inicio", ["0"])[0])
+            quantidade = int(parametros.get("quantidade", [str(self.estado.config.por_pagina)])[0])
+            self._responder(200, self.estado.pipeline(inicio, quantidade))
+        elif partes[:2] == ["api", "deals"] and len(partes) == 3:
+            negociacao = self.estado.negociacoes.get(partes[2])
+            if not negociacao:
+                self._responder(404, {"erro": "negociação não encontrada"})
+            elif random.random() < self.estado.config.taxa_falha:
+                self.estado.contar_requisicao(falha=True)
+                self._responder(500, {"erro": "falha injetada"})
+            else:
+                self._responder(200, negociacao)
+        elif partes[:3] == ["api", "whatsapp", "numeros"] and len(partes) == 4:
+            self._atrasar(self.estado.config.latencia_whatsapp)
+            self._responder(200, self.estado.numero(partes[3]))
+        elif partes[:2] == ["api", "v1"]:
+            self._api_v1("GET", partes[2:], url)
+        elif partes[:2] == ["estatico", "avatar"]:
+            self._responder(200, AVATAR, "image/png")
+        elif partes == ["fixture", "estado"]:
+            self._responder(200, self.estado.resumo())
+        else:
+            self._responder(404, {"erro": "rota desconhecida"})
+
+    def _api_v1(self, metodo, partes, url):
+        """Rotas da API do CRM: etapas do funil, listagem paginada e mudança de etapa"""
+        parametros = parse_qs(url.query)
+        if parametros.get("token", [""])[0] != self.estado.config.token_api:
+            self._responder(401, {"errors": "token inválido"})
+            return
+
+        if metodo == "GET" and partes == ["deal_stages"]:
+            self._responder(200, {
+                "total": len(ETAPAS),
+                "deal_stages": [{"_id": f"etapa-{i}", "id": f"etapa-{i}", "name": nome, "order": i + 1}
+                                for i, nome in enumerate(ETAPAS)],
+            })
+        elif metodo == "GET" and partes == ["deals"]:
+            etapa = parametros.get("deal_stage_id", ["etapa-0"])[0]
+            pagina = int(parametros.get("page", ["1"])[0])
+            limite = min(int(parametros.get("limit", ["20"])[0]), 200)
+            self._responder(200, self.estado.negociacoes_api(int(etapa.split("-")[-1]), pagina, limite))
+        elif metodo == "PUT" and partes[:1] == ["deals"] and len(partes) == 2:
+            if partes[1] not in self.estado.negociacoes:
+                self._responder(404, {"errors": "negociação não encontrada"})
+                return
+            etapa = self._corpo_json().get("deal", {}).get("deal_stage_id", "")
+            if not etapa.startswith("etapa-"):
+                self._responder(422, {"errors": "deal_stage_id inválido"})
+                return
+            negociacao = self.estado.mudar_etapa(partes[1], int(etapa.split("-")[-1]))
+            self._responder(200, self.estado.negociacao_api(negociacao))
+        else:
+            self._responder(404, {"errors": "rota desconhecida"})
+
+    def do_PUT(self):
+        self.estado.contar_requisicao()
+        url = urlparse(self.path)
+        partes = [p for p in url.path.split("/") if p]
+        self._atrasar()
+
+        if partes[:2] == ["api", "v1"]:
+            self._api_v1("PUT", partes[2:], url)
+        else:
+            self._responder(404, {"erro": "rota desconhecida"})
+
+    def do_POST(self):
+        self.estado.contar_requisicao()
+        partes = [p for p in urlparse(self.path).path.split("/") if p]
+        self._atrasar()
+
+        if partes[:2] == ["api", "deals"] and partes[3:] == ["etapa"]:
+            if partes[2] not in self.estado.negociacoes:
+                self._responder(404, {"erro": "negociação não encontrada"})
+                return
+            self._responder(200, self.estado.mudar_etapa(partes[2], int(self._corpo_json()["etapa"])))
+        elif partes == ["api", "whatsapp", "mensagens"]:
+            corpo = self._corpo_json()
+            self.estado.registrar_mensagem(corpo.get("telefone"), corpo.get("texto"))
+            self._responder(200, {"ok": True})
+        else:
+            self._responder(404, {"erro": "rota desconhecida"})
+
+
+def criar_servidor(config=None, host="127.0.0.1", porta=8765):
+    """Cria o servidor (sem iniciar). Porta 0 escolhe uma porta livre"""
+    estado = EstadoFixture(config or ConfigFixture())
+    manipulador = type("Manipulador", (ManipuladorFixture,), {"estado": estado})
+    servidor = ThreadingHTTPServer((host, porta), manipulador)
+    servidor.daemon_threads = True
+    servidor.estado = estado
+    return servidor
+
+
+def urls(servidor):
+    """Endereços do pipeline e do WhatsApp para passar ao bot"""
+    host, porta = servidor.server_address[:2]
+    base = f"http://{host}:{porta}"
+    return f"{base}/app/deals/pipeline", f"{base}/whatsapp"
+
+
+def url_api(servidor):
+    """Endereço base da API do CRM simulada (para o BackendAPI)"""
+    host, porta = servidor.server_address[:2]
+    return f"http://{host}:{porta}/api/v1"
+
+
+def iniciar_em_segundo_plano(config=None, host="127.0.0.1", porta=0):
+    """Sobe o servidor numa thread (usado por benchmarks). Retorna o servidor"""
+    servidor = criar_servidor(config, host, porta)
+    threading.Thread(target=servidor.serve_forever, name="servidor-fixture", daemon=True).start()
+    return servidor
+
+
+def main():
+    """Sobe o servidor de fixtures na linha de comando"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    padrao = ConfigFixture()
+    parser = argparse.ArgumentParser(description="RD Station e WhatsApp Web de mentira para testes locais")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--leads", type=int, default=padrao.leads)
+    parser.add_argument("--latencia", type=float, default=padrao.latencia, help="segundos por resposta")
+    parser.add_argument("--jitter", type=float, default=padrao.jitter, help="segundos extras aleatórios por resposta")
+    parser.add_argument("--por-pagina", type=int, default=padrao.por_pagina)
+    parser.add_argument("--atraso-inicial-crm", type=int, default=padrao.atraso_inicial_crm, help="ms")
+    parser.add_argument("--atraso-inicial-whatsapp", type=int, default=padrao.atraso_inicial_whatsapp, help="ms")
+    parser.add_argument("--latencia-whatsapp", type=float, default=padrao.latencia_whatsapp, help="segundos")
+    parser.add_argument("--taxa-sem-whatsapp", type=float, default=padrao.taxa_sem_whatsapp)
+    parser.add_argument("--taxa-invalido", type=float, default=padrao.taxa_invalido)
+    parser.add_argument("--taxa-fixo", type=float, default=padrao.taxa_fixo)
+    parser.add_argument("--taxa-falha", type=float, default=padrao.taxa_falha)
+    parser.add_argument("--semente", type=int, default=padrao.semente)
+    parser.add_argument("--token-api", default=padrao.token_api, help="token aceito pela API do CRM")
+    args = parser.parse_args()
+
+    config = ConfigFixture(**{chave: valor for chave, valor in vars(args).items()
+                              if chave not in ("host", "porta")})
+    servidor = criar_servidor(config, args.host, args.porta)
+    url_pipeline, url_whatsapp = urls(servidor)
+    logger.info(f"🧪 Fixtures no ar com {config.leads} leads")
+    logger.info(f"   --url-pipeline {url_pipeline}")
+    logger.info(f"   --url-whatsapp {url_whatsapp}")
+    logger.info(f"   --crm-api-url {url_api(servidor)} --crm-api-token {config.token_api}")
+    logger.info(f"   Resumo: {url_pipeline.rsplit('/app', 1)[0]}/fixture/estado")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Servidor encerrado")
+
+
+if __name__ == "__main__":
+    main()
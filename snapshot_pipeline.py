@@ -0,0 +1,101 @@
+"""
+Snapshot da coluna 'Entrada de Leads' em uma única chamada JavaScript
+
+Em vez de chamar is_displayed / .text / get_attribute em cada card (uma ida e
+volta ao chromedriver por card e por propriedade), um único execute_script
+percorre a primeira seção do pipeline e devolve uma lista compacta de leads.
+O WebElement de cada card vem junto, para ser usado apenas na hora do clique.
+
+Pelo atalho CDP (cdp_rapido.py) o mesmo script roda sem o chromedriver; como o
+CDP não devolve WebElements, os cards ficam guardados na página e o elemento
+de cada lead vem vazio.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Percorre a primeira seção do pipeline e monta um registro por card.
+# arguments[0] (opcional): lista de cards já localizados pelos métodos antigos
+# arguments[1] (opcional): não devolve os elementos, guarda os cards em window.__botCardsEntrada
+SCRIPT_SNAPSHOT_LEADS = """
+var cards = arguments[0], semElemento = arguments[1];
+if (!cards || !cards.length) {
+    var raiz = document.querySelector('#mfe-crm-deals-sales-pipeline') || document;
+    var secao = raiz.querySelector('section');
+    if (!secao) return [];
+    var seletores = [
+        'div.sc-dkmKpi > div',
+        '[class*="Card__Root"]',
+        'div.ftSKDG > div > div > div'
+    ];
+    cards = [];
+    for (var s = 0; s < seletores.length && !cards.length; s++) {
+        cards = Array.prototype.slice.call(secao.querySelectorAll(seletores[s]));
+    }
+    if (!cards.length) {
+        // Último recurso: cards são os blocos que contêm link para uma negociação
+        var links = secao.querySelectorAll('a[href*="/deals/"]');
+        for (var l = 0; l < links.length; l++) {
+            cards.push(links[l].closest('[class*="Card"]') || links[l]);
+        }
+    }
+}
+var altura = window.innerHeight || document.documentElement.clientHeight;
+var leads = [];
+for (var i = 0; i < cards.length; i++) {
+    var card = cards[i];
+    var link = card.tagName === 'A' ? card : card.querySelector('a[href*="/deals/"]');
+    var href = link ? link.href : '';
+    var id = card.getAttribute('data-deal-id') || card.getAttribute('data-id') || '';
+    if (!id && href) {
+        var achou = href.match(/\\/deals\\/([^\\/?#]+)/);
+        if (achou && achou[1] !== 'pipeline') id = achou[1];
+    }
+    var texto = (card.innerText || '').trim();
+    var rect = card.getBoundingClientRect();
+    var estilo = window.getComputedStyle(card);
+    var renderizado = rect.width > 0 && rect.height > 0 &&
+        estilo.visibility !== 'hidden' && estilo.display !== 'none';
+    leads.push({
+        id: id,
+        link: href,
+        nome: texto ? texto.split('\\n')[0] : '',
+        visivel: renderizado,
+        na_tela: renderizado && rect.bottom > 0 && rect.top < altura,
+        posicao: i,
+        elemento: semElemento ? null : card
+    });
+}
+if (semElemento) window.__botCardsEntrada = cards;
+return leads;
+"""
+
+# Rola a coluna até o último card guardado pelo snapshot sem elementos
+SCRIPT_ROLAR_ULTIMO_CARD = """
+var cards = window.__botCardsEntrada;
+if (!cards || !cards.length || !cards[cards.length - 1].isConnected) return false;
+cards[cards.length - 1].scrollIntoView({block: 'end'});
+return true;
+"""
+
+
+def capturar_leads(driver, cards=None):
+    """
+    Retorna a lista de leads da primeira coluna em uma única ida ao navegador.
+
+    Cada lead é um dict com: id, link, nome, visivel, na_tela, posicao e elemento.
+    Se 'cards' (WebElements) for informado, descreve esses cards em vez de procurá-los.
+    """
+    leads = driver.execute_script(SCRIPT_SNAPSHOT_LEADS, cards or [])
+    return leads or []
+
+
+
+def capturar_leads_cdp(canal, aba):
+    """
+    Mesmo snapshot pelo canal CDP, sem passar pelo chromedriver. Os leads vêm
+    com elemento None (o clique no card continua pelo Selenium)
+    """
+    leads = canal.avaliar(aba, SCRIPT_SNAPSHOT_LEADS, [], True, operacao="snapshot")
+    return leads or []
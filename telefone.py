@@ -0,0 +1,137 @@
+"""
+Telefone do lead - extração da página e validação offline (regras brasileiras)
+
+O número é lido do painel do lead (ou do link que o botão do WhatsApp abre) e
+normalizado para E.164 (+55 DDD número). Telefones fixos e números marcados
+como brasileiros (+55, 0055, 0 + DDD) mas malformados são descartados antes de
+abrir o WhatsApp Web: o lead vai direto para Declinado, sem o ciclo clique →
+chat → erro de número. Números de outros países e os que não dá para
+interpretar seguem para o WhatsApp, que dá a palavra final.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+CODIGO_PAIS = "55"
+
+# Tipos de telefone que levam o lead direto para Declinado
+TIPOS_DECLINADOS = ("fixo", "invalido")
+
+# DDDs em uso no Brasil (Anatel)
+DDDS_VALIDOS = {
+    11, 12, 13, 14, 15, 16, 17, 18, 19,
+    21, 22, 24, 27, 28,
+    31, 32, 33, 34, 35, 37, 38,
+    41, 42, 43, 44, 45, 46, 47, 48, 49,
+    51, 53, 54, 55,
+    61, 62, 63, 64, 65, 66, 67, 68, 69,
+    71, 73, 74, 75, 77, 79,
+    81, 82, 83, 84, 85, 86, 87, 88, 89,
+    91, 92, 93, 94, 95, 96, 97, 98, 99,
+}
+
+# Candidatos a telefone no painel do lead: links tel: e de WhatsApp e campos
+# rotulados (Telefone, Celular, WhatsApp). Texto solto com cara de telefone não
+# entra, para um número qualquer da página nunca declinar o lead por engano
+SCRIPT_TELEFONES_LEAD = """
+var raiz = document.querySelector('#mfe-crm-deal-details');
+if (!raiz) return [];
+var candidatos = [];
+var links = raiz.querySelectorAll('a[href^="tel:"], a[href*="wa.me/"], a[href*="whatsapp.com/send"]');
+for (var i = 0; i < links.length; i++) {
+    var href = links[i].getAttribute('href');
+    var telefone = href.indexOf('tel:') === 0 ? href.slice(4)
+        : (href.match(/phone=([^&]+)/) || href.match(/wa\\.me\\/([^?\\/]+)/) || [])[1];
+    if (telefone) candidatos.push(decodeURIComponent(telefone));
+}
+var rotulos = raiz.querySelectorAll('div, span, label, dt');
+for (var j = 0; j < rotulos.length; j++) {
+    var texto = (rotulos[j].textContent || '').trim();
+    if (!/^(Telefone|Celular|WhatsApp|Phone)s?$/i.test(texto)) continue;
+    var valor = rotulos[j].nextElementSibling;
+    if (!valor || !valor.textContent) continue;
+    // Um campo pode trazer mais de um número ("(11) 3333-4444, (11) 98888-7777")
+    var partes = valor.textContent.split(/[,;\/|]/);
+    for (var k = 0; k < partes.length; k++) candidatos.push(partes[k].trim());
+}
+return candidatos;
+"""
+
+
+def normalizar_telefone(bruto, internacional=False):
+    """
+    Normaliza um telefone para E.164.
+    Retorna (e164, tipo), com tipo:
+    - 'celular' / 'fixo': número brasileiro válido;
+    - 'invalido': marcado como brasileiro (+55, 0055, 55 + DDD, 0 + DDD) mas
+      malformado (e164 None);
+    - 'estrangeiro': código de país diferente de 55 (e164 com o número como veio);
+    - 'desconhecido': sem dígitos, ou sem código de país e fora das regras
+      brasileiras - não dá para afirmar que é inválido (e164 None).
+    internacional: os dígitos já começam pelo código do país (links wa.me e
+    ?phone= do WhatsApp)
+    """
+    texto = str(bruto or "").strip()
+    digitos = "".join(c for c in texto if c.isdigit())
+    if not digitos:
+        return None, "desconhecido"
+
+    explicito = internacional or texto.startswith("+") or digitos.startswith("00")
+    if digitos.startswith("00"):  # discagem internacional
+        digitos = digitos[2:]
+    if explicito:
+        if not digitos.startswith(CODIGO_PAIS):
+            return (f"+{digitos}" if 8 <= len(digitos) <= 15 else None), "estrangeiro"
+        digitos = digitos[2:]
+        brasileiro = True
+    elif digitos.startswith("0"):  # 0 + DDD ou 0 + operadora + DDD
+        digitos = digitos[3:] if len(digitos) in (13, 14) else digitos[1:]
+        brasileiro = True
+    elif digitos.startswith(CODIGO_PAIS) and len(digitos) in (12, 13):
+        digitos = digitos[2:]
+        brasileiro = True
+    else:
+        brasileiro = False
+    falha = (None, "invalido" if brasileiro else "desconhecido")
+
+    if len(digitos) not in (10, 11) or int(digitos[:2]) not in DDDS_VALIDOS:
+        return falha
+
+    ddd, numero = digitos[:2], digitos[2:]
+    if len(numero) == 9:
+        if numero[0] != "9":
+            return falha
+        tipo = "celular"
+    elif numero[0] in "2345":
+        tipo = "fixo"
+    elif numero[0] in "6789":
+        # Celular gravado sem o nono dígito (anterior a 2016)
+        numero = "9" + numero
+        tipo = "celular"
+    else:
+        return falha
+
+    return f"+{CODIGO_PAIS}{ddd}{numero}", tipo
+
+
+def escolher_telefone(candidatos):
+    """
+    Escolhe o telefone do lead entre os candidatos lidos da página.
+    Retorna (bruto, e164, tipo) do primeiro celular; sem celular, do primeiro
+    que não leva a Declinado (estrangeiro, desconhecido); senão do primeiro
+    candidato. None se não houver candidatos
+    """
+    primeiro = None
+    possivel = None
+    for bruto in candidatos:
+        if not any(c.isdigit() for c in str(bruto or "")):
+            continue  # "Não informado", campo vazio...
+        e164, tipo = normalizar_telefone(bruto)
+        if tipo == "celular":
+            return bruto, e164, tipo
+        if possivel is None and tipo not in TIPOS_DECLINADOS:
+            possivel = (bruto, e164, tipo)
+        if primeiro is None:
+            primeiro = (bruto, e164, tipo)
+    return possivel or primeiro
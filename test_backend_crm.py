@@ -0,0 +1,98 @@
+"""
+BackendAPI contra a API do CRM simulada pelo servidor de fixtures (/api/v1)
+
+Sobe o servidor numa porta livre, lista a coluna 'Entrada de Leads' página por
+página e muda a etapa de uma negociação com PUT /deals/:id.
+"""
+
+import logging
+import socket
+
+import pytest
+import urllib3
+
+from backend_crm import BackendAPI, BackendCRM, ErroAPICRM
+from fila_leads import FilaLeads
+from servidor_fixture import ConfigFixture, iniciar_em_segundo_plano, url_api
+
+LEADS = 45
+POR_PAGINA = 20
+
+
+@pytest.fixture
+def servidor():
+    servidor = iniciar_em_segundo_plano(ConfigFixture(leads=LEADS, latencia=0.0))
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.fixture
+def backend(servidor):
+    return BackendAPI(servidor.estado.config.token_api, url_api=url_api(servidor), por_pagina=POR_PAGINA)
+
+
+def test_colher_percorre_todas_as_paginas(servidor, backend):
+    fila = FilaLeads(intervalo_colheita=None)
+
+    assert backend.colher(fila) == LEADS
+    # Uma leitura das etapas e três páginas de deals (20 + 20 + 5, has_more no fim falso)
+    assert backend.requisicoes == 1 + 3
+    ids = {lead["id"] for lead in fila.pendentes.values()}
+    assert ids == set(servidor.estado.negociacoes)
+    assert [lead["posicao"] for lead in fila.pendentes.values()] == list(range(LEADS))
+
+
+def test_mudar_etapa_move_a_negociacao(servidor, backend):
+    fila = FilaLeads(intervalo_colheita=None)
+    backend.colher(fila)
+    lead = fila.proximo()
+
+    assert backend.mudar_etapa(lead, "Contato Realizado")
+    assert servidor.estado.resumo()["por_etapa"]["Contato Realizado"] == 1
+
+    # A negociação saiu da coluna de entrada: a próxima colheita não a traz
+    nova_fila = FilaLeads(intervalo_colheita=None)
+    assert backend.colher(nova_fila) == LEADS - 1
+    assert lead["id"] not in {item["id"] for item in nova_fila.pendentes.values()}
+
+
+def test_etapa_inexistente_nao_move(servidor, backend):
+    fila = FilaLeads(intervalo_colheita=None)
+    backend.colher(fila)
+
+    assert not backend.mudar_etapa(fila.proximo(), "Etapa que não existe")
+    assert servidor.estado.resumo()["por_etapa"]["Entrada de Leads"] == LEADS
+
+
+def test_token_invalido(servidor):
+    backend = BackendAPI("token-errado", url_api=url_api(servidor))
+    with pytest.raises(ErroAPICRM) as erro:
+        backend.preparar()
+    assert erro.value.status == 401
+
+
+def test_backend_base_e_abstrato():
+    with pytest.raises(TypeError):
+        BackendCRM()
+
+
+def test_token_nao_aparece_em_erro_nem_log(caplog):
+    # Porta sem servidor: o urllib3 tenta de novo e desiste com a URL na mensagem
+    with socket.socket() as livre:
+        livre.bind(("127.0.0.1", 0))
+        porta = livre.getsockname()[1]
+    token = "segredo/da+conta"
+    backend = BackendAPI(token, url_api=f"http://127.0.0.1:{porta}/api/v1")
+    backend.http = urllib3.PoolManager(retries=urllib3.Retry(total=1, backoff_factor=0))
+
+    with caplog.at_level(logging.DEBUG, logger="urllib3"):
+        with pytest.raises(ErroAPICRM) as erro:
+            backend.preparar()
+
+    assert "***" in str(erro.value)
+    assert erro.value.__cause__ is None and erro.value.__suppress_context__
+    mensagens = [str(erro.value)] + [registro.getMessage() for registro in caplog.records]
+    assert any("deal_stages" in mensagem for mensagem in mensagens[1:])
+    for mensagem in mensagens:
+        assert token not in mensagem and "segredo%2Fda%2Bconta" not in mensagem
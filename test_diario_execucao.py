@@ -0,0 +1,116 @@
+"""
+Diário de execução (diario_execucao.py) e retomada da fila depois de reabrir o banco
+
+A queda do processo é simulada fechando a conexão sem fechar() (o que não foi
+gravado se perde) e abrindo outro DiarioExecucao no mesmo arquivo.
+"""
+
+import time
+
+import pytest
+
+from diario_execucao import DiarioExecucao
+from fila_leads import FilaLeads
+
+
+def _lead(numero):
+    return {"id": f"deal-{numero}", "link": f"/deals/deal-{numero}", "nome": f"Lead {numero}",
+            "chave": f"deal-{numero}"}
+
+
+def _colheita(quantidade):
+    return [{k: v for k, v in _lead(numero).items() if k != "chave"} for numero in range(quantidade)]
+
+
+@pytest.fixture
+def caminho(tmp_path):
+    return str(tmp_path / "diario.db")
+
+
+def _cair(diario):
+    """Processo morreu: nada de commit final"""
+    diario.conexao.close()
+
+
+def _retomar(caminho):
+    """O que o bot faz ao subir: fila sem os concluídos e com os adiados agendados"""
+    diario = DiarioExecucao(caminho)
+    fila = FilaLeads(intervalo_colheita=None)
+    fila.processados.update(diario.concluidos())
+    fila.agendar(diario.adiados())
+    return diario, fila
+
+
+def test_marca_enviando_sobrevive_a_queda(caminho):
+    diario = DiarioExecucao(caminho, lote=100, intervalo_commit=3600)
+    diario.registrar(_lead(0), "aberto")
+    diario.registrar(_lead(0), "whatsapp_encontrado")
+    diario.registrar(_lead(0), "enviando")
+    diario.registrar(_lead(1), "aberto")  # em lote, ainda não gravado
+    _cair(diario)
+
+    reaberto = DiarioExecucao(caminho)
+    assert reaberto.ja_enviado(_lead(0))
+    assert not reaberto.ja_enviado(_lead(1))
+    assert reaberto.interrompidos() == [("deal-0", "enviando", 1)]
+    reaberto.fechar()
+
+
+def test_enviado_continua_enviado_depois_de_novos_estados(caminho):
+    diario = DiarioExecucao(caminho)
+    diario.registrar(_lead(0), "enviando")
+    diario.registrar(_lead(0), "etapa_movida")
+    diario.concluir(_lead(0), "enviado")
+    diario.fechar()
+
+    reaberto = DiarioExecucao(caminho)
+    assert reaberto.ja_enviado(_lead(0))
+    reaberto.fechar()
+
+
+def test_concluidos_e_adiados_restauram_a_fila(caminho):
+    diario = DiarioExecucao(caminho)
+    diario.concluir(_lead(0), "enviado")
+    diario.concluir(_lead(1), "sem_whatsapp")
+    diario.registrar_falha(_lead(2), "erro", 1, proxima_tentativa=time.time() + 3600)
+    diario.registrar_falha(_lead(3), "erro", 2, proxima_tentativa=time.time() - 1)
+    diario.fechar()
+
+    reaberto, fila = _retomar(caminho)
+    assert reaberto.concluidos() == {"deal-0", "deal-1"}
+    assert set(reaberto.adiados()) == {"deal-2", "deal-3"}
+    assert reaberto.tentativas(_lead(3)) == 2
+
+    assert fila.adicionar(_colheita(5)) == 1  # só o deal-4 é novo
+    # deal-3 já pode voltar; deal-2 segue esperando a hora dele
+    assert [fila.proximo()["chave"] for _ in range(2)] == ["deal-4", "deal-3"]
+    assert fila.proximo() is None
+    assert fila.proxima_liberacao() == pytest.approx(reaberto.adiados()["deal-2"])
+    reaberto.fechar()
+
+
+def test_liberar_quarentena_devolve_o_lead(caminho):
+    diario = DiarioExecucao(caminho)
+    diario.registrar_falha(_lead(0), "chat não carregou", 3)
+    diario.concluir(_lead(0), "quarentena")
+    diario.registrar_falha(_lead(1), "erro", 1, proxima_tentativa=time.time() + 3600)
+    diario.fechar()
+
+    reaberto, fila = _retomar(caminho)
+    assert [item["chave"] for item in reaberto.quarentena()] == ["deal-0"]
+    assert reaberto.quarentena()[0]["motivo"] == "chat não carregou"
+    assert "deal-0" in reaberto.concluidos()
+
+    assert reaberto.liberar_quarentena() == ["deal-0"]
+    assert reaberto.quarentena() == []
+    assert "deal-0" not in reaberto.concluidos()
+    assert reaberto.tentativas(_lead(0)) == 0
+    # Só a quarentena é liberada: o lead adiado continua esperando
+    assert set(reaberto.adiados()) == {"deal-1"}
+    reaberto.fechar()
+
+    # A liberação foi gravada: a próxima execução colhe o lead de novo
+    de_novo, fila = _retomar(caminho)
+    assert fila.adicionar(_colheita(2)) == 1
+    assert fila.proximo()["chave"] == "deal-0"
+    de_novo.fechar()
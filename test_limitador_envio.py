@@ -0,0 +1,124 @@
+"""
+Ritmo de envio (limitador_envio.py): balde de fichas, limite diário e estado em disco
+
+Os instantes são fixos (agora=...), então nada aqui depende do relógio.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from limitador_envio import LimitadorEnvio, PoliticaEnvio, ler_dias_semana, ler_janela
+
+# Uma terça-feira às 15h (horário local)
+T0 = datetime(2026, 3, 10, 15, 0).timestamp()
+MEIA_NOITE = datetime(2026, 3, 11, 0, 0).timestamp()
+
+
+def _limitador(caminho=None, **politica):
+    limitador = LimitadorEnvio(PoliticaEnvio(**politica), caminho=caminho)
+    limitador.estado["atualizado"] = T0  # balde cheio em T0
+    return limitador
+
+
+def test_balde_repoe_uma_ficha_por_intervalo():
+    limitador = _limitador(intervalo=600, rajada=2)
+
+    assert limitador.espera(T0) == 0
+    limitador.registrar_envio(T0)
+    assert limitador.espera(T0 + 1) == 0  # ainda há a segunda ficha da rajada
+    limitador.registrar_envio(T0 + 1)
+
+    # Balde vazio: sobrou 1/600 de ficha, a próxima fica inteira em T0 + 600
+    assert limitador.proximo_envio(T0 + 1) == pytest.approx(T0 + 600)
+    assert limitador.espera(T0 + 300) == pytest.approx(300)
+    assert limitador.espera(T0 + 600) == 0
+
+
+def test_balde_nao_passa_da_rajada():
+    limitador = _limitador(intervalo=600, rajada=2)
+    limitador.registrar_envio(T0)
+
+    assert limitador._fichas(T0 + 10 * 600) == 2
+    limitador.registrar_envio(T0 + 10 * 600)
+    limitador.registrar_envio(T0 + 10 * 600 + 1)
+    assert limitador.espera(T0 + 10 * 600 + 2) > 0
+
+
+def test_limite_dia_passa_para_o_dia_seguinte():
+    limitador = _limitador(intervalo=0, limite_dia=3)
+    for segundos in range(3):
+        limitador.registrar_envio(T0 + segundos)
+
+    assert limitador.enviados_hoje(T0 + 10) == 3
+    assert limitador.proximo_envio(T0 + 10) == MEIA_NOITE
+    # Virou o dia: a contagem recomeça
+    assert limitador.enviados_hoje(MEIA_NOITE) == 0
+    assert limitador.espera(MEIA_NOITE + 1) == 0
+
+
+def test_limite_dia_com_janela_espera_a_janela_do_dia_seguinte():
+    limitador = _limitador(intervalo=0, limite_dia=1, janelas=[("08:00", "18:00")])
+    limitador.registrar_envio(T0)
+
+    assert limitador.proximo_envio(T0 + 10) == datetime(2026, 3, 11, 8, 0).timestamp()
+
+
+def test_estado_salvo_sobrevive_ao_reinicio(tmp_path):
+    caminho = str(tmp_path / "limitador.json")
+    limitador = _limitador(caminho, intervalo=600, rajada=1, limite_dia=2)
+    limitador.registrar_envio(T0)
+    limitador.registrar_envio(T0 + 600)
+
+    reaberto = LimitadorEnvio(PoliticaEnvio(intervalo=600, rajada=1, limite_dia=2), caminho=caminho)
+
+    assert reaberto.estado["envios"] == [T0, T0 + 600]
+    assert reaberto.enviados_hoje(T0 + 700) == 2
+    assert reaberto.proximo_envio(T0 + 700) == MEIA_NOITE
+
+
+def test_estado_salvo_respeita_rajada_menor(tmp_path):
+    caminho = str(tmp_path / "limitador.json")
+    _limitador(caminho, intervalo=600, rajada=5).salvar()
+
+    reaberto = LimitadorEnvio(PoliticaEnvio(intervalo=600, rajada=2), caminho=caminho)
+
+    assert reaberto.estado["fichas"] == 2
+
+
+def test_estado_corrompido_comeca_do_zero(tmp_path):
+    caminho = tmp_path / "limitador.json"
+    caminho.write_text("{não é json", encoding="utf-8")
+
+    limitador = LimitadorEnvio(PoliticaEnvio(intervalo=600), caminho=str(caminho))
+
+    assert limitador.estado["envios"] == []
+
+
+@pytest.mark.parametrize("texto, janela", [
+    ("08:00-12:00", ("08:00", "12:00")),
+    (" 13:30 - 18:00 ", ("13:30", "18:00")),
+])
+def test_ler_janela(texto, janela):
+    assert ler_janela(texto) == janela
+
+
+@pytest.mark.parametrize("texto", ["12:00-08:00", "08:00", "8-12", "08:00-25:00"])
+def test_ler_janela_invalida(texto):
+    with pytest.raises(ValueError):
+        ler_janela(texto)
+
+
+@pytest.mark.parametrize("texto, dias", [
+    ("0-4", {0, 1, 2, 3, 4}),
+    ("0,2,4", {0, 2, 4}),
+    ("0-1,5-6", {0, 1, 5, 6}),
+])
+def test_ler_dias_semana(texto, dias):
+    assert ler_dias_semana(texto) == dias
+
+
+@pytest.mark.parametrize("texto", ["7", "seg", "4-2", ""])
+def test_ler_dias_semana_invalido(texto):
+    with pytest.raises(ValueError):
+        ler_dias_semana(texto)
@@ -0,0 +1,134 @@
+"""
+Detector de número inválido do WhatsApp contra os diálogos do servidor de fixtures
+
+O SCRIPT_CHAT_WHATSAPP roda no node com um DOM mínimo (só o que o script
+consulta); sem node esses testes são pulados. O teste de ponta a ponta precisa
+do Chrome instalado.
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from esperas import SCRIPT_CHAT_WHATSAPP, SELETOR_CAIXA_MENSAGEM, TEXTOS_NUMERO_INVALIDO
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+
+# DOM mínimo: caixas de mensagem (a do chat anterior marcada) e diálogos com botões
+DOM_MINIMO = """
+var pagina = JSON.parse(process.argv[process.argv.length - 1]);
+function elemento(texto, filhos, anterior) {
+    return {
+        textContent: texto,
+        closest: function () { return anterior ? {} : null; },
+        querySelectorAll: function () { return filhos || []; }
+    };
+}
+var document = {
+    querySelectorAll: function (seletor) {
+        if (seletor === pagina.seletorCaixa) {
+            return pagina.caixas.map(function (anterior) { return elemento('', [], anterior); });
+        }
+        return pagina.dialogos.map(function (dialogo) {
+            var botoes = dialogo.botoes.map(function (rotulo) { return elemento(rotulo); });
+            return elemento(dialogo.texto + ' ' + dialogo.botoes.join(' '), botoes);
+        });
+    }
+};
+"""
+
+# Textos que o WhatsApp Web já mostrou no diálogo de número inválido
+DIALOGOS_REAIS = [
+    "O número de telefone compartilhado por url é inválido.",
+    "O número de telefone  compartilhado via URL\né inválido.",
+    "Phone number shared via url is invalid.",
+    "Este número não está no WhatsApp.",
+]
+
+# Outros diálogos do WhatsApp que não podem virar 'numero_invalido'
+DIALOGOS_OUTROS = [
+    "Formato de arquivo inválido.",
+    "Link compartilhado com sucesso.",
+    "Invalid file type.",
+    "Não foi possível conectar. Tente novamente.",
+]
+
+
+def _node():
+    return shutil.which("node")
+
+
+def _chrome_instalado():
+    return any(shutil.which(nome) for nome in ("google-chrome", "google-chrome-stable", "chromium",
+                                                "chromium-browser", "chrome"))
+
+
+def _detectar(caixas=(), dialogos=()):
+    """Roda o SCRIPT_CHAT_WHATSAPP no node. Retorna [estado, texto do elemento] ou None"""
+    programa = (DOM_MINIMO + "var detector = function () {" + SCRIPT_CHAT_WHATSAPP + "};\n"
+                "var resultado = detector(pagina.seletorCaixa, pagina.textos);\n"
+                "console.log(JSON.stringify(resultado ? [resultado[0], resultado[1].textContent] : null));\n")
+    pagina = {
+        "seletorCaixa": SELETOR_CAIXA_MENSAGEM,
+        "textos": TEXTOS_NUMERO_INVALIDO,
+        "caixas": list(caixas),
+        "dialogos": [{"texto": texto, "botoes": ["OK"]} for texto in dialogos],
+    }
+    saida = subprocess.run([_node(), "-e", programa, json.dumps(pagina)], capture_output=True,
+                           text=True, timeout=30, check=True)
+    return json.loads(saida.stdout)
+
+
+def _dialogo_da_fixture():
+    with open(os.path.join(PASTA, "fixtures", "whatsapp.html"), "r", encoding="utf-8") as arquivo:
+        pagina = arquivo.read()
+    dialogo = re.search(r"function mostrarErro\(\).*?innerHTML = '<div>(.*?)</div>'", pagina, re.S)
+    assert dialogo, "diálogo de número inválido não encontrado em fixtures/whatsapp.html"
+    return dialogo.group(1)
+
+
+sem_node = pytest.mark.skipif(not _node(), reason="node não instalado")
+
+
+@sem_node
+def test_reconhece_dialogo_da_fixture():
+    assert _detectar(dialogos=[_dialogo_da_fixture()]) == ["invalido", "OK"]
+
+
+@sem_node
+@pytest.mark.parametrize("texto", DIALOGOS_REAIS)
+def test_reconhece_dialogos_reais(texto):
+    assert _detectar(dialogos=[texto]) == ["invalido", "OK"]
+
+
+@sem_node
+@pytest.mark.parametrize("texto", DIALOGOS_OUTROS)
+def test_ignora_outros_dialogos(texto):
+    assert _detectar(dialogos=[texto]) is None
+
+
+@sem_node
+def test_caixa_do_chat_atual_vence():
+    assert _detectar(caixas=[False], dialogos=[_dialogo_da_fixture()]) == ["valido", ""]
+
+
+@sem_node
+def test_ignora_caixa_do_chat_anterior():
+    assert _detectar(caixas=[True]) is None
+
+
+@pytest.mark.skipif(not _chrome_instalado(), reason="Chrome não instalado")
+def test_leads_invalidos_da_fixture_viram_numero_invalido():
+    from benchmark import rodar_cenario
+
+    resultado = rodar_cenario("teste_invalidos", {
+        "leads": 5, "taxa_sem_whatsapp": 0.0, "taxa_invalido": 1.0, "taxa_fixo": 0.0,
+    }, latencia=0.0)
+
+    assert resultado["contagem"].get("numero_invalido") == 5
+    assert not resultado["contagem"].get("erro")
+    assert resultado["fixture"]["mensagens"] == 0
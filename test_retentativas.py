@@ -0,0 +1,98 @@
+"""
+Retentativa dos leads com erro: espera exponencial e quarentena na última falha
+
+_concluir_lead roda num bot falso (sem Chrome) com fila e diário de verdade.
+"""
+
+import functools
+import time
+import types
+
+import pytest
+
+from diario_execucao import DiarioExecucao
+from fila_leads import FilaLeads, PoliticaRetentativa
+from rdstation_whatsapp_automation import RDStationWhatsAppBot
+
+
+@pytest.mark.parametrize("politica, esperas", [
+    # Padrão: 2 minutos, depois 4, e a terceira falha já é quarentena
+    (PoliticaRetentativa(), [120, 240, None]),
+    # Teto de 1 hora
+    (PoliticaRetentativa(max_tentativas=6, espera_inicial=1000), [1000, 2000, 3600, 3600, 3600, None]),
+    (PoliticaRetentativa(max_tentativas=4, espera_inicial=10, fator=3), [10, 30, 90, None]),
+    # Uma tentativa só (benchmark): nenhuma espera
+    (PoliticaRetentativa(max_tentativas=1), [None]),
+])
+def test_espera_por_tentativa(politica, esperas):
+    assert [politica.espera(tentativas) for tentativas in range(1, len(esperas) + 1)] == esperas
+
+
+@pytest.fixture
+def bot():
+    bot = types.SimpleNamespace(
+        contagem={"sucesso": 0, "sem_whatsapp": 0, "numero_invalido": 0, "erro": 0},
+        fila=FilaLeads(intervalo_colheita=None),
+        diario=DiarioExecucao(":memory:"),
+        retentativas=PoliticaRetentativa(),
+        motivo_erro="o WhatsApp Web não carregou o chat",
+    )
+    bot._registrar_resultado = functools.partial(RDStationWhatsAppBot._registrar_resultado, bot)
+    yield bot
+    bot.diario.fechar()
+
+
+def _retirar(bot):
+    """Colhe o lead (ou deixa a espera dele acabar) e o retira da fila, como o bot"""
+    bot.fila.adicionar([{"id": "deal-1", "nome": "Lead 1"}])
+    for entrada in bot.fila.adiados.values():
+        entrada[0] = time.time() - 1
+    lead = bot.fila.proximo()
+    assert lead and lead["chave"] == "deal-1"
+    return lead
+
+
+def test_erros_adiam_e_a_ultima_falha_vai_para_a_quarentena(bot):
+    for tentativa, espera in ((1, 120), (2, 240)):
+        lead = _retirar(bot)
+        antes = time.time()
+        RDStationWhatsAppBot._concluir_lead(bot, lead, "erro")
+
+        instante, _ = bot.fila.adiados["deal-1"]
+        assert antes + espera <= instante <= time.time() + espera
+        assert bot.diario.tentativas(lead) == tentativa
+        assert "deal-1" not in bot.fila.processados
+        assert bot.diario.quarentena() == []
+
+    lead = _retirar(bot)
+    RDStationWhatsAppBot._concluir_lead(bot, lead, "erro")
+
+    assert "deal-1" not in bot.fila.adiados
+    assert "deal-1" in bot.fila.processados
+    assert len(bot.fila) == 0
+    assert bot.diario.adiados() == {}
+    assert [(item["chave"], item["tentativas"], item["motivo"]) for item in bot.diario.quarentena()] == [
+        ("deal-1", 3, "o WhatsApp Web não carregou o chat")]
+    assert "deal-1" in bot.diario.concluidos()
+    assert bot.contagem["erro"] == 3
+    # A colheita seguinte não o traz de volta
+    assert bot.fila.adicionar([{"id": "deal-1", "nome": "Lead 1"}]) == 0
+
+
+def test_sucesso_depois_de_erro_esquece_as_falhas(bot):
+    RDStationWhatsAppBot._concluir_lead(bot, _retirar(bot), "erro")
+    lead = _retirar(bot)
+    RDStationWhatsAppBot._concluir_lead(bot, lead, "sucesso")
+
+    assert bot.diario.tentativas(lead) == 0
+    assert bot.diario.adiados() == {}
+    assert bot.diario.concluidos() == {"deal-1"}
+    assert bot.contagem == {"sucesso": 1, "sem_whatsapp": 0, "numero_invalido": 0, "erro": 1}
+
+
+def test_uma_tentativa_vai_direto_para_a_quarentena(bot):
+    bot.retentativas = PoliticaRetentativa(max_tentativas=1)
+    RDStationWhatsAppBot._concluir_lead(bot, _retirar(bot), "erro")
+
+    assert bot.fila.adiados == {}
+    assert [item["chave"] for item in bot.diario.quarentena()] == ["deal-1"]
@@ -0,0 +1,42 @@
+"""
+Ranking de estratégias de seletores (seletores.py)
+
+Uma rodada só: se nenhuma estratégia acha o elemento, executar desiste na hora.
+"""
+
+from seletores import RegistroSeletores
+
+
+def _estrategia(resultado, chamadas, nome):
+    def funcao():
+        chamadas.append(nome)
+        if isinstance(resultado, Exception):
+            raise resultado
+        return resultado
+    return nome, funcao
+
+
+def test_vencedora_passa_para_a_frente(tmp_path):
+    registro = RegistroSeletores(str(tmp_path / "seletores.json"))
+    chamadas = []
+    estrategias = [_estrategia(None, chamadas, "a"), _estrategia(ValueError("sumiu"), chamadas, "b"),
+                   _estrategia("botao", chamadas, "c")]
+
+    assert registro.executar("crm", "botao", estrategias) == ("c", "botao")
+    assert registro.ordenar("crm", "botao", ["a", "b", "c"]) == ["c", "a", "b"]
+
+    # O ranking vem do disco na execução seguinte
+    chamadas.clear()
+    assert RegistroSeletores(str(tmp_path / "seletores.json")).executar("crm", "botao", estrategias) == ("c", "botao")
+    assert chamadas == ["c"]
+
+
+def test_todas_falham_uma_rodada_so(tmp_path):
+    registro = RegistroSeletores(str(tmp_path / "seletores.json"))
+    chamadas = []
+    estrategias = [_estrategia(None, chamadas, "a"), _estrategia([], chamadas, "b")]
+
+    assert registro.executar("crm", "botao", estrategias) == (None, None)
+    assert chamadas == ["a", "b"]
+    # Ninguém funcionou (página sem o elemento): ninguém é rebaixado
+    assert registro.dados == {}
@@ -0,0 +1,98 @@
+"""
+Normalização do telefone do lead (telefone.py)
+
+Tabelas com os formatos que aparecem no painel do CRM e nos links do botão do
+WhatsApp: só fixo e +55 malformado levam o lead para Declinado.
+"""
+
+import pytest
+
+from telefone import TIPOS_DECLINADOS, escolher_telefone, normalizar_telefone
+
+CASOS_NORMALIZAR = [
+    # Celular com e sem o 55, com máscara
+    ("(11) 98888-7777", "+5511988887777", "celular"),
+    ("11988887777", "+5511988887777", "celular"),
+    ("+55 11 98888-7777", "+5511988887777", "celular"),
+    ("5511988887777", "+5511988887777", "celular"),
+    # Discagem internacional com 00
+    ("0055 11 98888-7777", "+5511988887777", "celular"),
+    ("00 55 (21) 8888-7777", "+5521988887777", "celular"),
+    # 0 + DDD e 0 + operadora + DDD
+    ("0 11 98888-7777", "+5511988887777", "celular"),
+    ("0 21 11 98888-7777", "+5511988887777", "celular"),
+    ("0 15 21 3333-4444", "+552133334444", "fixo"),
+    # Celular sem o nono dígito
+    ("(11) 8888-7777", "+5511988887777", "celular"),
+    ("+55 47 9988-7766", "+5547999887766", "celular"),
+    # Fixo
+    ("(11) 3333-4444", "+551133334444", "fixo"),
+    ("+55 51 2222-3333", "+555122223333", "fixo"),
+    # Brasileiro explícito e malformado
+    ("+55 20 98888-7777", None, "invalido"),
+    ("+55 11 9888-77", None, "invalido"),
+    ("+55 11 88888-7777", None, "invalido"),
+    ("0 11 1888-7777", None, "invalido"),
+    # Sem código de país e fora das regras: não dá para afirmar que é inválido
+    ("(20) 98888-7777", None, "desconhecido"),
+    ("98888-7777", None, "desconhecido"),
+    ("Não informado", None, "desconhecido"),
+    ("", None, "desconhecido"),
+    (None, None, "desconhecido"),
+    # Outros países
+    ("+1 415 555 0100", "+14155550100", "estrangeiro"),
+    ("+351 912 345 678", "+351912345678", "estrangeiro"),
+    ("00351 912 345 678", "+351912345678", "estrangeiro"),
+]
+
+
+@pytest.mark.parametrize("bruto, e164, tipo", CASOS_NORMALIZAR)
+def test_normalizar_telefone(bruto, e164, tipo):
+    assert normalizar_telefone(bruto) == (e164, tipo)
+
+
+CASOS_URL = [
+    # Dígitos do link wa.me / ?phone=, sempre com o código do país
+    ("5511988887777", "+5511988887777", "celular"),
+    ("551188887777", "+5511988887777", "celular"),
+    ("551133334444", "+551133334444", "fixo"),
+    ("5520988887777", None, "invalido"),
+    ("14155550100", "+14155550100", "estrangeiro"),
+    ("351912345678", "+351912345678", "estrangeiro"),
+    ("", None, "desconhecido"),
+]
+
+
+@pytest.mark.parametrize("digitos, e164, tipo", CASOS_URL)
+def test_normalizar_telefone_da_url(digitos, e164, tipo):
+    assert normalizar_telefone(digitos, internacional=True) == (e164, tipo)
+
+
+CASOS_ESCOLHER = [
+    # O celular vence o fixo em qualquer posição
+    (["(11) 3333-4444", "(11) 98888-7777"], ("(11) 98888-7777", "+5511988887777", "celular")),
+    (["(11) 98888-7777", "(11) 3333-4444"], ("(11) 98888-7777", "+5511988887777", "celular")),
+    # Celular sem o nono dígito também é celular
+    (["(11) 3333-4444", "(11) 8888-7777"], ("(11) 8888-7777", "+5511988887777", "celular")),
+    # Sem celular: o estrangeiro vence o fixo (o WhatsApp decide)
+    (["(11) 3333-4444", "+1 415 555 0100"], ("+1 415 555 0100", "+14155550100", "estrangeiro")),
+    # Só fixos e inválidos: o primeiro, que leva a Declinado
+    (["(11) 3333-4444", "+55 20 98888-7777"], ("(11) 3333-4444", "+551133334444", "fixo")),
+    (["+55 20 98888-7777", "(11) 3333-4444"], ("+55 20 98888-7777", None, "invalido")),
+    # Campos sem dígitos são ignorados
+    (["Não informado", "", None, "(11) 98888-7777"], ("(11) 98888-7777", "+5511988887777", "celular")),
+    (["Não informado", ""], None),
+    ([], None),
+]
+
+
+@pytest.mark.parametrize("candidatos, esperado", CASOS_ESCOLHER)
+def test_escolher_telefone(candidatos, esperado):
+    assert escolher_telefone(candidatos) == esperado
+
+
+@pytest.mark.parametrize("tipo, declina", [
+    ("celular", False), ("fixo", True), ("invalido", True), ("estrangeiro", False), ("desconhecido", False),
+])
+def test_tipos_declinados(tipo, declina):
+    assert (tipo in TIPOS_DECLINADOS) == declina
@@ -0,0 +1,56 @@
+"""
+O que conta como travamento e como sessão perdida no vigia do navegador
+
+Só comando sem resposta do chromedriver trava a sessão; erros que o chromedriver
+responde (timeout de script, aba já fechada) deixam a sessão como está.
+"""
+
+import pytest
+
+from vigia_navegador import LimitesVigia, VigiaNavegador
+
+
+def _resposta(erro, mensagem=""):
+    return {"status": 500, "value": {"error": erro, "message": mensagem}}
+
+
+@pytest.fixture
+def vigia():
+    return VigiaNavegador(LimitesVigia(max_travamentos=1))
+
+
+@pytest.mark.parametrize("erro, mensagem", [
+    ("timeout", "script timeout"),
+    ("script timeout", "result was not received in 30 seconds"),
+    ("no such window", "target window already closed"),
+    ("no such element", "Unable to locate element"),
+])
+def test_erros_respondidos_nao_reciclam(vigia, erro, mensagem):
+    vigia._registrar("executeScript", 0.1, _resposta(erro, mensagem))
+    assert vigia.travamentos == 0
+    assert not vigia.sessao_perdida
+    assert vigia.motivo_reciclagem() is None
+
+
+@pytest.mark.parametrize("erro, mensagem", [
+    ("invalid session id", "invalid session id"),
+    ("unknown error", "chrome not reachable"),
+    ("unknown error", "session deleted because of page crash from tab crashed - disconnected"),
+])
+def test_sessao_perdida(vigia, erro, mensagem):
+    vigia._registrar("findElement", 0.1, _resposta(erro, mensagem))
+    assert vigia.sessao_perdida
+    assert vigia.motivo_reciclagem() == "sessão do Chrome perdida"
+
+
+def test_comando_sem_resposta_trava(vigia):
+    vigia._registrar_falha("executeScript", TimeoutError("timed out"))
+    assert vigia.travamentos == 1
+    assert not vigia.sessao_perdida
+    assert vigia.motivo_reciclagem() == "1 comando(s) travado(s)"
+
+
+def test_chromedriver_morto_perde_a_sessao(vigia):
+    vigia._registrar_falha("findElement", ConnectionRefusedError("Connection refused"))
+    assert vigia.travamentos == 0
+    assert vigia.sessao_perdida
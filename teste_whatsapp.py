@@ -10,6 +10,9 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 import time
 
+from composicao import inserir_mensagem
+from telefone import TIPOS_DECLINADOS, normalizar_telefone
+
 def testar_whatsapp():
     print("="*60)
     print("TESTE DE ENVIO DE MENSAGEM WHATSAPP")
@@ -30,10 +33,16 @@ def testar_whatsapp():
         input("\n👉 Faça login no WhatsApp Web (escaneie QR code) e pressione ENTER...")
         
         # Pede o número para testar
-        numero = input("\n👉 Digite o número de telefone para testar (com DDD, sem espaços): ")
+        numero = input("\n👉 Digite o número de telefone para testar (com DDD): ")
+        e164, tipo = normalizar_telefone(numero)
+        if tipo in TIPOS_DECLINADOS:
+            print(f"❌ Número {tipo} pelas regras brasileiras - o bot moveria o lead para 'Declinado'")
+            input("\nPressione ENTER para fechar...")
+            return
         
-        print(f"\n3. Abrindo conversa com {numero}...")
-        driver.get(f"https://web.whatsapp.com/send?phone=55{numero}")
+        destino = e164 or numero
+        print(f"\n3. Abrindo conversa com {destino} ({tipo})...")
+        driver.get(f"https://web.whatsapp.com/send?phone={''.join(c for c in destino if c.isdigit())}")
         
         print("4. Aguardando página carregar (10 segundos)...")
         time.sleep(10)
@@ -110,16 +119,16 @@ def testar_whatsapp():
 Me chamo Gilvane, faço parte do time de vendas da QUERO TRUCK. 
 Vi que entrou em contato conosco, o que vc procura? Compra, venda de caminhões?"""
         
-        print("\n8. Digitando mensagem...")
-        linhas = mensagem.split('\n')
-        for i, linha in enumerate(linhas):
-            caixa.send_keys(linha)
-            if i < len(linhas) - 1:
-                caixa.send_keys(Keys.SHIFT + Keys.ENTER)
-            print(f"   Linha {i+1} digitada")
+        print("\n8. Inserindo mensagem (de uma vez, digitação como reserva)...")
+        inicio = time.monotonic()
+        modo, conferido = inserir_mensagem(driver, caixa, mensagem)
+        print(f"   Modo: {modo} - {time.monotonic() - inicio:.2f}s")
         
-        print("\n9. Mensagem digitada! Verificando...")
-        time.sleep(2)
+        print("\n9. Mensagem inserida! Verificando...")
+        if conferido:
+            print("   ✅ O texto da caixa confere com a mensagem")
+        else:
+            print("   ⚠️ O texto da caixa NÃO confere com a mensagem")
         
         resposta = input("\n👉 A mensagem apareceu na caixa? (s/n): ").lower()
         
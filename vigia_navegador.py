@@ -0,0 +1,223 @@
+"""
+Vigia do navegador - saúde do Chrome em execuções longas
+
+Uma execução sem supervisão usa o mesmo Chrome por horas e a memória do Chrome
+e do WhatsApp Web só cresce. Um comando travado ficava esperando o timeout
+padrão do Selenium e, quando estourava, o except do executar encerrava tudo.
+
+O vigia:
+- impõe timeouts: de cada comando ao chromedriver (HTTP) e de carga de página;
+- envolve o command_executor do driver e mede a latência dos comandos, os
+  comandos sem resposta do chromedriver e a sessão perdida (Chrome fechado/morto);
+- amostra a memória do chromedriver e de todos os processos do Chrome (/proc);
+- responde se a sessão deve ser reciclada e por quê. O bot então fecha o Chrome
+  e abre outro com o mesmo perfil persistente (sem novo login), devolvendo o
+  lead interrompido para a frente da fila.
+"""
+
+from collections import deque
+import os
+import signal
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Comandos que levam segundos por natureza (carga de página, abrir/fechar sessão):
+# ficam fora da média de latência
+COMANDOS_LENTOS = {"get", "refresh", "goBack", "goForward", "newSession", "quit", "executeAsyncScript"}
+
+# Erros do chromedriver que indicam que a sessão não existe mais
+# ('target window already closed' fica de fora: é só uma aba fechada, a sessão segue viva)
+ERROS_SESSAO_PERDIDA = ("invalid session id", "disconnected", "chrome not reachable")
+
+
+def processos_descendentes(pid):
+    """pid e todos os descendentes (o Chrome e seus renderers são filhos do chromedriver)"""
+    encontrados = []
+    pendentes = [pid]
+    while pendentes:
+        atual = pendentes.pop()
+        encontrados.append(atual)
+        try:
+            for tarefa in os.listdir(f"/proc/{atual}/task"):
+                with open(f"/proc/{atual}/task/{tarefa}/children", "r") as arquivo:
+                    pendentes.extend(int(filho) for filho in arquivo.read().split())
+        except (OSError, ValueError):
+            continue  # processo terminou no meio da leitura
+    return encontrados
+
+
+def memoria_processos(pid):
+    """
+    Memória residente (MB) do processo e de todos os descendentes. Lê o /proc;
+    None fora do Linux
+    """
+    if not os.path.isdir("/proc"):
+        return None
+    total_kb = 0
+    for atual in processos_descendentes(pid):
+        try:
+            with open(f"/proc/{atual}/status", "r") as arquivo:
+                for linha in arquivo:
+                    if linha.startswith("VmRSS:"):
+                        total_kb += int(linha.split()[1])
+                        break
+        except (OSError, ValueError):
+            continue
+    return total_kb / 1024
+
+
+def encerrar_processos(pids):
+    """Mata os processos que sobraram (um Chrome órfão prende o perfil persistente)"""
+    for pid in pids:
+        try:
+            # Confere o nome: o pid pode ter sido reaproveitado por outro processo
+            with open(f"/proc/{pid}/comm", "r") as arquivo:
+                if "chrom" not in arquivo.read().lower():
+                    continue
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+
+class LimitesVigia:
+    """Limites que disparam a reciclagem do Chrome e timeouts impostos ao driver"""
+
+    def __init__(self, memoria_max_mb=2500, latencia_max=3.0, janela_latencia=100, max_travamentos=1,
+                 reciclar_horas=None, timeout_comando=90, timeout_carregamento=60):
+        """
+        memoria_max_mb: memória do chromedriver + Chrome (MB) que dispara a reciclagem
+        latencia_max: média (s) dos últimos comandos que indica um Chrome degradado
+        janela_latencia: quantos comandos recentes entram na média
+        max_travamentos: comandos sem resposta do chromedriver (timeout HTTP) antes de
+            reciclar; um 'timeout' respondido pelo chromedriver (script, espera) não conta
+        reciclar_horas: recicla a cada N horas mesmo sem sintoma (None = nunca)
+        timeout_comando: segundos de espera por cada resposta do chromedriver
+        timeout_carregamento: segundos de carga de página (driver.get)
+        """
+        self.memoria_max_mb = memoria_max_mb
+        self.latencia_max = latencia_max
+        self.janela_latencia = janela_latencia
+        self.max_travamentos = max_travamentos
+        self.reciclar_horas = reciclar_horas
+        self.timeout_comando = timeout_comando
+        self.timeout_carregamento = timeout_carregamento
+
+
+class VigiaNavegador:
+    """Mede a saúde da sessão do Chrome e diz quando ela deve ser reciclada"""
+
+    def __init__(self, limites=None):
+        self.limites = limites or LimitesVigia()
+        self.latencias = deque(maxlen=self.limites.janela_latencia)
+        self.travamentos = 0
+        self.sessao_perdida = False
+        self.inicio_sessao = None
+        self.pid = None
+        self.memoria_mb = None
+        self.memoria_maxima_mb = 0.0
+        self.reciclagens = []  # (instante, motivo)
+        self.trava = threading.Lock()
+
+    def instalar(self, driver):
+        """Impõe os timeouts e passa a medir os comandos do driver (a cada sessão nova)"""
+        self.latencias.clear()
+        self.travamentos = 0
+        self.sessao_perdida = False
+        self.inicio_sessao = time.monotonic()
+        try:
+            self.pid = driver.service.process.pid
+        except AttributeError:
+            self.pid = None
+
+        executor = driver.command_executor
+        configuracao = getattr(executor, "_client_config", None)
+        if configuracao is not None:
+            configuracao.timeout = self.limites.timeout_comando
+        else:
+            executor.set_timeout(self.limites.timeout_comando)  # Selenium antigo
+        driver.set_page_load_timeout(self.limites.timeout_carregamento)
+
+        original = executor.execute
+
+        def execute(comando, parametros):
+            inicio = time.perf_counter()
+            try:
+                resposta = original(comando, parametros)
+            except Exception as e:
+                self._registrar_falha(comando, e)
+                raise
+            self._registrar(comando, time.perf_counter() - inicio, resposta)
+            return resposta
+
+        executor.execute = execute
+
+    def _registrar(self, comando, duracao, resposta):
+        erro = ""
+        valor = resposta.get("value") if isinstance(resposta, dict) else None
+        if isinstance(valor, dict):
+            erro = f"{valor.get('error') or ''} {valor.get('message') or ''}".lower()
+        with self.trava:
+            if comando not in COMANDOS_LENTOS:
+                self.latencias.append(duracao)
+            if any(trecho in erro for trecho in ERROS_SESSAO_PERDIDA):
+                self.sessao_perdida = True
+
+    def _registrar_falha(self, comando, erro):
+        """Comando sem resposta do chromedriver: estourou o timeout ou o processo morreu"""
+        with self.trava:
+            if isinstance(erro, TimeoutError) or "timeout" in type(erro).__name__.lower() \
+                    or "timed out" in str(erro).lower():
+                self.travamentos += 1
+                logger.warning(f"⏱️ Comando '{comando}' sem resposta em {self.limites.timeout_comando}s")
+            else:
+                self.sessao_perdida = True
+
+    def latencia_media(self):
+        with self.trava:
+            return sum(self.latencias) / len(self.latencias) if self.latencias else None
+
+    def amostrar(self):
+        """Lê a memória atual do chromedriver + Chrome (MB), ou None"""
+        if self.pid is None:
+            return None
+        self.memoria_mb = memoria_processos(self.pid)
+        if self.memoria_mb is not None:
+            self.memoria_maxima_mb = max(self.memoria_maxima_mb, self.memoria_mb)
+        return self.memoria_mb
+
+    def motivo_reciclagem(self):
+        """Por que a sessão deve ser reciclada agora, ou None se está saudável"""
+        limites = self.limites
+        if self.sessao_perdida:
+            return "sessão do Chrome perdida"
+        if self.travamentos >= limites.max_travamentos:
+            return f"{self.travamentos} comando(s) travado(s)"
+        memoria = self.amostrar()
+        if memoria is not None and limites.memoria_max_mb and memoria > limites.memoria_max_mb:
+            return f"memória em {memoria:.0f} MB (limite {limites.memoria_max_mb} MB)"
+        latencia = self.latencia_media()
+        if latencia is not None and len(self.latencias) >= self.latencias.maxlen and latencia > limites.latencia_max:
+            return f"latência média de {latencia:.1f}s por comando (limite {limites.latencia_max}s)"
+        if limites.reciclar_horas and self.inicio_sessao is not None and \
+                time.monotonic() - self.inicio_sessao > limites.reciclar_horas * 3600:
+            return f"sessão aberta há mais de {limites.reciclar_horas}h"
+        return None
+
+    def registrar_reciclagem(self, motivo):
+        self.reciclagens.append((time.strftime("%Y-%m-%dT%H:%M:%S"), motivo))
+
+    def registrar_resumo(self):
+        """Escreve no log a memória máxima e as reciclagens feitas"""
+        partes = []
+        if self.memoria_maxima_mb:
+            partes.append(f"memória máxima {self.memoria_maxima_mb:.0f} MB")
+        latencia = self.latencia_media()
+        if latencia is not None:
+            partes.append(f"latência média {latencia * 1000:.0f}ms")
+        partes.append(f"{len(self.reciclagens)} reciclagem(ns) do Chrome")
+        logger.info(f"🩺 Vigia do navegador: {', '.join(partes)}")
+        for instante, motivo in self.reciclagens:
+            logger.info(f"   {instante}: {motivo}")